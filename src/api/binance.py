@@ -1,12 +1,29 @@
+from __future__ import annotations  # Annotations must not load pandas, it only gets imported once candles are needed
+
 import requests
+import contextvars
 import logging
+import time
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Union
-from pandas import DataFrame
+from typing import TYPE_CHECKING, List, Dict, Union, Tuple
 from logging import Logger
+from requests.adapters import HTTPAdapter
 from requests.models import Response
+from requests.sessions import Session
 from json.decoder import JSONDecodeError
+from retrying import Retrying
+from api.exchange_info import ExchangeInfoCache, SymbolFilters, SymbolInfo
+from api.rate_limiter import RequestWeightLimiter
+from api.request_stats import RequestStats
+from profiler import profiler
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+    from pandas import DataFrame
+    from api.candle_resampler import CandleResampler
+    from api.candle_store import CandleStore
 
 logger: Logger = logging.getLogger("__main__")
 
@@ -24,30 +41,132 @@ class Binance:
     ENDPOINT_TEST_ORDER = "/api/v3/order/test"
     ENDPOINT_EXCHANGE_INFO = "/api/v3/exchangeInfo"
 
-    def __init__(self):
-        self.base: str = "https://api.binance.com"
+    # Request weights
+    WEIGHT_DEFAULT: int = 1
+    WEIGHT_ALL_PRICES: int = 2
+    WEIGHT_EXCHANGE_INFO: int = 10
+
+    KLINE_PAGE_SIZE: int = 1000  # Maximum number of candles we can access with one API call
+    DAY_MILLISECONDS: int = 24 * 60 * 60 * 1000
+
+    # Responses with these status codes are temporary (rate limit or server errors), so the request gets retried
+    RETRY_STATUS_CODES: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    def __init__(self, candle_store: CandleStore = None, base: str = "https://api.binance.com", max_workers: int = 8,
+                 rate_limiter: RequestWeightLimiter = None, pool_size: int = 10,
+                 timeout: Tuple[float, float] = (3.05, 10.0), max_retries: int = 3, retry_backoff: float = 0.5,
+                 exchange_info_ttl: float = 3600.0, exchange_info_path: str = None, resample: bool = True):
+        self.base: str = base
         self.trading_fee: float = 0.001  # 0.1% on every trade
+        self.candle_store: Union[CandleStore, None] = candle_store  # Local candlestick cache (optional)
+        # Builds longer intervals from the stored minute candles instead of downloading them
+        self.resampler: Union[CandleResampler, None] = None
+        if candle_store and resample:
+            from api.candle_resampler import CandleResampler
+            self.resampler = CandleResampler(candle_store)
+        self.max_workers: int = max_workers  # Maximum number of parallel requests when collecting many candles
+        self.rate_limiter: RequestWeightLimiter = rate_limiter or RequestWeightLimiter()
+        self.timeout: Tuple[float, float] = timeout  # Connect and read timeout in seconds
+        self.max_retries: int = max_retries  # Number of retries after the first attempt failed
+        self.retry_backoff: float = retry_backoff  # Wait time in seconds before the first retry, doubles every retry
+        self.request_stats: RequestStats = RequestStats()  # Latency and error counters per endpoint
+        # Exchange info indexed by symbol, only gets downloaded again once it expired (optionally persisted to disk)
+        self.exchange_info: ExchangeInfoCache = ExchangeInfoCache(ttl=exchange_info_ttl, path=exchange_info_path)
+        self.exchange_info.load()
+        # Keep-alive session, so all requests reuse already opened connections
+        self.session: Session = requests.Session()
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def get_candlestick_data(self, symbol: str, interval: str = "1h", end_time: int = None,
-                             limit: int = 1000) -> Union[DataFrame, bool]:
+                             limit: int = 1000, all_fields: bool = False) -> Union[DataFrame, bool]:
         """
         Collects candlestick data for a given symbol.
 
+        If the client has a candle store, the candles get served from the local store and only the missing candles get
+        downloaded. Longer intervals (e.g. 1h) get built from the stored minute candles as long as (almost) all of them
+        are stored already, so no interval has to be downloaded on its own.
+
         Parameters:
             - symbol: (str) The symbol for which we want to collect the kline data
             - interval: (str) The time interval of the candles
             - end_time: (int) point in time we want to get the data backwards from
             - limit: (int) Number of candles we want to collect
+            - all_fields: (bool) Whether all twelve kline fields (e.g. trade count and taker volumes) get returned
+              instead of the OHLCV columns, those are always downloaded (the candle store only keeps OHLCV)
 
         Returns:
             - DataFrame containing the candlestick data
             - False in case of failure
         """
         logger.info("Collecting candlestick data...")
+        if all_fields:
+            return self.__download_candlestick_data(symbol, interval, end_time, limit, all_fields=True)
+        if self.resampler and self.resampler.can_resample(symbol, interval, end_time, limit):
+            return self.resampler.get_candlestick_data(symbol, interval, end_time, limit,
+                                                       fetch=self.__fetch_candlestick_data)
+        if self.candle_store and self.candle_store.is_cacheable(interval):
+            return self.candle_store.get_candlestick_data(symbol, interval, end_time, limit,
+                                                          fetch=self.__fetch_candlestick_data)
+        return self.__download_candlestick_data(symbol, interval, end_time, limit)
+
+    def __fetch_candlestick_data(self, symbol: str, interval: str, end_time: int, limit: int
+                                 ) -> Union[DataFrame, bool]:
+        """Downloads the candles the candle store is missing, no candles (e.g. before the listing) are no failure"""
+        return self.__download_candlestick_data(symbol, interval, end_time, limit, allow_empty=True)
+
+    def __download_candlestick_data(self, symbol: str, interval: str, end_time: int = None,
+                                    limit: int = 1000, start_time: int = None, all_fields: bool = False,
+                                    allow_empty: bool = False) -> Union[DataFrame, bool]:
+        """
+        Downloads candlestick data for a given symbol from the Binance API.
+
+        Parameters:
+            - symbol: (str) The symbol for which we want to collect the kline data
+            - interval: (str) The time interval of the candles
+            - end_time: (int) point in time we want to get the data backwards from
+            - limit: (int) Number of candles we want to collect
+            - start_time: (int) open time of the first candle we want to get (only used for single pages)
+            - all_fields: (bool) Whether all twelve kline fields get returned instead of the OHLCV columns
+            - allow_empty: (bool) Whether a time range without candles gets returned as an empty data frame instead of
+              being a failure
+
+        Returns:
+            - DataFrame containing the candlestick data
+            - False in case of failure
+        """
+        from api.kline_parser import to_dataframe
+
+        klines: Union[ndarray, bool] = self.get_klines(symbol, interval, end_time, limit, start_time, allow_empty)
+        if klines is False:
+            return False
+        return to_dataframe(klines, all_fields)
+
+    def get_klines(self, symbol: str, interval: str, end_time: int = None, limit: int = 1000,
+                   start_time: int = None, allow_empty: bool = False) -> Union[ndarray, bool]:
+        """
+        Downloads klines with all twelve fields into a structured array (see api.kline_parser.KLINE_DTYPE), without
+        the candle store.
+
+        Parameters:
+            - symbol: (str) The symbol for which we want to collect the kline data
+            - interval: (str) The time interval of the candles
+            - end_time: (int) point in time we want to get the data backwards from
+            - limit: (int) Number of candles we want to collect
+            - start_time: (int) open time of the first candle we want to get (only used for single pages)
+            - allow_empty: (bool) Whether no klines (e.g. before the symbol got listed) get returned as an empty
+              array instead of being a failure
+
+        Returns:
+            - Structured array with one entry per kline (oldest first)
+            - False in case of failure
+        """
+        from api.kline_parser import parse_klines
 
         # Check whether we need to get more candlesticks than we can access with one API call (1000)
-        if limit > 1000:
-            return self.__get_coherent_candlestick_data(symbol, interval, limit, end_time)
+        if limit > self.KLINE_PAGE_SIZE:
+            return self.__get_coherent_klines(symbol, interval, limit, end_time, allow_empty)
 
         # Get data
         params: List[str] = [
@@ -55,14 +174,17 @@ class Binance:
             "interval=" + interval,
             "limit=" + str(limit)
         ]
+        if start_time:
+            params.append("startTime=" + str(start_time))
         if end_time:
             params.append("endTime=" + str(end_time))
-        data: Union[dict, list, bool] = self.http_request(endpoint=self.ENDPOINT_KLINES, params=params)
-        if not data:
+        content: Union[bytes, bool] = self.http_request(endpoint=self.ENDPOINT_KLINES, params=params,
+                                                        weight=self.__get_kline_weight(limit), raw=True)
+        if not content:
             logger.error("Missing candlestick data")
             return False
 
-        # Put data into a data frame and drop unnecessary columns, then rename them
+        # Parse the klines straight into typed columns
         # [
         #   [
         #     1499040000000,      // Open time
@@ -79,63 +201,122 @@ class Binance:
         #     "17928899.62484339" // Ignore.
         #   ]
         # ]
-        df: DataFrame = DataFrame(data)
-        df = df.drop(range(6, 12), axis=1)
-        col_names: List[str] = ["time", "open", "high", "low", "close", "volume"]
-        df.columns = col_names
-
-        # Transform values from strings to floats
-        for col in col_names:
-            df[col] = df[col].astype(float)
-        return df
+        with profiler.stage("parse_klines"):
+            klines: Union[ndarray, bool] = parse_klines(content)
+        if klines is False or (not len(klines) and not allow_empty):
+            logger.error("Missing candlestick data")
+            return False
+        return klines
 
-    def __get_coherent_candlestick_data(self, symbol: str, interval: str, limit: int = 1000, end_time: int = None
-                                        ) -> Union[DataFrame, bool]:
+    def __get_coherent_klines(self, symbol: str, interval: str, limit: int = 1000, end_time: int = None,
+                              allow_empty: bool = False) -> Union[ndarray, bool]:
         """
         Accesses long term historical candlestick market data.
 
         This function extends the "get_candlestick_data" function and it's purpose is for the accessing of long term
-        market data. Binance only allows to get 1000 candles to be sent for one call. So if we want to collect market
-        data over a long time span, we will have to make several calls for market data with each going backwards in time
-        from the beginning of the previous market data. Then, all market data information will be merged into one long
-        data frame.
+        market data. Binance only allows to get 1000 candles to be sent for one call. Since all candles of an interval
+        have the same length, we can calculate the time range of every 1000 candle page in advance. The pages then get
+        downloaded in parallel on a bounded pool of workers sharing the request weight limit, and are merged into one
+        long array with a single concatenation at the end. Pages before the listing of the symbol are empty and simply
+        add no klines.
 
         Parameters:
             - symbol: (str) The symbol for which we want to collect the kline data
             - interval: (str) The time interval of the candles
             - limit: (int) Number of candles we want to collect
             - end_time: (int) point in time we want to get the data backwards from
+            - allow_empty: (bool) Whether no klines at all get returned as an empty array instead of being a failure
 
         Returns:
-            - df: (DataFrame) Long term candlestick data (more than 1000 candles in one frame)
+            - Long term klines (more than 1000 klines in one structured array)
             - False in case of error
         """
+        import numpy as np
+        from api.candle_store import CandleStore
+
         logger.debug("Collecting longtime historical candlestick data...")
+        interval_ms: int = CandleStore.INTERVAL_MILLISECONDS.get(interval)
+        if not interval_ms or self.DAY_MILLISECONDS % interval_ms:
+            # The pages can only be split in advance if the candles are aligned to multiples of their length since the
+            # epoch. That does not hold for months and weeks (which start on Mondays) and is not guaranteed for 3 days.
+            return self.__walk_klines(symbol, interval, limit, end_time, allow_empty)
+
+        pages: List[Tuple[int, int, int]] = self.get_page_boundaries(interval_ms, limit, end_time)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pages)))) as executor:
+            # Every page runs in a copy of the caller's context, so it gets profiled like the caller (e.g. a backtest)
+            futures: List[Future] = [executor.submit(
+                contextvars.copy_context().run, self.get_klines, symbol, interval, start_time=page[0],
+                end_time=page[1], limit=page[2], allow_empty=True) for page in pages]
+            arrays: List[Union[ndarray, bool]] = [future.result() for future in futures]
+        if any(klines is False for klines in arrays):
+            logger.error("Missing candlestick data")
+            return False
+        klines: ndarray = np.concatenate(arrays)
+        if not len(klines) and not allow_empty:
+            logger.error("Missing candlestick data")
+            return False
+        return klines
+
+    def get_page_boundaries(self, interval_ms: int, limit: int, end_time: int = None) -> List[Tuple[int, int, int]]:
+        """
+        Splits the time range of the last 'limit' candles before the end time into pages of up to 1000 candles.
+
+        Parameters:
+            - interval_ms: (int) Length of one candle in milliseconds
+            - limit: (int) Number of candles we want to collect
+            - end_time: (int) point in time we want to get the data backwards from (now if None)
+
+        Returns:
+            List of (first open time, last open time, number of candles) per page, starting with the oldest page
+        """
+        if not end_time:
+            end_time = int(time.time() * 1000)
+        last_open_time: int = end_time // interval_ms * interval_ms
+        pages: List[Tuple[int, int, int]] = list()
+        remaining: int = limit
+        while remaining > 0:
+            page_size: int = min(remaining, self.KLINE_PAGE_SIZE)
+            first_open_time: int = last_open_time - (page_size - 1) * interval_ms
+            pages.append((first_open_time, last_open_time, page_size))
+            last_open_time = first_open_time - interval_ms
+            remaining -= page_size
+        pages.reverse()
+        return pages
+
+    def __walk_klines(self, symbol: str, interval: str, limit: int, end_time: int = None, allow_empty: bool = False
+                      ) -> Union[ndarray, bool]:
+        """
+        Collects more than 1000 candles by walking backwards in time page by page.
 
-        repeat_rounds: int = 0
-        if limit > 1000:
-            repeat_rounds = int(limit / 1000)  # One round per 1000 candles
-        initial_limit: int = limit % 1000
+        Each page starts at the beginning of the previously received candles, so this only works sequentially. It is
+        used for intervals whose page boundaries cannot be calculated in advance.
+        """
+        import numpy as np
+
+        repeat_rounds: int = int(limit / self.KLINE_PAGE_SIZE)
+        initial_limit: int = limit % self.KLINE_PAGE_SIZE
         if initial_limit == 0:
-            initial_limit = 1000
-
-        # First, we will get the last initial candles. E.g. if the limit is 5120 candles that we want to access, we will
-        # start to get the market data for the 120 candles first, in order to have clean values in steps of thousands
-        # (like 5000). Then we can get the rest of the limit with the repeat rounds value accessing 1000 candles per
-        # repeat round. The data will start at the end time going backwards (or starting in the present data if no end
-        # time is specified
-        df: Union[DataFrame, bool] = self.get_candlestick_data(symbol, interval, end_time=end_time, limit=initial_limit)
-        if not isinstance(df, DataFrame):
+            initial_limit = self.KLINE_PAGE_SIZE
+            repeat_rounds -= 1
+
+        klines: Union[ndarray, bool] = self.get_klines(symbol, interval, end_time=end_time, limit=initial_limit,
+                                                       allow_empty=allow_empty)
+        if klines is False:
             logger.error("Missing candlestick data")
             return False
-        while repeat_rounds > 0:
-            # Then, for every other 1000 candles, we get them, but starting at the beginning of the previously received
-            # candles
-            tmp_df: DataFrame = self.get_candlestick_data(symbol, interval, limit=1000, end_time=int(df["time"][0]))
-            tmp_df.drop(tmp_df.tail(1).index, inplace=True)
-            df = tmp_df.append(df, ignore_index=True)
-            repeat_rounds = repeat_rounds - 1
-        return df
+        arrays: List[ndarray] = [klines]
+        while repeat_rounds > 0 and len(klines):
+            # End right before the first candle of the previous page, so the pages do not overlap. A page before the
+            # listing of the symbol is empty and ends the walk.
+            klines = self.get_klines(symbol, interval, limit=self.KLINE_PAGE_SIZE, end_time=int(klines["time"][0]) - 1,
+                                     allow_empty=True)
+            if klines is False:
+                logger.error("Missing candlestick data")
+                return False
+            arrays.append(klines)
+            repeat_rounds -= 1
+        arrays.reverse()
+        return np.concatenate(arrays)
 
     def get_current_price(self, symbol: str = None) -> Union[Dict[str, float], float, bool]:
         """
@@ -156,7 +337,8 @@ class Binance:
             params: List[str] = ["symbol=" + symbol]
             data: Union[dict, list, bool] = self.http_request(endpoint=self.ENDPOINT_PRICE, params=params)
         else:
-            data: Union[dict, list, bool] = self.http_request(endpoint=self.ENDPOINT_PRICE)
+            data: Union[dict, list, bool] = self.http_request(endpoint=self.ENDPOINT_PRICE,
+                                                              weight=self.WEIGHT_ALL_PRICES)
         if not data:
             logger.error("Missing price data")
             return False
@@ -198,51 +380,82 @@ class Binance:
             - False in case of error
         """
         # Get data
-        data: Union[dict, list, bool] = self.http_request(endpoint=self.ENDPOINT_EXCHANGE_INFO)
+        data: Union[dict, list, bool] = self.http_request(endpoint=self.ENDPOINT_EXCHANGE_INFO,
+                                                          weight=self.WEIGHT_EXCHANGE_INFO)
         if not data:
             logger.error("Missing exchange info data")
             return False
         else:
             return data
 
-    def __get_symbol_data(self, symbol: str = None) -> Union[Dict[str, str], List[Dict[str, str]], bool]:
+    def refresh_exchange_info(self) -> bool:
+        """
+        Downloads the exchange info and replaces the cached one, no matter whether it has expired.
+
+        Returns:
+            - True if the cache got refreshed
+            - False in case of error
         """
-        Returns the symbol data for a given symbol, or the data for all symbols if no symbol was passed.
+        with self.exchange_info.lock:
+            return self.__refresh_exchange_info()
+
+    def __refresh_exchange_info(self) -> bool:
+        logger.info("Refreshing exchange info...")
+        exchange_info: Union[Dict, bool] = self.__get_exchange_info()
+        if not exchange_info:
+            return False
+        return self.exchange_info.update(exchange_info)
+
+    def __get_symbols(self) -> Union[Dict[str, SymbolInfo], bool]:
+        """
+        Returns the cached symbols of the exchange info, downloads the exchange info first if the cache has expired.
+
+        Returns:
+            - The symbol info per symbol
+            - False in case of error
+        """
+        if self.exchange_info.is_expired():
+            with self.exchange_info.lock:
+                # Another thread might have refreshed the cache while we were waiting for the lock
+                if self.exchange_info.is_expired() and not self.__refresh_exchange_info():
+                    return False
+        return self.exchange_info.symbols
+
+    def get_symbol_info(self, symbol: str) -> Union[SymbolInfo, bool]:
+        """
+        Returns the information and parsed trading rules of a symbol.
 
         Parameters:
-            - symbol: (str) The symbol for which we want to get the data
+            - symbol: (str) The symbol for which we want to get the information
 
         Returns:
-            - symbol_data:
-                {
-                  "symbol": "ETHBTC",
-                  "status": "TRADING",
-                  "baseAsset": "ETH",
-                  "baseAssetPrecision": 8,
-                  "quoteAsset": "BTC",
-                  "filters": [
-                    ...
-                  ],
-                  ...
-                },
-                ...
+            - The symbol info, e.g. symbol_info.filters.step_size
             - False in case of error
         """
-        exchange_info: Union[Dict, bool] = self.__get_exchange_info()
-        symbols: List[Dict[str, str]] = exchange_info.get("symbols")
+        symbols: Union[Dict[str, SymbolInfo], bool] = self.__get_symbols()
         if not symbols:
-            logger.error("Could not find 'symbols' in exchange info")
             return False
-
-        # Check whether we want to return symbol data for one symbol or all symbols
-        if symbol:
-            for symbol_data in symbols:
-                # Loop through all symbols data until we have found the data for the symbol we search for
-                if symbol_data.get("symbol") == symbol:
-                    return symbol_data
+        symbol_info: Union[SymbolInfo, None] = symbols.get(symbol)
+        if symbol_info is None:
             logger.error(f"Could not find symbol '{symbol}' in symbols data")
-        else:
-            return symbols
+            return False
+        return symbol_info
+
+    def get_trading_rules(self, symbol: str) -> Union[SymbolFilters, bool]:
+        """
+        Returns the trading rules of a symbol, parsed into numbers (e.g. to validate orders).
+
+        Parameters:
+            - symbol: (str) The symbol for which we want to get the trading rules
+
+        Returns:
+            - The parsed filters of the symbol
+            - False in case of error
+        """
+        symbol_info: Union[SymbolInfo, bool] = self.get_symbol_info(symbol)
+        if not symbol_info:
+            return False
+        return symbol_info.filters
 
     def get_symbol_filters(self, symbol: str) -> Union[List[Dict[str, str]], bool]:
         """
@@ -264,8 +477,10 @@ class Binance:
                 ],
             - False in case of error
         """
-        symbol_data: Dict[str, Union[str, list]] = self.__get_symbol_data(symbol)
-        filters: List[Dict[str, str]] = symbol_data.get("filters")
+        symbol_info: Union[SymbolInfo, bool] = self.get_symbol_info(symbol)
+        if not symbol_info:
+            return False
+        filters: List[Dict[str, str]] = symbol_info.data.get("filters")
         if not filters:
             logger.error("Could not find filters in symbol data")
             return False
@@ -280,17 +495,26 @@ class Binance:
             - symbols: (List[str]) List of all currently tradable symbols on Binance
             - False in case we cannot access the symbol data
         """
-        symbols_data: List[Dict[str, str], bool] = self.__get_symbol_data()
-        if symbols_data:
-            symbols: List[str] = list()
-            for dict_ in symbols_data:
-                if "symbol" in dict_:
-                    symbols.append(dict_.get("symbol"))
-            return symbols
+        symbols: Union[Dict[str, SymbolInfo], bool] = self.__get_symbols()
+        if symbols:
+            return list(symbols.keys())
         else:
             return False
 
-    def http_request(self, endpoint: str, params: List[str] = None) -> Union[dict, list, bool]:
+    @staticmethod
+    def __get_kline_weight(limit: int) -> int:
+        """Returns the request weight of a kline request, which depends on the number of requested candles"""
+        if limit <= 100:
+            return 1
+        elif limit <= 500:
+            return 2
+        elif limit <= 1000:
+            return 5
+        else:
+            return 10
+
+    def http_request(self, endpoint: str, params: List[str] = None, weight: int = WEIGHT_DEFAULT, raw: bool = False
+                     ) -> Union[dict, list, bytes, bool]:
         """
         Creates and executes a HTTP request with the given url and parameters.
 
@@ -301,36 +525,42 @@ class Binance:
         Parameters:
             - endpoint: (str) The endpoint which we want to access
             - params: (List[str]) The params we want to attach to the url
+            - weight: (int) The request weight Binance assigns to this request
+            - raw: (bool) Whether the undecoded body gets returned (for parsers that decode it themselves)
 
         Returns:
             - Dict or list containing the string data
+            - The body as bytes if raw is set
             - False in case of error
         """
+        with profiler.stage("http_request"):
+            return self.__request(endpoint, params, weight, raw)
+
+    def __request(self, endpoint: str, params: Union[List[str], None], weight: int, raw: bool = False
+                  ) -> Union[dict, list, bytes, bool]:
         # Create URL
         url: str = self.base + endpoint
         if params:
-            for i in range(len(params)):
-                if i == 0:
-                    # First param has to connect with a question mark to the url
-                    url = url + "?" + params[i]
-                else:
-                    # Other params connect with a ampersand
-                    url = url + "&" + params[i]
+            url = url + "?" + "&".join(params)
         logger.debug(f"Calling {url}...")
 
-        # Call url to get excepted response
+        # Call url to get excepted response, retry with exponential backoff in case of temporary errors
+        retrying: Retrying = Retrying(
+            stop_max_attempt_number=self.max_retries + 1,
+            wait_exponential_multiplier=self.retry_backoff * 500,  # First retry waits 2 * multiplier milliseconds
+            wait_exponential_max=30000,
+            retry_on_exception=self.__is_retryable
+        )
         try:
-            response: Response = requests.get(url)
-        except requests.exceptions.ConnectionError as e:
+            response: Response = retrying.call(self.__send_request, endpoint, url, weight)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
             logger.error(f"ConnectionError: {e}")
             return False
-
-        # Check response
-        try:
-            response.raise_for_status()
         except requests.exceptions.HTTPError as e:
             logger.error(f"HTTP error: {e}")
             return False
+        if raw:
+            return response.content
 
         # Decode data
         try:
@@ -340,3 +570,40 @@ class Binance:
             return False
         else:
             return data
+
+    def __send_request(self, endpoint: str, url: str, weight: int) -> Response:
+        """
+        Sends one GET request over the shared session and records its latency.
+
+        Raises:
+            - HTTPError in case of an error status code
+            - ConnectionError or Timeout in case we could not get a response
+        """
+        self.rate_limiter.acquire(weight)  # Wait until we can send the request without exceeding the weight limit
+        start: float = time.perf_counter()
+        try:
+            response: Response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.request_stats.record(endpoint, time.perf_counter() - start, error=True)
+            logger.debug(f"Request to {endpoint} failed: {e}")
+            raise
+        self.request_stats.record(endpoint, time.perf_counter() - start)
+        return response
+
+    def __is_retryable(self, exception: Exception) -> bool:
+        """Returns whether a failed request should be retried"""
+        if isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        if isinstance(exception, requests.exceptions.HTTPError) and exception.response is not None:
+            return exception.response.status_code in self.RETRY_STATUS_CODES
+        return False
+
+    def get_request_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns latency and error counters of all endpoints that got called by this client.
+
+        Returns:
+            - {"/api/v3/klines": {"calls": 87, "errors": 0, "average_latency": 0.12, "max_latency": 0.3}, ...}
+        """
+        return self.request_stats.get_stats()
@@ -0,0 +1,176 @@
+import logging
+import time
+import numpy as np
+
+from logging import Logger
+from typing import Callable, Dict, List, Tuple, Union
+from numpy import ndarray
+from pandas import DataFrame
+from api.candle_store import CandleStore
+
+logger: Logger = logging.getLogger("__main__")
+
+MINUTE: int = 60 * 1000
+SOURCE_INTERVAL: str = "1m"
+# Intervals that can be built from minute candles: Binance aligns them to multiples of their length since the epoch,
+# which only holds for intervals that divide a day (weeks start on Mondays, 3 day candles are not aligned to days)
+RESAMPLE_INTERVALS: List[str] = [interval for interval, interval_ms in CandleStore.INTERVAL_MILLISECONDS.items()
+                                 if interval != SOURCE_INTERVAL and interval_ms % MINUTE == 0
+                                 and (24 * 60 * MINUTE) % interval_ms == 0]
+
+
+def resample_candles(columns: Dict[str, ndarray], interval_ms: int, drop_partial_first: bool = False
+                     ) -> Dict[str, ndarray]:
+    """
+    Aggregates candles (or price entries) into candles of a longer interval, without a loop over the candles.
+
+    Every candle gets assigned to the candle of the longer interval it opened in. The first candle of every group gives
+    the open, the last one the close, high, low and volume get reduced over the group. A group that is not complete yet
+    simply holds the candles it has so far, like the candle Binance returns while it is still open.
+
+    Parameters:
+        - columns: Time, open, high, low, close and volume column, sorted by time
+        - interval_ms: (int) Length of the resampled candles in milliseconds
+        - drop_partial_first: (bool) Whether the first candle gets dropped if the data starts within it (e.g. for a
+          sliding window, which cut off the start of its oldest candle)
+
+    Returns:
+        The columns of the resampled candles
+    """
+    times: ndarray = columns["time"]
+    if not len(times):
+        return {col: np.empty(0) for col in CandleStore.COLUMNS}
+    buckets: ndarray = times // interval_ms * interval_ms
+    starts: ndarray = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    if drop_partial_first and times[0] != buckets[0]:
+        starts = starts[1:]
+        if not len(starts):
+            return {col: np.empty(0) for col in CandleStore.COLUMNS}
+        columns = {col: values[starts[0]:] for col, values in columns.items()}
+        buckets = buckets[starts[0]:]
+        starts = starts - starts[0]
+    ends: ndarray = np.concatenate((starts[1:], [len(buckets)])) - 1
+    return {
+        "time": buckets[starts],
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][ends],
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
+
+
+def resample(df: DataFrame, interval: str, drop_partial_first: bool = False) -> DataFrame:
+    """
+    Aggregates the candles of a data frame (sorted by time) into candles of the given interval (e.g. '1h').
+
+    Returns:
+        DataFrame holding the OHLCV columns of the resampled candles, the latest candle may still be open
+    """
+    columns: Dict[str, ndarray] = {col: df[col].to_numpy(dtype=np.float64) for col in CandleStore.COLUMNS}
+    resampled: Dict[str, ndarray] = resample_candles(columns, CandleStore.INTERVAL_MILLISECONDS[interval],
+                                                     drop_partial_first)
+    return DataFrame(resampled, columns=CandleStore.COLUMNS)
+
+
+class CandleResampler:
+    """
+    Serves candles of longer intervals (e.g. 5m, 15m, 1h, 4h, 1d) from the minute candles of the candle store.
+
+    Once the minute candles of a symbol are stored, every other interval gets built locally instead of being downloaded
+    separately. The closed resampled candles get cached per symbol and interval, so later requests only resample the
+    minutes that arrived since then. The latest candle is rebuilt on every request, as long as it is not closed.
+
+    The cache only keeps the candles of the latest request per symbol and interval (a sliding window only moves
+    forward), and only for the symbols and intervals that were requested most recently.
+    """
+
+    def __init__(self, candle_store: CandleStore, max_missing_candles: int = 1000, max_cached: int = 64) -> None:
+        """
+        Parameters:
+            - candle_store: (CandleStore) Store of the minute candles
+            - max_missing_candles: (int) Maximum number of minute candles that may have to be downloaded for a request
+              to get resampled, requests needing more get their candles downloaded in their own interval instead
+            - max_cached: (int) Maximum number of symbol and interval pairs whose candles stay cached
+        """
+        self.candle_store: CandleStore = candle_store
+        self.max_missing_candles: int = max_missing_candles
+        self.max_cached: int = max_cached
+        # Closed candles per symbol and interval, ordered from the least to the most recently requested
+        self.cache: Dict[Tuple[str, str], Dict[str, ndarray]] = dict()
+
+    def can_resample(self, symbol: str, interval: str, end_time: int, limit: int) -> bool:
+        """Returns whether the requested candles can be built from (mostly) stored minute candles"""
+        if interval not in RESAMPLE_INTERVALS:
+            return False
+        now: int = int(time.time() * 1000)
+        first_open_time, _, last_minute = self.__get_window(interval, end_time, limit, now)
+        last_closed_minute: int = min(last_minute, now // MINUTE * MINUTE - MINUTE)
+        missing: int = self.candle_store.count_missing(symbol, SOURCE_INTERVAL, first_open_time, last_closed_minute)
+        return missing <= self.max_missing_candles
+
+    def get_candlestick_data(self, symbol: str, interval: str, end_time: int, limit: int,
+                             fetch: Callable[[str, str, int, int], Union[DataFrame, bool]]) -> Union[DataFrame, bool]:
+        """
+        Builds the candles from the minute candles of the candle store.
+
+        Parameters:
+            - symbol: (str) The symbol for which we want to collect the kline data
+            - interval: (str) The time interval of the candles
+            - end_time: (int) point in time we want to get the data backwards from (now if None)
+            - limit: (int) Number of candles we want to collect
+            - fetch: Function downloading candles with the signature (symbol, interval, end_time, limit)
+
+        Returns:
+            - DataFrame containing the candlestick data
+            - False in case of failure
+        """
+        interval_ms: int = CandleStore.INTERVAL_MILLISECONDS[interval]
+        now: int = int(time.time() * 1000)
+        first_open_time, last_open_time, last_minute = self.__get_window(interval, end_time, limit, now)
+
+        # Only resample the minutes after the cached candles, if they cover the start of the request
+        key: Tuple[str, str] = (symbol, interval)
+        cached: Union[Dict[str, ndarray], None] = self.cache.pop(key, None)
+        if cached is None or not len(cached["time"]) or cached["time"][0] > first_open_time \
+                or cached["time"][-1] < first_open_time - interval_ms:
+            cached = {col: np.empty(0) for col in CandleStore.COLUMNS}
+            load_start: int = first_open_time
+        else:
+            load_start = max(first_open_time, int(cached["time"][-1]) + interval_ms)
+
+        partial: Dict[str, ndarray] = {col: np.empty(0) for col in CandleStore.COLUMNS}
+        if load_start <= last_minute:
+            minutes: Union[DataFrame, bool] = self.candle_store.get_candlestick_data(
+                symbol, SOURCE_INTERVAL, last_minute, (last_minute - load_start) // MINUTE + 1, fetch)
+            if not isinstance(minutes, DataFrame):
+                logger.error(f"Missing minute candles to resample for {symbol} ({interval})")
+                return False
+            resampled: Dict[str, ndarray] = resample_candles(
+                {col: minutes[col].to_numpy(dtype=np.float64) for col in CandleStore.COLUMNS}, interval_ms)
+            # A candle is closed once all of its minutes are, the minute that is still open never is
+            closed: int = int(np.searchsorted(resampled["time"], now - interval_ms, side="right"))
+            cached = {col: np.concatenate((cached[col], resampled[col][:closed])) for col in CandleStore.COLUMNS}
+            partial = {col: resampled[col][closed:] for col in CandleStore.COLUMNS}
+
+        first: int = int(np.searchsorted(cached["time"], first_open_time, side="left"))
+        last: int = int(np.searchsorted(cached["time"], last_open_time, side="right"))
+        # Drop the candles before the request (copied, so the dropped candles do not stay referenced)
+        if first:
+            cached = {col: cached[col][first:].copy() for col in CandleStore.COLUMNS}
+            last -= first
+            first = 0
+        self.cache[key] = cached
+        while len(self.cache) > self.max_cached:
+            del self.cache[next(iter(self.cache))]
+        return DataFrame({col: np.concatenate((cached[col][first:last], partial[col]))
+                          for col in CandleStore.COLUMNS}, columns=CandleStore.COLUMNS)
+
+    @staticmethod
+    def __get_window(interval: str, end_time: int, limit: int, now: int) -> Tuple[int, int, int]:
+        """Returns the open time of the first and last requested candle, and of the last minute within them"""
+        interval_ms: int = CandleStore.INTERVAL_MILLISECONDS[interval]
+        last_open_time: int = (min(end_time, now) if end_time else now) // interval_ms * interval_ms
+        first_open_time: int = last_open_time - (limit - 1) * interval_ms
+        last_minute: int = min(last_open_time + interval_ms - MINUTE, now // MINUTE * MINUTE)
+        return first_open_time, last_open_time, last_minute
@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+
+from contextlib import contextmanager
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+from numpy import ndarray
+from pandas import DataFrame, concat
+from util import get_project_root
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, the store is only locked within the process there
+    fcntl = None
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class CandleStore:
+    """
+    Persistent local store for candlestick data.
+
+    Candles get stored per symbol and interval in segments, one directory per download holding one .npy file per
+    column, sorted by their open time. New candles only get appended as a new segment, the stored candles are never
+    rewritten (until the segments get compacted into one once there are too many of them). The files are opened
+    memory-mapped, so serving a request only copies the requested time range into memory. Next to the segments, a small
+    JSON file keeps track of the time ranges that have already been downloaded, so we only fetch the ranges that are
+    missing and never download the same candles twice. Candles that are not closed yet are never stored.
+
+    Several processes (e.g. the workers of a batch backtest) can share the store: every symbol and interval directory
+    gets locked with a file lock while it is read (shared) or written (exclusive).
+    """
+    COLUMNS: List[str] = ["time", "open", "high", "low", "close", "volume"]
+    RANGES_FILE: str = "ranges.json"
+    LOCK_FILE: str = ".lock"
+    SEGMENT_PREFIX: str = "segment_"
+    MAX_SEGMENTS: int = 32  # The segments get compacted into one once there are more
+
+    # Length of the fixed size intervals in milliseconds. Months have no fixed length, so they do not get stored.
+    INTERVAL_MILLISECONDS: Dict[str, int] = {
+        "1m": 60 * 1000,
+        "3m": 3 * 60 * 1000,
+        "5m": 5 * 60 * 1000,
+        "15m": 15 * 60 * 1000,
+        "30m": 30 * 60 * 1000,
+        "1h": 60 * 60 * 1000,
+        "2h": 2 * 60 * 60 * 1000,
+        "4h": 4 * 60 * 60 * 1000,
+        "6h": 6 * 60 * 60 * 1000,
+        "8h": 8 * 60 * 60 * 1000,
+        "12h": 12 * 60 * 60 * 1000,
+        "1d": 24 * 60 * 60 * 1000,
+        "3d": 3 * 24 * 60 * 60 * 1000,
+        "1w": 7 * 24 * 60 * 60 * 1000,
+    }
+
+    def __init__(self, directory: str = None) -> None:
+        self.directory: str = directory or os.path.join(get_project_root(), "data/candles")
+
+    def is_cacheable(self, interval: str) -> bool:
+        """Returns whether candles of the given interval can be stored (only fixed length intervals can)"""
+        return interval in self.INTERVAL_MILLISECONDS
+
+    def get_candlestick_data(self, symbol: str, interval: str, end_time: int, limit: int,
+                             fetch: Callable[[str, str, int, int], Union[DataFrame, bool]]) -> Union[DataFrame, bool]:
+        """
+        Serves candlestick data from the local store and only fetches the candles that are missing.
+
+        Parameters:
+            - symbol: (str) The symbol for which we want to collect the kline data
+            - interval: (str) The time interval of the candles
+            - end_time: (int) point in time we want to get the data backwards from (now if None)
+            - limit: (int) Number of candles we want to collect
+            - fetch: Function downloading candles with the signature (symbol, interval, end_time, limit), returns an
+              empty data frame if there are no candles in the range (e.g. before the listing of the symbol)
+
+        Returns:
+            - DataFrame containing the candlestick data
+            - False in case of failure
+        """
+        interval_ms: int = self.INTERVAL_MILLISECONDS[interval]
+        now: int = int(time.time() * 1000)
+        last_open_time: int = (min(end_time, now) if end_time else now) // interval_ms * interval_ms
+        first_open_time: int = last_open_time - (limit - 1) * interval_ms
+        # The candle that opened within the last interval is still moving, so it must not be stored
+        last_closed_time: int = min(last_open_time, (now // interval_ms - 1) * interval_ms)
+
+        # Download the closed candles we have not stored yet and append them to the store
+        with self.__locked(symbol, interval, exclusive=False):
+            ranges: List[Tuple[int, int]] = self.__load_ranges(symbol, interval)
+        missing: List[Tuple[int, int]] = self.__get_missing_ranges(ranges, first_open_time, last_closed_time,
+                                                                   interval_ms)
+        if missing:
+            logger.debug(f"Fetching {len(missing)} missing candle range(s) for {symbol} ({interval})...")
+            fetched: List[DataFrame] = list()
+            fetched_ranges: List[Tuple[int, int]] = list()
+            for start, end in missing:
+                df: Union[DataFrame, bool] = fetch(symbol, interval, end, (end - start) // interval_ms + 1)
+                if not isinstance(df, DataFrame):
+                    logger.error("Missing candlestick data")
+                    return False
+                # The whole range counts as downloaded, even if its candles start later (the symbol was not listed
+                # yet) or there are none, so it never gets downloaded again
+                fetched.append(df[(df["time"] >= start) & (df["time"] <= end)])
+                fetched_ranges.append((start, end))
+            self.__append(symbol, interval, fetched, fetched_ranges)
+
+        with self.__locked(symbol, interval, exclusive=False):
+            columns: Dict[str, ndarray] = self.__load_columns(symbol, interval, first_open_time, last_closed_time)
+        df: DataFrame = DataFrame(columns, columns=self.COLUMNS)
+
+        # Add the candle that is still open
+        if last_closed_time < last_open_time:
+            open_df: Union[DataFrame, bool] = fetch(symbol, interval, last_open_time, 1)
+            if not isinstance(open_df, DataFrame):
+                logger.error("Missing candlestick data")
+                return False
+            open_df = open_df[open_df["time"] > last_closed_time]
+            df = concat([df, open_df[self.COLUMNS]], ignore_index=True)
+        return df
+
+    def load(self, symbol: str, interval: str, start: int = None, end: int = None) -> DataFrame:
+        """
+        Returns the stored candles of a symbol and interval without downloading anything.
+
+        Parameters:
+            - symbol: (str) The symbol of the candles
+            - interval: (str) The time interval of the candles
+            - start: (int) Open time of the first candle we want (first stored candle if None)
+            - end: (int) Open time of the last candle we want (last stored candle if None)
+
+        Returns:
+            - DataFrame containing the stored candlestick data (empty if nothing is stored)
+        """
+        with self.__locked(symbol, interval, exclusive=False):
+            return DataFrame(self.__load_columns(symbol, interval, start, end), columns=self.COLUMNS)
+
+    def count_missing(self, symbol: str, interval: str, start: int, end: int) -> int:
+        """Returns the number of candles with open times between start and end that have not been downloaded yet"""
+        interval_ms: int = self.INTERVAL_MILLISECONDS[interval]
+        with self.__locked(symbol, interval, exclusive=False):
+            ranges: List[Tuple[int, int]] = self.__load_ranges(symbol, interval)
+        missing: List[Tuple[int, int]] = self.__get_missing_ranges(ranges, start, end, interval_ms)
+        return sum((last - first) // interval_ms + 1 for first, last in missing)
+
+    def __get_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.directory, symbol + "_" + interval)
+
+    def __load_ranges(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """Returns the already downloaded time ranges (first and last candle open time) of a symbol and interval"""
+        path: str = os.path.join(self.__get_path(symbol, interval), self.RANGES_FILE)
+        if not os.path.exists(path):
+            return list()
+        with open(path, "r") as file:
+            return [(int(start), int(end)) for start, end in json.load(file)]
+
+    @staticmethod
+    def __get_missing_ranges(ranges: List[Tuple[int, int]], start: int, end: int, interval_ms: int
+                             ) -> List[Tuple[int, int]]:
+        """Subtracts the already downloaded ranges from the requested range [start, end] (both are open times)"""
+        missing: List[Tuple[int, int]] = list()
+        for range_start, range_end in sorted(ranges):
+            if range_end < start:
+                continue
+            if range_start > end:
+                break
+            if range_start > start:
+                missing.append((start, range_start - interval_ms))
+            start = max(start, range_end + interval_ms)
+        if start <= end:
+            missing.append((start, end))
+        return missing
+
+    @contextmanager
+    def __locked(self, symbol: str, interval: str, exclusive: bool) -> Iterator[None]:
+        """Locks the directory of a symbol and interval, shared for reading or exclusive for writing"""
+        path: str = self.__get_path(symbol, interval)
+        Path(path).mkdir(parents=True, exist_ok=True)
+        with open(os.path.join(path, self.LOCK_FILE), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __get_segments(self, symbol: str, interval: str) -> List[Tuple[int, int, str]]:
+        """Returns the first and last open time and the path of every stored segment, ordered by time"""
+        path: str = self.__get_path(symbol, interval)
+        if not os.path.isdir(path):
+            return list()
+        segments: List[Tuple[int, int, str]] = list()
+        for name in os.listdir(path):
+            if name.startswith(self.SEGMENT_PREFIX):
+                first, last = name[len(self.SEGMENT_PREFIX):].split("_")
+                segments.append((int(first), int(last), os.path.join(path, name)))
+        return sorted(segments)
+
+    def __load_columns(self, symbol: str, interval: str, start: int = None, end: int = None) -> Dict[str, ndarray]:
+        """Loads the segments memory-mapped and copies the rows with open times between start and end"""
+        parts: List[Dict[str, ndarray]] = list()
+        for first_time, last_time, path in self.__get_segments(symbol, interval):
+            if (start is not None and last_time < start) or (end is not None and first_time > end):
+                continue
+            times: ndarray = np.load(os.path.join(path, "time.npy"), mmap_mode="r")
+            first: int = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+            last: int = len(times) if end is None else int(np.searchsorted(times, end, side="right"))
+            parts.append({col: np.load(os.path.join(path, col + ".npy"), mmap_mode="r")[first:last]
+                          for col in self.COLUMNS})
+        if not parts:
+            return {col: np.empty(0) for col in self.COLUMNS}
+        columns: Dict[str, ndarray] = {col: np.concatenate([part[col] for part in parts]) for col in self.COLUMNS}
+        if np.any(np.diff(columns["time"]) <= 0):
+            # Segments only overlap if a write got interrupted before its ranges were saved
+            _, order = np.unique(columns["time"], return_index=True)
+            columns = {col: values[order] for col, values in columns.items()}
+        return columns
+
+    def __append(self, symbol: str, interval: str, frames: List[DataFrame], ranges: List[Tuple[int, int]]) -> None:
+        """Appends newly downloaded candles as a new segment and saves the downloaded ranges"""
+        path: str = self.__get_path(symbol, interval)
+        interval_ms: int = self.INTERVAL_MILLISECONDS[interval]
+        with self.__locked(symbol, interval, exclusive=True):
+            # Another process may have stored some of the candles in the meantime
+            stored: List[Tuple[int, int]] = self.__load_ranges(symbol, interval)
+            new: Dict[str, ndarray] = {col: np.concatenate([df[col].to_numpy(dtype=float) for df in frames])
+                                       for col in self.COLUMNS}
+            keep: ndarray = ~self.__is_stored(new["time"], stored)
+            _, order = np.unique(new["time"][keep], return_index=True)
+            new = {col: values[keep][order] for col, values in new.items()}
+            if len(new["time"]):
+                self.__write_segment(path, new)
+
+            # Join overlapping and adjacent ranges
+            joined: List[List[int]] = list()
+            for start, end in sorted(stored + ranges):
+                if joined and start <= joined[-1][1] + interval_ms:
+                    joined[-1][1] = max(joined[-1][1], end)
+                else:
+                    joined.append([start, end])
+            tmp_path: str = os.path.join(path, self.RANGES_FILE + ".tmp")
+            with open(tmp_path, "w") as file:
+                json.dump(joined, file)
+            os.replace(tmp_path, os.path.join(path, self.RANGES_FILE))
+
+            segments: List[Tuple[int, int, str]] = self.__get_segments(symbol, interval)
+            if len(segments) > self.MAX_SEGMENTS:
+                logger.debug(f"Compacting {len(segments)} candle segments of {symbol} ({interval})...")
+                compacted: str = self.__write_segment(path, self.__load_columns(symbol, interval))
+                for _, _, segment_path in segments:
+                    if segment_path != compacted:
+                        shutil.rmtree(segment_path)
+
+    def __write_segment(self, path: str, columns: Dict[str, ndarray]) -> str:
+        """Writes the columns (sorted by time) as a segment, replacing a segment with the same time range"""
+        name: str = f"{self.SEGMENT_PREFIX}{int(columns['time'][0])}_{int(columns['time'][-1])}"
+        # Write to a temporary directory first, so a crash never leaves a half written segment behind
+        tmp_path: str = os.path.join(path, "." + name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.mkdir(tmp_path)
+        for col in self.COLUMNS:
+            np.save(os.path.join(tmp_path, col + ".npy"), columns[col])
+        segment_path: str = os.path.join(path, name)
+        if os.path.exists(segment_path):
+            shutil.rmtree(segment_path)
+        os.replace(tmp_path, segment_path)
+        return segment_path
+
+    @staticmethod
+    def __is_stored(times: ndarray, ranges: List[Tuple[int, int]]) -> ndarray:
+        """Returns which open times lie within one of the downloaded ranges"""
+        if not ranges:
+            return np.zeros(len(times), dtype=bool)
+        starts, ends = (np.array(values, dtype=np.float64) for values in zip(*sorted(ranges)))
+        index: ndarray = np.searchsorted(starts, times, side="right") - 1
+        return (index >= 0) & (times <= ends[np.maximum(index, 0)])
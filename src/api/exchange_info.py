@@ -0,0 +1,224 @@
+import json
+import logging
+import math
+import os
+import time
+
+from logging import Logger
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Union
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class SymbolFilters:
+    """
+    Trading rules of a symbol, parsed from the filters of the exchange info into numbers.
+
+    Rules the exchange does not define for the symbol do not restrict anything (0 as minimum, infinity as maximum and 0
+    as step size). The exchange disables maximums by setting them to 0, those become infinity as well.
+    """
+    __slots__ = ("min_price", "max_price", "tick_size", "min_quantity", "max_quantity", "step_size",
+                 "market_min_quantity", "market_max_quantity", "market_step_size", "min_notional", "max_notional",
+                 "max_num_orders", "max_num_algo_orders")
+
+    def __init__(self, filters: List[Dict[str, Union[str, int, bool]]]) -> None:
+        """
+        Parameters:
+            - filters: The filters of the symbol, as listed in the exchange info
+        """
+        self.min_price: float = 0.0
+        self.max_price: float = math.inf
+        self.tick_size: float = 0.0
+        self.min_quantity: float = 0.0
+        self.max_quantity: float = math.inf
+        self.step_size: float = 0.0
+        self.market_min_quantity: float = 0.0
+        self.market_max_quantity: float = math.inf
+        self.market_step_size: float = 0.0
+        self.min_notional: float = 0.0
+        self.max_notional: float = math.inf
+        self.max_num_orders: float = math.inf
+        self.max_num_algo_orders: float = math.inf
+
+        for symbol_filter in filters:
+            filter_type: str = symbol_filter.get("filterType")
+            if filter_type == "PRICE_FILTER":
+                self.min_price = self.__parse(symbol_filter, "minPrice", 0.0)
+                self.max_price = self.__parse_maximum(symbol_filter, "maxPrice")
+                self.tick_size = self.__parse(symbol_filter, "tickSize", 0.0)
+            elif filter_type == "LOT_SIZE":
+                self.min_quantity = self.__parse(symbol_filter, "minQty", 0.0)
+                self.max_quantity = self.__parse_maximum(symbol_filter, "maxQty")
+                self.step_size = self.__parse(symbol_filter, "stepSize", 0.0)
+            elif filter_type == "MARKET_LOT_SIZE":
+                self.market_min_quantity = self.__parse(symbol_filter, "minQty", 0.0)
+                self.market_max_quantity = self.__parse_maximum(symbol_filter, "maxQty")
+                self.market_step_size = self.__parse(symbol_filter, "stepSize", 0.0)
+            elif filter_type in ("MIN_NOTIONAL", "NOTIONAL"):
+                self.min_notional = self.__parse(symbol_filter, "minNotional", 0.0)
+                self.max_notional = self.__parse_maximum(symbol_filter, "maxNotional")
+            elif filter_type == "MAX_NUM_ORDERS":
+                self.max_num_orders = self.__parse_maximum(symbol_filter, "maxNumOrders")
+            elif filter_type == "MAX_NUM_ALGO_ORDERS":
+                self.max_num_algo_orders = self.__parse_maximum(symbol_filter, "maxNumAlgoOrders")
+
+    def is_valid_order(self, price: float, quantity: float, market: bool = False) -> bool:
+        """
+        Checks whether an order meets the price, quantity and notional rules of the symbol.
+
+        Parameters:
+            - price: (float) Price per coin (for market orders the current price)
+            - quantity: (float) Number of coins
+            - market: (bool) Whether the order is a market order, which has its own quantity rules
+
+        Returns:
+            True if the exchange would accept the order
+        """
+        if market:
+            min_quantity, max_quantity, step_size = (self.market_min_quantity, self.market_max_quantity,
+                                                     self.market_step_size)
+        else:
+            min_quantity, max_quantity, step_size = self.min_quantity, self.max_quantity, self.step_size
+            if not self.min_price <= price <= self.max_price:
+                return False
+            if not self.__is_step(price, self.min_price, self.tick_size):
+                return False
+        if not min_quantity <= quantity <= max_quantity or not self.__is_step(quantity, min_quantity, step_size):
+            return False
+        return self.min_notional <= price * quantity <= self.max_notional
+
+    def round_quantity(self, quantity: float) -> float:
+        """Rounds a quantity down to the step size of the symbol"""
+        if not self.step_size:
+            return quantity
+        return math.floor(quantity / self.step_size + 1e-9) * self.step_size
+
+    def round_price(self, price: float) -> float:
+        """Rounds a price to the tick size of the symbol"""
+        if not self.tick_size:
+            return price
+        return round(price / self.tick_size) * self.tick_size
+
+    @staticmethod
+    def __parse(symbol_filter: Dict[str, Union[str, int, bool]], key: str, default: float) -> float:
+        value: Union[str, int, None] = symbol_filter.get(key)
+        return float(value) if value is not None else default
+
+    @staticmethod
+    def __parse_maximum(symbol_filter: Dict[str, Union[str, int, bool]], key: str) -> float:
+        value: float = SymbolFilters.__parse(symbol_filter, key, 0.0)
+        return value if value > 0 else math.inf
+
+    @staticmethod
+    def __is_step(value: float, minimum: float, step: float) -> bool:
+        """Checks whether the value lies on the step grid that starts at the minimum (with tolerance for float errors)"""
+        if not step:
+            return True
+        steps: float = (value - minimum) / step
+        return abs(steps - round(steps)) < 1e-6
+
+
+class SymbolInfo:
+    """Information and trading rules of a single symbol of the exchange info"""
+    __slots__ = ("symbol", "status", "base_asset", "quote_asset", "base_asset_precision", "quote_precision", "filters",
+                 "data")
+
+    def __init__(self, data: Dict) -> None:
+        """
+        Parameters:
+            - data: The data of the symbol, as listed in the exchange info
+        """
+        self.symbol: str = data.get("symbol")
+        self.status: str = data.get("status")
+        self.base_asset: str = data.get("baseAsset")
+        self.quote_asset: str = data.get("quoteAsset")
+        self.base_asset_precision: int = int(data.get("baseAssetPrecision", 8))
+        self.quote_precision: int = int(data.get("quotePrecision", data.get("quoteAssetPrecision", 8)))
+        self.filters: SymbolFilters = SymbolFilters(data.get("filters", list()))
+        self.data: Dict = data  # Raw data of the symbol
+
+
+class ExchangeInfoCache:
+    """
+    In-memory cache of the exchange info, indexed by symbol.
+
+    The exchange info is heavy on request weight and rarely changes, so it only gets downloaded again once the cached
+    info is older than the time to live. Optionally, the cache is persisted to a JSON file, so a restart can reuse the
+    info as long as it has not expired.
+    """
+
+    def __init__(self, ttl: float = 3600.0, path: str = None) -> None:
+        """
+        Parameters:
+            - ttl: (float) Seconds until the cached exchange info expires
+            - path: (str) JSON file the cache gets persisted to (not persisted if None)
+        """
+        self.ttl: float = ttl
+        self.path: Union[str, None] = path
+        self.symbols: Dict[str, SymbolInfo] = dict()
+        self.updated_at: float = 0.0  # Unix time of the download of the cached exchange info
+        self.lock: Lock = Lock()  # Held while the exchange info gets refreshed, so it only gets downloaded once
+
+    def is_expired(self) -> bool:
+        return time.time() - self.updated_at >= self.ttl
+
+    def update(self, exchange_info: Dict, updated_at: float = None, persist: bool = True) -> bool:
+        """
+        Replaces the cached symbols with the symbols of the exchange info.
+
+        Parameters:
+            - exchange_info: (Dict) The exchange info as returned by the api
+            - updated_at: (float) Unix time of the download, defaults to now
+            - persist: (bool) Whether the exchange info should be written to the file of the cache
+
+        Returns:
+            False if the exchange info does not contain any symbols
+        """
+        symbols_data: List[Dict] = exchange_info.get("symbols")
+        if not symbols_data:
+            logger.error("Could not find 'symbols' in exchange info")
+            return False
+        self.symbols = {data.get("symbol"): SymbolInfo(data) for data in symbols_data if "symbol" in data}
+        self.updated_at = time.time() if updated_at is None else updated_at
+        if persist and self.path:
+            self.__save(exchange_info)
+        return True
+
+    def load(self) -> bool:
+        """
+        Loads the persisted exchange info, if there is one.
+
+        Returns:
+            True if the cache got loaded from the file (the loaded info might be expired already)
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r") as file:
+                cached: Dict = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load cached exchange info: {e}")
+            return False
+        # Info without the time of its download is treated as expired, so it only gets used until it got refreshed
+        return self.update(cached.get("exchange_info", dict()), updated_at=cached.get("updated_at") or 0.0,
+                           persist=False)
+
+    def get(self, symbol: str) -> Union[SymbolInfo, None]:
+        return self.symbols.get(symbol)
+
+    def clear(self) -> None:
+        self.symbols = dict()
+        self.updated_at = 0.0
+
+    def __save(self, exchange_info: Dict) -> None:
+        """Writes the exchange info into a temporary file first, so the cache file never gets left half written"""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: str = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump({"updated_at": self.updated_at, "exchange_info": exchange_info}, file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist exchange info: {e}")
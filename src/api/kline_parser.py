@@ -0,0 +1,85 @@
+import json
+import logging
+import numpy as np
+
+from logging import Logger
+from typing import Any, Callable, List, Union
+from numpy import ndarray
+from pandas import DataFrame
+
+try:
+    import orjson  # Optional, decodes the responses several times faster than the json module
+    _loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger: Logger = logging.getLogger("__main__")
+
+# The twelve fields of a kline, in the order of the klines endpoint
+KLINE_FIELDS: List[str] = ["time", "open", "high", "low", "close", "volume", "close_time", "quote_volume", "trades",
+                           "taker_buy_volume", "taker_buy_quote_volume", "ignore"]
+INTEGER_FIELDS: List[str] = ["time", "close_time", "trades"]
+KLINE_DTYPE: np.dtype = np.dtype([(field, np.int64 if field in INTEGER_FIELDS else np.float64)
+                                  for field in KLINE_FIELDS])
+CANDLE_COLUMNS: List[str] = KLINE_FIELDS[:6]  # The OHLCV columns the candlestick data frames hold
+
+
+def parse_klines(content: bytes) -> Union[ndarray, bool]:
+    """
+    Parses the body of a klines response into a structured array with one typed field per kline field.
+
+    Binance sends prices and volumes as JSON strings. All values of the klines endpoint are numbers, so the quotes get
+    removed before decoding: the decoder (orjson if it is installed) then creates floats and ints right away. All fields
+    are 8 bytes wide, so the decoded klines get written into the preallocated structured array as one float64 block in
+    a single pass. Only the integer fields get converted in place afterwards. Times and the trade count are below 2^53,
+    so they pass the float64 block without losing precision.
+
+    Parameters:
+        - content: (bytes) Body of the response, e.g. [[1499040000000, "0.01634790", ...], ...]
+
+    Returns:
+        - Structured array of KLINE_DTYPE with one entry per kline
+        - False if the body is not a list of klines
+    """
+    if not content.lstrip().startswith(b"["):
+        logger.error(f"Could not parse klines: {content[:100]!r} is not a list of klines")
+        return False
+    try:
+        values: ndarray = np.array(_loads(content.replace(b'"', b"")), dtype=np.float64)
+    except (ValueError, TypeError) as e:  # The JSON decode errors of json and orjson are value errors
+        logger.error(f"Could not parse klines: {e}")
+        return False
+    if values.ndim != 2 or values.shape[1] != len(KLINE_FIELDS):
+        if values.size == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        logger.error(f"Could not parse klines: unexpected shape {values.shape}")
+        return False
+
+    klines: ndarray = np.empty(len(values), dtype=KLINE_DTYPE)
+    klines.view(np.float64).reshape(values.shape)[:] = values
+    integers: ndarray = klines.view(np.int64).reshape(values.shape)
+    for field in INTEGER_FIELDS:
+        index: int = KLINE_FIELDS.index(field)
+        integers[:, index] = values[:, index]
+    return klines
+
+
+def to_dataframe(klines: ndarray, all_fields: bool = False) -> DataFrame:
+    """
+    Converts parsed klines into candlestick data.
+
+    Parameters:
+        - klines: (ndarray) Structured array of KLINE_DTYPE
+        - all_fields: (bool) Whether all twelve fields are kept (with their own types), otherwise only the OHLCV
+          columns are kept, all of them as floats
+
+    Returns:
+        DataFrame with one row per kline
+    """
+    if all_fields:
+        return DataFrame({field: klines[field] for field in KLINE_FIELDS}, columns=KLINE_FIELDS)
+    # Fill one float block, pandas then takes it over as it is instead of merging the columns into a new block
+    values: ndarray = np.empty((len(klines), len(CANDLE_COLUMNS)), dtype=np.float64)
+    for index, column in enumerate(CANDLE_COLUMNS):
+        values[:, index] = klines[column]
+    return DataFrame(values, columns=CANDLE_COLUMNS, copy=False)
@@ -0,0 +1,48 @@
+import logging
+import time
+
+from collections import deque
+from logging import Logger
+from threading import Lock
+from typing import Deque, Tuple
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class RequestWeightLimiter:
+    """
+    Keeps the used request weight below the limit of the exchange.
+
+    Binance assigns a weight to every request and bans clients that use more than a certain weight per minute. The
+    limiter remembers the weight of all requests within the last period and lets callers wait until enough weight is
+    available again. It is thread safe, so all workers of a pool can share one limiter.
+    """
+
+    def __init__(self, max_weight: int = 1200, period: float = 60.0) -> None:
+        self.max_weight: int = max_weight  # Maximum weight per period
+        self.period: float = period  # Length of the period in seconds
+        self.used_weight: int = 0
+        self.requests: Deque[Tuple[float, int]] = deque()  # Time and weight of all requests within the period
+        self.lock: Lock = Lock()
+
+    def acquire(self, weight: int = 1) -> None:
+        """
+        Blocks until the given weight can be used without exceeding the weight limit.
+
+        Parameters:
+            - weight: (int) The weight of the request we want to send
+        """
+        weight = min(weight, self.max_weight)
+        while True:
+            with self.lock:
+                now: float = time.monotonic()
+                # Forget all requests that are older than one period
+                while self.requests and self.requests[0][0] <= now - self.period:
+                    self.used_weight -= self.requests.popleft()[1]
+                if self.used_weight + weight <= self.max_weight:
+                    self.requests.append((now, weight))
+                    self.used_weight += weight
+                    return
+                wait: float = self.requests[0][0] + self.period - now
+            logger.debug(f"Request weight limit reached, waiting {round(wait, 2)}s...")
+            time.sleep(wait)
@@ -0,0 +1,69 @@
+from threading import Lock
+from typing import Dict
+
+
+class EndpointStats:
+    """Latency and error counters of a single endpoint"""
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.errors: int = 0
+        self.total_latency: float = 0.0  # In seconds
+        self.max_latency: float = 0.0  # In seconds
+
+    def get_average_latency(self) -> float:
+        return self.total_latency / self.calls if self.calls else 0.0
+
+
+class RequestStats:
+    """
+    Collects latency and error counters per endpoint.
+
+    Every attempt of a request gets recorded, so retried requests count once per attempt. The counters are shared by all
+    threads of a client, therefore they are only updated while holding a lock.
+    """
+
+    def __init__(self) -> None:
+        self.endpoints: Dict[str, EndpointStats] = dict()
+        self.lock: Lock = Lock()
+
+    def record(self, endpoint: str, latency: float, error: bool = False) -> None:
+        """
+        Records one request attempt.
+
+        Parameters:
+            - endpoint: (str) The endpoint that got called
+            - latency: (float) Time in seconds until we got the response (or the error)
+            - error: (bool) Whether the attempt failed
+        """
+        with self.lock:
+            stats: EndpointStats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.calls += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            if error:
+                stats.errors += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns a snapshot of the counters of all endpoints.
+
+        Returns:
+            - {"/api/v3/klines": {"calls": 87, "errors": 0, "average_latency": 0.12, "max_latency": 0.3}, ...}
+        """
+        with self.lock:
+            return {
+                endpoint: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "average_latency": stats.get_average_latency(),
+                    "max_latency": stats.max_latency,
+                }
+                for endpoint, stats in self.endpoints.items()
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.endpoints = dict()
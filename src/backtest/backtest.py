@@ -1,28 +1,34 @@
 import logging
 import os
+import numpy as np
 
 from datetime import datetime, date
 from logging import Logger
 from pathlib import Path
 from plotly.graph_objs import Candlestick, Layout, Figure, Scatter
 from typing import List, Tuple, Union, Dict
-from collections import OrderedDict
+from numpy import ndarray
 from api.binance import Binance
+from backtest.dashboard import SERIES_LINE, SERIES_OHLC, DashboardWriter, aggregate_ohlc, downsample_lttb
 from indicators import SimpleMovingAverage
 from buy_signal import BuySignal
-from uuid import UUID
 from pandas import DataFrame
 from strategies.moving_average_strategy import MovingAverageStrategy
-from transactions import BuyTransaction, SellTransaction
+from profiler import profiler
+from trade_ledger import TradeLedger
 from util import TerminalColors as Color, get_project_root
 
 logger: Logger = logging.getLogger("__main__")
 
 
 class Backtest:
+    # Simulation engines
+    ENGINE_ITERROWS: str = "iterrows"  # Original row by row loop over the candlestick data frame
+    ENGINE_VECTORIZED: str = "vectorized"  # Array based engine, produces exactly the same trades and stats
+    DASHBOARD_MAX_POINTS: int = 5000  # Points per chart line that get displayed at once, zooming shows more details
 
     def __init__(self, symbol: str, api: Union[Binance], strategy: Union[MovingAverageStrategy], capital: float,
-                 buy_quantity: float, kline_limit: int) -> None:
+                 buy_quantity: float, kline_limit: int, engine: str = ENGINE_VECTORIZED, profile: bool = False) -> None:
         # Backtest configuration
         self.symbol = symbol
         self.api: Union[Binance] = api
@@ -30,6 +36,8 @@ class Backtest:
         self.starting_capital: float = capital
         self.buy_quantity: float = buy_quantity
         self.kline_limit: int = kline_limit
+        self.engine: str = engine
+        self.profile: bool = profile  # Records the time and memory of every stage of the run and writes a profile
         # Statistic properties
         self.money_spent: float = 0
         self.money_earned: float = 0
@@ -39,40 +47,103 @@ class Backtest:
         self.coins_in_possession: float = 0
         # Other
         self.capital: float = capital
-        self.buy_signals: OrderedDict[UUID, BuySignal] = OrderedDict()
-        self.buy_transactions: OrderedDict[UUID, BuyTransaction] = OrderedDict()
-        self.sell_transactions: OrderedDict[UUID, SellTransaction] = OrderedDict()
-        self.kept_coins: List[UUID] = list()  # List of coins that we have not sold yet
-        self.capital_over_time: List[Dict[str, Union[UUID, float]]] = list()  # Represents our capital over the time
+        # Times, prices and status of all buy signals (accepted and ignored)
+        self.signal_times: ndarray = np.empty(0)
+        self.signal_prices: ndarray = np.empty(0)
+        self.signal_accepted: ndarray = np.empty(0, dtype=bool)
+        self.ledger: TradeLedger = TradeLedger()  # All buys and sells, tracks the coins we have not sold yet
+        self.capital_over_time: List[Dict[str, float]] = list()  # Represents our capital over the time
         self.candlestick_df: DataFrame = DataFrame()
         self.dashboard_dir: str = os.path.join(get_project_root(), "dashboards/" + self.strategy.name.replace(" ", "_")
                                                + "/" + self.symbol)
 
     def run(self) -> None:
         logger.info("Running backtest...")
+        if self.profile:
+            profiler.enable()
+        try:
+            with profiler.stage("backtest"):
+                # Init some necessary properties to run the backtest
+                with profiler.stage("fetch_data"):
+                    self.candlestick_df: DataFrame = self.api.get_candlestick_data(symbol=self.symbol,
+                                                                                   limit=self.kline_limit)
+                with profiler.stage("add_indicators"):
+                    self.strategy.add_indicators(self.candlestick_df, column_name="close")
+                with profiler.stage("simulate"):
+                    simulated: bool = self.simulate()
+                if not simulated:
+                    return
+
+                self.__create_folder_structure()
+                self.create_html_dashboard()
+                with profiler.stage("print_stats"):
+                    self.print_stats()
+        finally:
+            if self.profile:
+                profiler.disable()
+                self.__write_profile()
+
+    def simulate(self) -> bool:
+        """
+        Simulates the trades of the strategy on the candlestick data, without creating any dashboards or outputs.
 
-        # Init some necessary properties to run the backtest
-        self.candlestick_df: DataFrame = self.api.get_candlestick_data(symbol=self.symbol, limit=self.kline_limit)
-        self.strategy.add_indicators(self.candlestick_df, column_name="close")
-        self.capital_over_time.append({"time": self.candlestick_df["time"][0], "capital": self.capital})
+        The candlestick data frame has to be set and has to contain the indicators of the strategy already.
 
+        Returns:
+            - True if the simulation ran
+            - False in case of an unknown engine
+        """
+        self.capital_over_time.append({"time": self.candlestick_df["time"][0], "capital": self.capital})
+        if self.engine == self.ENGINE_ITERROWS:
+            self.__simulate_iterrows()
+        elif self.engine == self.ENGINE_VECTORIZED:
+            self.__simulate_vectorized()
+        else:
+            logger.error(f"Unknown backtest engine '{self.engine}'")
+            return False
+        return True
+
+    def get_stats(self) -> Dict[str, float]:
+        """Returns the results of the simulation as dict"""
+        return {
+            "capital": self.capital,
+            "money_spent": self.money_spent,
+            "money_earned": self.money_earned,
+            "transaction_costs": self.transaction_costs,
+            "profit": self.money_earned - self.money_spent,
+            "buy_signals_created": len(self.signal_times),
+            "buy_signals_accepted": self.ledger.buy_count,
+            "sell_transactions": self.ledger.sell_count,
+            "coins_bought": self.coins_bought,
+            "coins_sold": self.coins_sold,
+            "coins_in_possession": self.coins_in_possession,
+        }
+
+    def __simulate_iterrows(self) -> None:
+        """Simulates the strategy by iterating over every row of the candlestick data frame"""
+        logger.debug("Simulating trades with the iterrows engine...")
         profit_target_price: float = -1  # Price of our profit goal
         stop_loss_price: float = -1  # Price of our stop loss
+        signal_times: List[float] = list()
+        signal_prices: List[float] = list()
+        signal_accepted: List[bool] = list()
         for index, row in self.candlestick_df.iterrows():
             # Check whether we can buy
             close_price: float = getattr(row, "close")
             time: datetime = getattr(row, "time")
             buy_signal: Union[BuySignal, bool] = self.strategy.check_buy_condition(close_price, time, row)
             if buy_signal:
-                self.buy_signals[buy_signal.signal_id] = buy_signal
+                signal_times.append(time)
+                signal_prices.append(close_price)
+                signal_accepted.append(self.capital >= close_price)
                 if self.capital >= close_price:
-                    self.__buy(buy_signal)
+                    self.__buy(close_price, time)
                     if profit_target_price == -1 and stop_loss_price == -1:
                         profit_target_price = close_price * self.strategy.profit_target
                         stop_loss_price = close_price * self.strategy.stop_loss_target
 
             # Check whether we can sell
-            if self.kept_coins:
+            if self.ledger.open_positions:
                 low_price: float = getattr(row, "low")  # For selling, we inspect the lowest price within the candle
                 if low_price <= stop_loss_price:
                     # If price hits the stop loss -> sell
@@ -85,13 +156,73 @@ class Backtest:
                     profit_target_price = close_price * self.strategy.profit_target
                     stop_loss_price = close_price * self.strategy.stop_loss_target
 
-        self.__create_folder_structure()
-        cs_figure: Figure = self.__create_candlestick_figure()
-        capital_figure: Figure = self.__create_capital_figure()
-        html_figures: str = self.__figures_to_html([cs_figure, capital_figure])
-        html_stats: str = self.__stats_to_html()
-        self.create_html_dashboard(html_figures, html_stats)
-        self.print_stats()
+        self.signal_times = np.array(signal_times, dtype=float)
+        self.signal_prices = np.array(signal_prices, dtype=float)
+        self.signal_accepted = np.array(signal_accepted, dtype=bool)
+
+    def __simulate_vectorized(self) -> None:
+        """
+        Simulates the strategy on plain NumPy arrays instead of data frame rows.
+
+        The buy condition gets evaluated for all candles at once. The profit target/stop loss state machine depends on
+        the previous trades, so it still runs in one loop, but over plain Python floats. As long as we do not hold any
+        coins, nothing can happen until the next buy signal, so the loop jumps straight to it. Buying and selling goes
+        through the same methods as the iterrows engine, which keeps the trades and stats of both engines identical.
+        No signal objects get created, all signals are reported as arrays.
+        """
+        logger.debug("Simulating trades with the vectorized engine...")
+        df: DataFrame = self.candlestick_df
+        signals: ndarray = self.strategy.get_buy_signals(df, column_name="close")
+        candle_count: int = len(df)
+
+        # For every candle, get the index of the next candle (including itself) that holds a buy signal
+        signal_indices: ndarray = np.where(signals, np.arange(candle_count), candle_count)
+        next_signal: List[int] = np.minimum.accumulate(signal_indices[::-1])[::-1].tolist()
+
+        times: List[float] = df["time"].tolist()
+        close_prices: List[float] = df["close"].tolist()
+        low_prices: List[float] = df["low"].tolist()
+        is_signal: List[bool] = signals.tolist()
+        accepted_indices: List[int] = list()
+
+        profit_target_price: float = -1  # Price of our profit goal
+        stop_loss_price: float = -1  # Price of our stop loss
+        index: int = next_signal[0] if candle_count else 0
+        while index < candle_count:
+            close_price: float = close_prices[index]
+            time: float = times[index]
+
+            # Check whether we can buy
+            if is_signal[index] and self.capital >= close_price:
+                accepted_indices.append(index)
+                self.__buy(close_price, time)
+                if profit_target_price == -1 and stop_loss_price == -1:
+                    profit_target_price = close_price * self.strategy.profit_target
+                    stop_loss_price = close_price * self.strategy.stop_loss_target
+
+            # Check whether we can sell
+            if self.ledger.open_positions:
+                if low_prices[index] <= stop_loss_price:
+                    self.__sell(stop_loss_price, time)
+                    profit_target_price = -1
+                    stop_loss_price = -1
+                elif close_price >= profit_target_price != -1:
+                    profit_target_price = close_price * self.strategy.profit_target
+                    stop_loss_price = close_price * self.strategy.stop_loss_target
+
+            # Without coins there is nothing to sell, so skip all candles until the next buy signal
+            if self.ledger.open_positions:
+                index += 1
+            elif index + 1 < candle_count:
+                index = next_signal[index + 1]
+            else:
+                break
+
+        # Report all signals, accepted or not, without creating an object for each of them
+        signal_rows: ndarray = np.flatnonzero(signals)
+        self.signal_times = df["time"].to_numpy(dtype=float)[signal_rows]
+        self.signal_prices = df["close"].to_numpy(dtype=float)[signal_rows]
+        self.signal_accepted = np.isin(signal_rows, accepted_indices)
 
     def print_stats(self) -> None:
         current_price: float = self.api.get_current_price(self.symbol)
@@ -132,9 +263,9 @@ class Backtest:
 
         # Buy stats
         average_buying_price, average_selling_price = self.__get_average_transaction_prices()
-        print(f"Buy signals created: {len(self.buy_signals)}")
-        print(f"Buy signals accepted: {len(self.buy_transactions)}")
-        print(f"Buy signals ignored: {len(self.buy_signals) - len(self.buy_transactions)}")
+        print(f"Buy signals created: {len(self.signal_times)}")
+        print(f"Buy signals accepted: {self.ledger.buy_count}")
+        print(f"Buy signals ignored: {len(self.signal_times) - self.ledger.buy_count}")
         print(f"Coins bought: {round(self.coins_bought, 5)}")
 
         print(f"Average buying price {average_buying_price}€")
@@ -152,7 +283,15 @@ class Backtest:
         print(Color.OKCYAN + "==============================" + Color.ENDC)
         print("")
 
-    def create_html_dashboard(self, html_figures: str, html_stats: str) -> None:
+    def create_html_dashboard(self) -> str:
+        """
+        Writes the dashboard with the charts and stats of the backtest.
+
+        The charts show downsampled data, zooming in shows the full resolution data of the visible range.
+
+        Returns:
+            The path of the dashboard
+        """
         logger.info("Creating backtest dashboard...")
         # Create dashboard name/path based on the date of the backtest
         timestamp: str = datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -166,87 +305,114 @@ class Backtest:
         <h1 style="text-align: center;"><span style="font-size: 24px; font-family: Arial, Helvetica, sans-serif;">{date.today().strftime("%d.%m.%Y")}</span></h1>
         """
 
+        with profiler.stage("create_figures"):
+            figures: List[Tuple[Figure, Dict]] = [self.__create_candlestick_figure(), self.__create_capital_figure()]
+
         # Write content to html file
-        with open(path, "w") as dashboard:
-            dashboard.write("<html><head></head><body>" + "\n")
-            dashboard.write(html_headline)  # add headline
-            dashboard.write(html_figures)  # add plots
-            dashboard.write(html_stats)  # add backtest stats
-            dashboard.write("</body></html>" + "\n")
-
-    def __buy(self, signal: BuySignal) -> None:
-        logger.debug(f"Buy signal accepted! Price: {signal.price}")
-        signal.accepted = True  # Change signal status as accepted
-        price: float = signal.price * self.buy_quantity
+        with profiler.stage("write_dashboard"):
+            with DashboardWriter(path, max_points=self.DASHBOARD_MAX_POINTS) as dashboard:
+                dashboard.write(html_headline)  # add headline
+                for figure, zoom_windows in figures:  # add plots
+                    dashboard.write_figure(figure, zoom_windows)
+                dashboard.write(self.__stats_to_html())  # add backtest stats
+        return path
+
+    def __write_profile(self) -> None:
+        """Prints the time and memory of every stage of the run and writes them into a JSON file next to the dashboard"""
+        path: str = os.path.join(self.dashboard_dir,
+                                 self.symbol + "_" + datetime.now().strftime("%Y%m%d-%H%M%S") + "_profile.json")
+        print(Color.HEADER + "---Profile---" + Color.ENDC)
+        profiler.print_stats()
+        if profiler.write_json(path):
+            print(f"Profile written to {path}")
+        print("")
+
+    def __buy(self, close_price: float, time: float) -> None:
+        logger.debug(f"Buy signal accepted! Price: {close_price}")
+        price: float = close_price * self.buy_quantity
         buy_quantity: float = self.buy_quantity - (self.buy_quantity * self.api.trading_fee)  # 0.1% transaction fee
-        transaction: BuyTransaction = BuyTransaction(signal.signal_id, self.symbol, price, buy_quantity, signal.time)
-        self.__update_stats(True, transaction)
-        self.kept_coins.append(signal.signal_id)
+        transaction_cost: float = buy_quantity * self.api.trading_fee
+        self.ledger.add_buy(time, close_price, buy_quantity, price, transaction_cost)
+        self.__update_stats(True, price, buy_quantity, transaction_cost)
         self.coins_in_possession += buy_quantity
         # Add time of buy and capital to the list of capital over time
-        self.capital_over_time.append({"time": signal.time, "capital": self.capital})
+        self.capital_over_time.append({"time": time, "capital": self.capital})
 
-    def __sell(self, price: float, time: datetime) -> None:
-        for coin_id in self.kept_coins.copy():
-            logger.debug(f"Selling coin '{coin_id}' for {price}")
-            buy_transaction: BuyTransaction = self.buy_transactions.get(coin_id)  # Get corresponding buy transaction
+    def __sell(self, price: float, time: float) -> None:
+        # Sell the open positions in the order we bought them
+        for position_id, buy_quantity in list(self.ledger.open_positions.items()):
+            logger.debug(f"Selling coin '{position_id}' for {price}")
             # We bought 1 BTC for which we actually got 0.999 BTC because of the trading fee
             # At the time, 1 BTC costs xxx €. Now we want to sell those 0.999 BTC that we bought, so we would earn
             # 0.999 BTC * xxx € - transaction fee
-            sell_quantity: float = buy_transaction.buy_quantity  # We bought 0.999 BTC
+            sell_quantity: float = buy_quantity  # We bought 0.999 BTC
             transaction_cost: float = sell_quantity * price * self.api.trading_fee  # Costs of the fee
             sell_price: float = sell_quantity * price - transaction_cost  # Price we get in Euros
-            sell_transaction: SellTransaction = SellTransaction(coin_id, self.symbol, sell_quantity, sell_price, time)
-            self.__update_stats(False, sell_transaction, transaction_cost)
-            self.kept_coins.remove(coin_id)
+            self.ledger.add_sell(position_id, time, price, sell_quantity, sell_price, transaction_cost)
+            self.__update_stats(False, sell_price, sell_quantity, transaction_cost)
             self.coins_in_possession -= sell_quantity
             # Add time of sell and new capital to the list of capital over time
             self.capital_over_time.append({"time": time, "capital": self.capital})
 
-    def __create_candlestick_figure(self) -> Figure:
-        """Creates a candlestick figure that visualizes the market data of the backtest including the signals"""
-        df = self.candlestick_df  # Access candlestick frame which gets hold by the market data object
+    def __create_candlestick_figure(self) -> Tuple[Figure, Dict[int, Tuple[str, Dict[str, ndarray]]]]:
+        """
+        Creates a candlestick figure that visualizes the market data of the backtest including the signals.
 
-        # Plot candlestick chart
+        Returns:
+            The figure with the downsampled candles and indicators, and the full resolution data of those traces
+        """
+        df = self.candlestick_df  # Access candlestick frame which gets hold by the market data object
+        max_points: int = self.DASHBOARD_MAX_POINTS
+        columns: Dict[str, ndarray] = {
+            "x": df["time"].to_numpy(dtype=float),
+            "open": df["open"].to_numpy(dtype=float),
+            "high": df["high"].to_numpy(dtype=float),
+            "low": df["low"].to_numpy(dtype=float),
+            "close": df["close"].to_numpy(dtype=float),
+        }
+        zoom_windows: Dict[int, Tuple[str, Dict[str, ndarray]]] = dict()
+        downsampled: bool = len(df) > max_points
+
+        # Plot candlestick chart, with one candle per bucket of candles if there are too many
+        times, opens, highs, lows, closes = aggregate_ohlc(columns["x"], columns["open"], columns["high"],
+                                                           columns["low"], columns["close"], max_points)
         candle: Candlestick = Candlestick(
-            x=df["time"],
-            open=df["open"],
-            close=df["close"],
-            high=df["high"],
-            low=df["low"],
+            x=times,
+            open=opens,
+            close=closes,
+            high=highs,
+            low=lows,
             name="Candlesticks"
         )
         data: List[object] = [candle]
+        if downsampled:
+            zoom_windows[0] = (SERIES_OHLC, columns)
 
         # Loop through all indicators of the market data and plot them
         for indicator in self.strategy.indicators:
             # Smoothed moving average
             if type(indicator) == SimpleMovingAverage:
+                values: ndarray = df[indicator.name].to_numpy(dtype=float)
+                selected: ndarray = downsample_lttb(columns["x"], values, max_points)
                 sma: Scatter = Scatter(
-                    x=df["time"],
-                    y=df[indicator.name],
+                    x=columns["x"][selected],
+                    y=values[selected],
                     name=indicator.name,
                     line=dict(color="rgba(255, 207, 102, 1)")
                 )
+                if downsampled:
+                    zoom_windows[len(data)] = (SERIES_LINE, {"x": columns["x"], "y": values})
                 data.append(sma)
             # Continue with other indicator types for plotting:
             # if type(indicator) == Indicator...
 
         # Plot buy signals if we have some
-        if self.buy_signals:
-            # Create lists that hold the values of accepted and ignored signals
-            accepted_times: List[datetime] = list()
-            accepted_prices: List[float] = list()
-            ignored_times: List[datetime] = list()
-            ignored_prices: List[float] = list()
-            # Loop through all of them and sort them into the right lists
-            for signal_id, signal in self.buy_signals.items():
-                if signal.accepted:
-                    accepted_times.append(signal.time)
-                    accepted_prices.append(signal.price)
-                else:
-                    ignored_times.append(signal.time)
-                    ignored_prices.append(signal.price)
+        if len(self.signal_times):
+            # Split the signals into accepted and ignored ones
+            accepted_times: ndarray = self.signal_times[self.signal_accepted]
+            accepted_prices: ndarray = self.signal_prices[self.signal_accepted]
+            ignored_times: ndarray = self.signal_times[~self.signal_accepted]
+            ignored_prices: ndarray = self.signal_prices[~self.signal_accepted]
 
             # Create plot for the accepted signals
             accepted_buy_signals: Scatter = Scatter(
@@ -268,15 +434,11 @@ class Backtest:
             data.append(ignored_buy_signals)
 
         # Plot points where we sold coins
-        if self.sell_transactions:
-            times: List[datetime] = list()
-            prices: List[float] = list()
-            for trans_id, trans in self.sell_transactions.items():
-                times.append(trans.time)
-                prices.append(trans.sell_price / self.buy_quantity)
+        if self.ledger.sell_count:
+            sell_df: DataFrame = self.ledger.get_trades(TradeLedger.SIDE_SELL)
             sells: Scatter = Scatter(
-                x=times,
-                y=prices,
+                x=sell_df["time"],
+                y=sell_df["amount"] / self.buy_quantity,
                 name="Sell Orders",
                 mode="markers",
                 line=dict(color="rgba(139, 69, 19, 1)")  # Brown
@@ -297,20 +459,28 @@ class Backtest:
         )
         # Create figure and plot it
         figure: Figure = Figure(data=data, layout=layout)
-        return figure
+        return figure, zoom_windows
 
-    def __create_capital_figure(self) -> Figure:
+    def __create_capital_figure(self) -> Tuple[Figure, Dict[int, Tuple[str, Dict[str, ndarray]]]]:
+        """
+        Creates a plotly figure that represents our capital over the time of the backtest.
+
+        Returns:
+            The figure with the downsampled capital line, and the full resolution data of the line
+        """
         # Get last entry of our market data and add its time and our current capital to the dict so the chart will not
         # end at the time of the last transaction
         last_time: datetime = self.candlestick_df["time"].iloc[-1]
         self.capital_over_time.append({"time": last_time, "capital": self.capital})
         capitals_df: DataFrame = DataFrame(self.capital_over_time, columns=["time", "capital"])
-        capitals_df = capitals_df.sort_values(by=["time"])
+        capitals_df = capitals_df.sort_values(by=["time"], kind="mergesort")
+        times: ndarray = capitals_df["time"].to_numpy(dtype=float)
+        capitals: ndarray = capitals_df["capital"].to_numpy(dtype=float)
+        selected: ndarray = downsample_lttb(times, capitals, self.DASHBOARD_MAX_POINTS)
 
-        """Creates a plotly figure that represents our capital over the time of the backtest"""
         capital_line: Scatter = Scatter(
-            x=capitals_df["time"],
-            y=capitals_df["capital"],
+            x=times[selected],
+            y=capitals[selected],
             name="Capital",
             line=dict(color="rgba(0, 0, 255, 1)")
         )
@@ -326,25 +496,31 @@ class Backtest:
             }
         )
         figure: Figure = Figure(capital_line, layout=layout)
-        return figure
+        zoom_windows: Dict[int, Tuple[str, Dict[str, ndarray]]] = dict()
+        if len(selected) < len(times):
+            zoom_windows[0] = (SERIES_LINE, {"x": times, "y": capitals})
+        return figure, zoom_windows
 
-    def __update_stats(self, is_buy: bool, transaction: Union[BuyTransaction, SellTransaction],
-                       transaction_cost: float = None):
-        """Updates all properties that are necessary for generating backtest stats"""
+    def __update_stats(self, is_buy: bool, amount: float, quantity: float, transaction_cost: float) -> None:
+        """
+        Updates all properties that are necessary for generating backtest stats.
+
+        Parameters:
+            - is_buy: (bool) Whether the trade was a buy or a sell
+            - amount: (float) Euros we paid or got
+            - quantity: (float) Coins we got or sold
+            - transaction_cost: (float) Costs of the trading fee
+        """
         if is_buy:
-            assert type(transaction) == BuyTransaction
-            self.capital -= transaction.buy_price
-            self.coins_bought += transaction.buy_quantity
-            self.transaction_costs += transaction.buy_quantity * self.api.trading_fee
-            self.money_spent += transaction.buy_price
-            self.buy_transactions[transaction.transaction_id] = transaction  # Add to dict of buy transactions
+            self.capital -= amount
+            self.coins_bought += quantity
+            self.transaction_costs += transaction_cost
+            self.money_spent += amount
         else:
-            assert type(transaction) == SellTransaction
-            self.capital += transaction.sell_price  # We got xxx euros for selling xxx coins
-            self.coins_sold += transaction.sell_quantity  # We sold xxx coins
+            self.capital += amount  # We got xxx euros for selling xxx coins
+            self.coins_sold += quantity  # We sold xxx coins
             self.transaction_costs += transaction_cost
-            self.money_earned += transaction.sell_price
-            self.sell_transactions[transaction.transaction_id] = transaction  # Add to dict of sell transactions
+            self.money_earned += amount
 
     def __create_folder_structure(self):
         """
@@ -356,12 +532,12 @@ class Backtest:
         Path(self.dashboard_dir).mkdir(parents=True, exist_ok=True)
 
     def __get_average_transaction_prices(self) -> Tuple[float, float]:
-        if self.buy_transactions:
-            average_buying_price: float = round(self.money_spent / len(self.buy_transactions), 2)
+        if self.ledger.buy_count:
+            average_buying_price: float = round(self.money_spent / self.ledger.buy_count, 2)
         else:
             average_buying_price = 0.0
-        if self.sell_transactions:
-            average_selling_price: float = round(self.money_earned / len(self.sell_transactions), 2)
+        if self.ledger.sell_count:
+            average_selling_price: float = round(self.money_earned / self.ledger.sell_count, 2)
         else:
             average_selling_price = 0.0
         return average_buying_price, average_selling_price
@@ -379,9 +555,9 @@ class Backtest:
         money_earned_var = round(self.money_earned, 2)
         transaction_fees_var = round(self.transaction_costs, 2)
         profit_var = round(self.money_earned - self.money_spent, 2)
-        buy_signals_created_var = len(self.buy_signals)
-        buy_signals_accepted_var = len(self.buy_transactions)
-        buy_signals_ignored_var = len(self.buy_signals) - len(self.buy_transactions)
+        buy_signals_created_var = len(self.signal_times)
+        buy_signals_accepted_var = self.ledger.buy_count
+        buy_signals_ignored_var = len(self.signal_times) - self.ledger.buy_count
         coins_bought_var = round(self.coins_bought, 5)
         coins_sold_var = round(self.coins_sold, 5)
         coins_not_sold_var = round(self.coins_in_possession, 5)
@@ -396,12 +572,3 @@ class Backtest:
         # Substitute variables in html code with local variables from here
         html_code = html_code.format(**locals())
         return html_code
-
-    @staticmethod
-    def __figures_to_html(figures: List[Figure]) -> str:
-        """Creates a single HTML file from a list of plotly figures"""
-        logger.debug("Converting plot figures to html code...")
-        inner_html: str = ""
-        for figure in figures:
-            inner_html = inner_html + figure.to_html().split('<body>')[1].split('</body>')[0]
-        return inner_html
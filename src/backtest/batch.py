@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from logging import Logger
+from typing import Any, Dict, List, Tuple, Type, Union
+from pandas import DataFrame
+from api.binance import Binance
+from backtest import shared_candles
+from backtest.backtest import Backtest
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+logger: Logger = logging.getLogger("__main__")
+
+# Strategies a batch configuration can refer to
+STRATEGIES: Dict[str, Type] = {
+    "moving_average": MovingAverageStrategy,
+}
+# Time frames a batch configuration can refer to, as number of 1h candles
+TIME_FRAMES: Dict[str, int] = {
+    "one_month": 720,
+    "three_months": 2160,
+    "six_months": 4320,
+    "one_year": 8640,
+}
+
+
+class BatchRunner:
+    """
+    Runs a batch of backtest configurations without any user interaction.
+
+    The configurations get grouped by their candle data (symbol, interval and end time). The candles of every group get
+    collected once, with the kline limit of the largest configuration of the group, and are put into shared memory.
+    The backtests then run across a pool of processes, every configuration takes the candles it needs from the end of
+    the candles of its group. The stats of every backtest end up in one JSON summary.
+
+    A batch file is a JSON list of configurations, or an object with the list in "backtests" and values every
+    configuration falls back to in "defaults":
+    {
+        "defaults": {"strategy": "moving_average", "capital": 100000, "buy_quantity": 0.5, "time_frame": "one_year"},
+        "backtests": [
+            {"name": "btc_default", "symbol": "BTCEUR"},
+            {"symbol": "ETHEUR", "parameters": {"profit_target": 1.03, "sma_period": 100}, "kline_limit": 5000}
+        ]
+    }
+    """
+    STATUS_OK: str = "ok"
+    STATUS_FAILED: str = "failed"
+
+    def __init__(self, configs: List[Dict[str, Any]], api: Union[Binance], workers: int = None) -> None:
+        """
+        Parameters:
+            - configs: (List[Dict]) The backtest configurations (see class documentation)
+            - api: The api we collect the candlestick data from
+            - workers: (int) Number of worker processes, defaults to the number of CPUs
+        """
+        self.configs: List[Dict[str, Any]] = configs
+        self.api: Union[Binance] = api
+        self.workers: int = workers or os.cpu_count() or 1
+
+    @staticmethod
+    def load_configs(path: str) -> Union[List[Dict[str, Any]], bool]:
+        """
+        Reads the configurations of a batch file and applies its defaults.
+
+        Returns:
+            - The configurations
+            - False if the file could not be read
+        """
+        try:
+            with open(path, "r") as file:
+                batch: Union[Dict[str, Any], List[Dict[str, Any]]] = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read batch file {path}: {e}")
+            return False
+        if isinstance(batch, list):
+            batch = {"backtests": batch}
+        defaults: Dict[str, Any] = batch.get("defaults", dict())
+        configs: List[Dict[str, Any]] = batch.get("backtests")
+        if not isinstance(configs, list):
+            logger.error(f"Batch file {path} does not contain a list of backtests")
+            return False
+        return [{**defaults, **config} for config in configs]
+
+    @staticmethod
+    def validate_config(config: Dict[str, Any]) -> Union[Dict[str, Any], str]:
+        """
+        Checks a configuration and fills in the default values.
+
+        Returns:
+            - The complete configuration
+            - The error message if the configuration is invalid
+        """
+        if not config.get("symbol"):
+            return "Missing symbol"
+        strategy: str = config.get("strategy", "moving_average")
+        if strategy not in STRATEGIES:
+            return f"Unknown strategy {strategy}, choose from {', '.join(STRATEGIES)}"
+        kline_limit: Union[int, float, None] = config.get("kline_limit")
+        if kline_limit is None:
+            time_frame: str = config.get("time_frame", "one_year")
+            if time_frame not in TIME_FRAMES:
+                return f"Unknown time frame {time_frame}, choose from {', '.join(TIME_FRAMES)} or set kline_limit"
+            kline_limit = TIME_FRAMES[time_frame]
+        # JSON files may hold whole numbers as floats (e.g. 5000.0), but a bool is no number of klines
+        if isinstance(kline_limit, float) and kline_limit.is_integer():
+            kline_limit = int(kline_limit)
+        if isinstance(kline_limit, bool) or not isinstance(kline_limit, int) or kline_limit <= 0:
+            return f"Invalid kline limit {kline_limit}"
+        parameters: Dict[str, Any] = config.get("parameters", dict())
+        try:
+            STRATEGIES[strategy](**parameters)
+        except TypeError as e:
+            return f"Invalid strategy parameters: {e}"
+        try:
+            capital: float = float(config.get("capital", 100000.0))
+            buy_quantity: float = float(config.get("buy_quantity", 1.0))
+        except (TypeError, ValueError) as e:
+            return f"Invalid capital or buy quantity: {e}"
+        return {
+            **config,
+            "strategy": strategy,
+            "parameters": parameters,
+            "interval": config.get("interval", "1h"),
+            "end_time": config.get("end_time"),
+            "kline_limit": kline_limit,
+            "capital": capital,
+            "buy_quantity": buy_quantity,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Runs all backtests of the batch.
+
+        Returns:
+            Summary holding the result of every configuration (in the order of the configurations), with its stats if
+            the backtest ran or its error if it failed
+        """
+        start: float = time.perf_counter()
+        results: List[Dict[str, Any]] = [dict() for _ in self.configs]
+        configs: Dict[int, Dict[str, Any]] = dict()
+        for index, config in enumerate(self.configs):
+            validated: Union[Dict[str, Any], str] = self.validate_config(config)
+            if isinstance(validated, str):
+                logger.error(f"Invalid backtest configuration {index}: {validated}")
+                results[index] = self.__get_result(index, config, self.STATUS_FAILED, error=validated)
+            else:
+                configs[index] = validated
+
+        # Group the configurations by the candles they run on
+        groups: Dict[str, List[int]] = dict()
+        for index, config in configs.items():
+            groups.setdefault(_get_group(config), list()).append(index)
+        logger.info(f"Running {len(configs)} backtests on {len(groups)} candle data sets with {self.workers} "
+                    f"workers...")
+
+        # Collect the candles of every group once, with the largest kline limit of the group
+        with ThreadPoolExecutor(max_workers=max(1, min(4, len(groups)))) as executor:
+            candles: List[Union[DataFrame, bool]] = list(executor.map(
+                lambda indices: self.__get_candles(configs[indices[0]],
+                                                   max(configs[index]["kline_limit"] for index in indices)),
+                groups.values()))
+        frames: Dict[str, DataFrame] = dict()
+        tasks: List[Tuple[int, Dict[str, Any]]] = list()
+        for (group, indices), df in zip(groups.items(), candles):
+            if not isinstance(df, DataFrame):
+                for index in indices:
+                    results[index] = self.__get_result(index, configs[index], self.STATUS_FAILED,
+                                                       error="Missing candlestick data")
+                continue
+            frames[group] = df
+            tasks.extend((index, configs[index]) for index in indices)
+
+        # Run the backtests, sorted so configurations that share their indicators end up in the same chunk
+        tasks.sort(key=lambda task: self.__get_indicator_key(task[1]))
+        chunk_size: int = max(1, min(32, len(tasks) // (self.workers * 4)))
+        chunks: List[List[Tuple[int, Dict[str, Any]]]] = [tasks[i:i + chunk_size]
+                                                          for i in range(0, len(tasks), chunk_size)]
+        if chunks:
+            with shared_candles.share_candles(frames) as segments:
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=shared_candles.init_worker,
+                                         initargs=(segments, {"trading_fee": self.api.trading_fee})) as executor:
+                    for chunk_results in executor.map(_run_backtests, chunks):
+                        for index, result in chunk_results:
+                            results[index] = result
+
+        failed: int = sum(result["status"] != self.STATUS_OK for result in results)
+        return {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "backtests": len(results),
+            "failed": failed,
+            "duration": time.perf_counter() - start,
+            "results": results,
+        }
+
+    def __get_candles(self, config: Dict[str, Any], kline_limit: int) -> Union[DataFrame, bool]:
+        df: Union[DataFrame, bool] = self.api.get_candlestick_data(symbol=config["symbol"], interval=config["interval"],
+                                                                   end_time=config["end_time"], limit=kline_limit)
+        if not isinstance(df, DataFrame):
+            logger.error(f"Missing candlestick data of {config['symbol']}")
+        return df
+
+    @staticmethod
+    def __get_indicator_key(config: Dict[str, Any]) -> Tuple:
+        return _get_indicator_key(config, STRATEGIES[config["strategy"]](**config["parameters"]))
+
+    @staticmethod
+    def __get_result(index: int, config: Dict[str, Any], status: str, error: str = None) -> Dict[str, Any]:
+        return {"index": index, "name": config.get("name"), "config": config, "status": status, "error": error}
+
+
+def write_summary(summary: Dict[str, Any], path: str) -> bool:
+    """
+    Writes the summary of a batch into a JSON file.
+
+    Returns:
+        False if the file could not be written
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(summary, file, indent=2, default=float)
+    except OSError as e:
+        logger.error(f"Could not write batch summary to {path}: {e}")
+        return False
+    return True
+
+
+def _get_group(config: Dict[str, Any]) -> str:
+    """Configurations of the same group run on the same candles"""
+    return f"{config['symbol']}_{config['interval']}_{config['end_time']}"
+
+
+def _get_indicator_key(config: Dict[str, Any], strategy) -> Tuple:
+    """Configurations with the same key run on the same candles with the same indicator values"""
+    return (config["symbol"], config["interval"], str(config["end_time"]), config["kline_limit"], config["strategy"],
+            *(getattr(strategy, name) for name in strategy.INDICATOR_PARAMETERS))
+
+
+def _run_backtests(tasks: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+    """Runs the backtests of a chunk of configurations in a worker process"""
+    api: Binance = shared_candles.get_api()
+    results: List[Tuple[int, Dict[str, Any]]] = list()
+    for index, config in tasks:
+        start: float = time.perf_counter()
+        result: Dict[str, Any] = {"index": index, "name": config.get("name"), "config": config}
+        try:
+            strategy = STRATEGIES[config["strategy"]](**config["parameters"])
+            backtest: Backtest = Backtest(config["symbol"], api, strategy, config["capital"], config["buy_quantity"],
+                                          config["kline_limit"])
+            backtest.candlestick_df = shared_candles.get_candles_with_indicators(_get_group(config), strategy,
+                                                                                 config["kline_limit"])
+            if not backtest.simulate():
+                raise ValueError("Simulation failed")
+        except Exception as e:  # A broken configuration must not stop the rest of the batch
+            logger.error(f"Backtest {index} failed: {e}")
+            result.update({"status": BatchRunner.STATUS_FAILED, "error": f"{type(e).__name__}: {e}"})
+        else:
+            result.update({"status": BatchRunner.STATUS_OK, "error": None, "stats": backtest.get_stats()})
+        result["duration"] = time.perf_counter() - start
+        results.append((index, result))
+    return results
+
@@ -0,0 +1,249 @@
+import base64
+import json
+import logging
+import uuid
+import numpy as np
+
+from logging import Logger
+from typing import Dict, List, TextIO, Tuple, Union
+from numpy import ndarray
+from plotly.graph_objs import Figure
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+logger: Logger = logging.getLogger("__main__")
+
+# Kinds of full resolution series the zoom windows can show
+SERIES_OHLC: str = "ohlc"  # Candlestick trace with x, open, high, low and close
+SERIES_LINE: str = "line"  # Scatter trace with x and y
+
+# Swaps the data of the traces to the full resolution data of the visible range whenever the user zooms. If the visible
+# range holds more points than can be displayed, the candles get aggregated per bucket and the lines get thinned out.
+ZOOM_SCRIPT: str = """
+<script type="text/javascript">
+function decodeSeries(encoded) {
+    var binary = atob(encoded), bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return new Float64Array(bytes.buffer);
+}
+function findIndex(values, target) {
+    var low = 0, high = values.length;
+    while (low < high) {
+        var middle = (low + high) >> 1;
+        if (values[middle] < target) low = middle + 1; else high = middle;
+    }
+    return low;
+}
+function getZoomWindow(series, first, last, maxPoints) {
+    var step = Math.max(1, Math.ceil((last - first) / maxPoints)), window = {};
+    if (series.kind === "ohlc") {
+        window = {x: [], open: [], high: [], low: [], close: []};
+        for (var start = first; start < last; start += step) {
+            var end = Math.min(start + step, last), high = -Infinity, low = Infinity;
+            for (var i = start; i < end; i++) {
+                high = Math.max(high, series.high[i]);
+                low = Math.min(low, series.low[i]);
+            }
+            window.x.push(series.x[start]);
+            window.open.push(series.open[start]);
+            window.high.push(high);
+            window.low.push(low);
+            window.close.push(series.close[end - 1]);
+        }
+    } else {
+        window = {x: [], y: []};
+        for (var i = first; i < last; i += step) {
+            window.x.push(series.x[i]);
+            window.y.push(series.y[i]);
+        }
+    }
+    return window;
+}
+function attachZoomWindows(plot, encodedSeries, maxPoints) {
+    var series = {}, overview = {}, traces = Object.keys(encodedSeries).map(Number);
+    traces.forEach(function (trace) {
+        series[trace] = {kind: encodedSeries[trace].kind};
+        Object.keys(encodedSeries[trace].columns).forEach(function (column) {
+            series[trace][column] = decodeSeries(encodedSeries[trace].columns[column]);
+        });
+        overview[trace] = {};
+        Object.keys(encodedSeries[trace].columns).forEach(function (column) {
+            overview[trace][column] = plot.data[trace][column];
+        });
+    });
+    plot.on("plotly_relayout", function (event) {
+        var range = event["xaxis.range"] || (event["xaxis.range[0]"] !== undefined
+            ? [event["xaxis.range[0]"], event["xaxis.range[1]"]] : null);
+        if (!range && !event["xaxis.autorange"]) return;
+        traces.forEach(function (trace) {
+            var window = overview[trace];
+            if (range) {
+                var start = new Date(String(range[0]).replace(" ", "T") + "Z").getTime();
+                var end = new Date(String(range[1]).replace(" ", "T") + "Z").getTime();
+                var first = Math.max(0, findIndex(series[trace].x, start) - 1);
+                var last = Math.min(series[trace].x.length, findIndex(series[trace].x, end) + 1);
+                window = getZoomWindow(series[trace], first, last, maxPoints);
+            }
+            var update = {};
+            Object.keys(window).forEach(function (column) { update[column] = [window[column]]; });
+            Plotly.restyle(plot, update, [trace]);
+        });
+    });
+}
+</script>
+"""
+
+
+def aggregate_ohlc(times: ndarray, open_: ndarray, high: ndarray, low: ndarray, close: ndarray, max_points: int
+                   ) -> Tuple[ndarray, ndarray, ndarray, ndarray, ndarray]:
+    """
+    Aggregates candles into at most 'max_points' buckets of consecutive candles.
+
+    Every bucket becomes one candle with the time and open of its first candle, the highest high, the lowest low and
+    the close of its last candle, so the aggregated chart still shows every price extreme.
+
+    Returns:
+        The times, opens, highs, lows and closes of the buckets
+    """
+    if len(times) <= max_points:
+        return times, open_, high, low, close
+    starts: ndarray = np.unique(np.linspace(0, len(times), max_points, endpoint=False).astype(np.int64))
+    ends: ndarray = np.append(starts[1:], len(times)) - 1
+    return (times[starts], open_[starts], np.maximum.reduceat(high, starts), np.minimum.reduceat(low, starts),
+            close[ends])
+
+
+def downsample_lttb(x: ndarray, y: ndarray, max_points: int) -> ndarray:
+    """
+    Selects the points of a line that keep its visual shape, with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last point are always kept. The points in between get split into buckets, from every bucket the point
+    is taken that forms the largest triangle with the point selected from the previous bucket and the average of the
+    next bucket.
+
+    Parameters:
+        - x: (ndarray) X values of the line (sorted)
+        - y: (ndarray) Y values of the line
+        - max_points: (int) Number of points to select, at least 3
+
+    Returns:
+        The indices of the selected points
+    """
+    count: int = len(x)
+    if count <= max_points or max_points < 3:
+        return np.arange(count)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bounds: ndarray = np.linspace(1, count - 1, max_points - 1).astype(np.int64)  # Buckets between first and last
+    # Averages of all buckets, the last point serves as average of the bucket after the last one
+    valid: ndarray = ~(np.isnan(x) | np.isnan(y))
+    counts: ndarray = np.add.reduceat(valid, bounds[:-1]).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average_x: List[float] = (np.add.reduceat(np.where(valid, x, 0.0), bounds[:-1]) / counts).tolist()
+        average_y: List[float] = (np.add.reduceat(np.where(valid, y, 0.0), bounds[:-1]) / counts).tolist()
+    average_x.append(float(x[-1]))
+    average_y.append(float(y[-1]))
+
+    selected: ndarray = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    previous: int = 0
+    for bucket in range(max_points - 2):
+        first, last = bounds[bucket], bounds[bucket + 1]
+        previous_x, previous_y = x[previous], y[previous]
+        # Twice the area of the triangles (previous point, candidate, average of the next bucket)
+        areas: ndarray = np.abs((previous_x - average_x[bucket + 1]) * (y[first:last] - previous_y)
+                                - (previous_x - x[first:last]) * (average_y[bucket + 1] - previous_y))
+        areas[np.isnan(areas)] = -1.0
+        previous = first + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+class DashboardWriter:
+    """
+    Writes an HTML dashboard of plotly figures as a stream.
+
+    Plotly.js gets embedded (or referenced from the CDN) once for the whole dashboard instead of once per figure. Every
+    part of the dashboard gets written to the file right away, so the dashboard never has to be held in memory as one
+    string. Figures should hold downsampled traces, the full resolution data of those traces can be attached as zoom
+    windows. It gets embedded in binary form and replaces the downsampled data of the visible range whenever the user
+    zooms in.
+    """
+    PLOTLYJS_INLINE: str = "inline"
+    PLOTLYJS_CDN: str = "cdn"
+    ENCODING_CHUNK: int = 3 * 1024 * 1024  # Bytes per base64 chunk, a multiple of 3 so the chunks can be concatenated
+
+    def __init__(self, path: str, max_points: int = 5000, plotlyjs: str = PLOTLYJS_INLINE) -> None:
+        """
+        Parameters:
+            - path: (str) Path of the HTML file
+            - max_points: (int) Maximum number of points per trace that get displayed at once
+            - plotlyjs: (str) Whether plotly.js gets embedded into the file or loaded from the CDN
+        """
+        self.path: str = path
+        self.max_points: int = max_points
+        self.plotlyjs: str = plotlyjs
+        self.file: Union[TextIO, None] = None
+
+    def __enter__(self) -> "DashboardWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def open(self) -> None:
+        logger.debug(f"Writing dashboard to {self.path}...")
+        self.file = open(self.path, "w")
+        self.file.write("<html><head><meta charset=\"utf-8\" />\n")
+        if self.plotlyjs == self.PLOTLYJS_CDN:
+            self.file.write(f"<script src=\"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js\"></script>\n")
+        else:
+            self.file.write("<script type=\"text/javascript\">")
+            self.file.write(get_plotlyjs())
+            self.file.write("</script>\n")
+        self.file.write(ZOOM_SCRIPT)
+        self.file.write("</head><body>\n")
+
+    def close(self) -> None:
+        if self.file:
+            self.file.write("</body></html>\n")
+            self.file.close()
+            self.file = None
+
+    def write(self, html: str) -> None:
+        """Writes HTML code into the body of the dashboard"""
+        self.file.write(html)
+
+    def write_figure(self, figure: Figure, zoom_windows: Dict[int, Tuple[str, Dict[str, ndarray]]] = None) -> None:
+        """
+        Writes a figure into the dashboard.
+
+        Parameters:
+            - figure: (Figure) The figure holding the (downsampled) traces
+            - zoom_windows: Full resolution data per trace index, as kind of series (SERIES_OHLC or SERIES_LINE) and
+                            its columns, e.g. {0: (SERIES_OHLC, {"x": times, "open": opens, ...})}
+        """
+        post_script: Union[str, None] = None
+        if zoom_windows:
+            # The range slider would only show the zoom window, so it gets hidden
+            figure.update_layout(xaxis={"rangeslider": {"visible": False}})
+            variable: str = "zoomWindows_" + uuid.uuid4().hex
+            self.__write_series(variable, zoom_windows)
+            post_script = f"attachZoomWindows(document.getElementById('{{plot_id}}'), {variable}, {self.max_points});"
+        self.file.write(figure.to_html(include_plotlyjs=False, full_html=False, post_script=post_script))
+        self.file.write("\n")
+
+    def __write_series(self, variable: str, zoom_windows: Dict[int, Tuple[str, Dict[str, ndarray]]]) -> None:
+        """Writes the full resolution data as base64 encoded float64 arrays, chunk by chunk"""
+        self.file.write(f"<script type=\"text/javascript\">var {variable} = {{")
+        for trace, (kind, columns) in zoom_windows.items():
+            self.file.write(f"{json.dumps(str(trace))}: {{\"kind\": {json.dumps(kind)}, \"columns\": {{")
+            for position, (column, values) in enumerate(columns.items()):
+                self.file.write(("," if position else "") + json.dumps(column) + ": \"")
+                data: memoryview = memoryview(np.ascontiguousarray(values, dtype="<f8")).cast("B")
+                for start in range(0, len(data), self.ENCODING_CHUNK):
+                    self.file.write(base64.b64encode(data[start:start + self.ENCODING_CHUNK]).decode("ascii"))
+                self.file.write("\"")
+            self.file.write("}},")
+        self.file.write("};</script>\n")
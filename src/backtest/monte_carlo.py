@@ -0,0 +1,356 @@
+import contextlib
+import logging
+import numpy as np
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from logging import Logger
+from typing import Any, Dict, List, Type, Union
+from numpy import ndarray
+from pandas import DataFrame, concat
+from api.binance import Binance
+from backtest import shared_candles
+from backtest.backtest import Backtest
+from backtest.parameter_sweep import ParameterSweep
+from strategies.moving_average_strategy import MovingAverageStrategy
+from trade_ledger import TradeLedger
+from util import TerminalColors as Color
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class MonteCarlo:
+    """
+    Monte Carlo robustness analysis of one parameter combination of a strategy.
+
+    A single backtest is one equity path out of many that the market could have taken. Two kinds of simulations show
+    how much the result depends on that path:
+        - Trade resampling: the round trips of the backtest get drawn with replacement into new trade sequences. This
+          shows the spread of the results if the same trades had come in a different order and mix. It only needs the
+          trades of one backtest, so all simulations run at once as arrays in the main process.
+        - Block bootstrap: new candle histories get built from blocks of consecutive candles of the real history, drawn
+          with replacement. Blocks keep short term patterns (e.g. trends and volatility clusters) intact, while the
+          sequence of market regimes changes. The strategy then gets backtested on every new history, across the
+          worker processes of a parameter sweep pool, so the candles are shared and never get pickled.
+
+    The block bootstrap values the coins we hold at the close of every candle, so its drawdowns are the ones of the
+    backtest. Trade resampling only knows the round trips, so its drawdowns are measured after every round trip and
+    are compared with the drawdown of the backtest measured the same way (they are lower, because the drops while
+    positions are open get missed). Every simulation draws from its own random generator seeded with (seed,
+    simulation), so the results do not depend on the number of workers and can be reproduced.
+    """
+    METHOD_TRADES: str = "trade_resampling"
+    METHOD_BLOCK_BOOTSTRAP: str = "block_bootstrap"
+    # Stats per method, the backtest gets measured like the simulations of the method
+    STATS: Dict[str, List[str]] = {
+        METHOD_TRADES: ["final_capital", "profit", "max_round_trip_drawdown"],
+        METHOD_BLOCK_BOOTSTRAP: ["final_capital", "profit", "max_drawdown"],
+    }
+    PERCENTILES: List[int] = [5, 25, 50, 75, 95]
+    TRADE_BATCH_SIZE: int = 1000000  # Maximum number of resampled trades that are held in memory at once
+
+    def __init__(self, symbol: str, api: Union[Binance], capital: float, buy_quantity: float, kline_limit: int,
+                 parameters: Dict[str, Any], strategy_class: Type = MovingAverageStrategy, simulations: int = 1000,
+                 block_size: int = 24, methods: List[str] = None, workers: int = None, seed: int = None) -> None:
+        """
+        Parameters:
+            - symbol: (str) The symbol we want to backtest
+            - api: The api we collect the candlestick data from
+            - capital: (float) Starting capital of every simulation
+            - buy_quantity: (float) Buy quantity of every simulation
+            - kline_limit: (int) Number of candles of the history
+            - parameters: Parameters of the strategy, e.g. {"profit_target": 1.03, "sma_period": 50}
+            - strategy_class: Strategy that gets created with the parameters
+            - simulations: (int) Number of simulations per method
+            - block_size: (int) Number of consecutive candles per block of the block bootstrap
+            - methods: (List[str]) Methods that get simulated, defaults to both
+            - workers: (int) Number of worker processes, defaults to the number of CPUs
+            - seed: (int) Seed of the simulations, a random seed gets chosen (and kept in 'seed') if not set
+        """
+        self.symbol: str = symbol
+        self.api: Union[Binance] = api
+        self.capital: float = capital
+        self.buy_quantity: float = buy_quantity
+        self.kline_limit: int = kline_limit
+        self.parameters: Dict[str, Any] = parameters
+        self.strategy_class: Type = strategy_class
+        self.simulations: int = simulations
+        self.block_size: int = block_size
+        self.methods: List[str] = methods or [self.METHOD_TRADES, self.METHOD_BLOCK_BOOTSTRAP]
+        self.seed: int = seed if seed is not None else int(np.random.SeedSequence().entropy % 2 ** 63)
+        self.sweep: ParameterSweep = ParameterSweep(symbol, api, capital, buy_quantity, kline_limit,
+                                                    {name: [value] for name, value in parameters.items()},
+                                                    strategy_class=strategy_class, workers=workers)
+        self.base_stats: Dict[str, Dict[str, float]] = dict()  # Stats of the backtest on the real history per method
+        self.results: DataFrame = DataFrame()  # One row per simulation
+        self.summary: DataFrame = DataFrame()  # Distribution of every stat per method
+
+    @classmethod
+    def from_sweep(cls, sweep: ParameterSweep, results: DataFrame, rank: int = 1, **kwargs) -> "MonteCarlo":
+        """
+        Creates the analysis of a ranked combination of a parameter sweep, with the configuration of the sweep.
+
+        Parameters:
+            - sweep: (ParameterSweep) The sweep that ran
+            - results: (DataFrame) The ranked results of the sweep
+            - rank: (int) Rank of the combination that gets analyzed
+            - kwargs: Further arguments of the analysis (e.g. simulations or seed)
+        """
+        row: Dict[str, Any] = results[results["rank"] == rank].iloc[0].to_dict()
+        parameters: Dict[str, Any] = dict()
+        for name, grid_values in sweep.parameter_grid.items():
+            # Restore the type of the parameter, the results data frame may have converted it (e.g. int to float)
+            parameters[name] = next((value for value in grid_values if value == row[name]), row[name])
+        kwargs.setdefault("workers", sweep.workers)
+        return cls(sweep.symbol, sweep.api, sweep.capital, sweep.buy_quantity, sweep.kline_limit, parameters,
+                   strategy_class=sweep.strategy_class, **kwargs)
+
+    def run(self, candlestick_df: DataFrame = None, executor: ProcessPoolExecutor = None) -> Union[DataFrame, bool]:
+        """
+        Runs the simulations and prints the distributions of their results.
+
+        Parameters:
+            - candlestick_df: (DataFrame) Candlestick data to run on (e.g. the data a sweep already loaded), gets
+              collected from the api if not passed
+            - executor: (ProcessPoolExecutor) Pool of a parameter sweep whose workers hold the same candles and
+              configuration, a new pool gets created if not passed
+
+        Returns:
+            - Data frame with the distribution of every stat per method
+            - False in case of missing candlestick data or a history too short for the block size
+        """
+        if candlestick_df is None:
+            candlestick_df = self.api.get_candlestick_data(symbol=self.symbol, limit=self.kline_limit)
+            if not isinstance(candlestick_df, DataFrame):
+                logger.error("Missing candlestick data")
+                return False
+        candlestick_df = candlestick_df.reset_index(drop=True)
+        if len(candlestick_df) <= self.block_size:
+            logger.error(f"{len(candlestick_df)} candles are not enough for blocks of {self.block_size} candles")
+            return False
+
+        logger.info(f"Running {self.simulations} Monte Carlo simulations per method on {self.sweep.workers} workers...")
+        backtest: Backtest = _run_backtest(self.symbol, candlestick_df, self.strategy_class(**self.parameters),
+                                           self.api, self.capital, self.buy_quantity)
+        self.base_stats = {self.METHOD_BLOCK_BOOTSTRAP: _get_stats(backtest)}
+        frames: List[DataFrame] = list()
+        if self.METHOD_BLOCK_BOOTSTRAP in self.methods:
+            pool = contextlib.nullcontext(executor) if executor else self.sweep.create_pool(candlestick_df)
+            with pool as executor:
+                futures: List[Future] = self.__submit_bootstrap(executor)
+                # The trades get resampled in the main process while the workers run the bootstrap
+                if self.METHOD_TRADES in self.methods:
+                    frames.append(self.__resample_trades(backtest))
+                rows: List[Dict[str, float]] = list()
+                for future in futures:
+                    rows.extend(future.result())
+            bootstrap: DataFrame = DataFrame(rows, columns=["simulation"] + self.STATS[self.METHOD_BLOCK_BOOTSTRAP])
+            bootstrap.insert(0, "method", self.METHOD_BLOCK_BOOTSTRAP)
+            frames.append(bootstrap)
+        elif self.METHOD_TRADES in self.methods:
+            frames.append(self.__resample_trades(backtest))
+        if not frames:
+            logger.error(f"Unknown Monte Carlo methods {self.methods}")
+            return False
+
+        self.results = concat(frames, ignore_index=True)
+        self.summary = self.get_summary()
+        self.print_stats()
+        return self.summary
+
+    def get_summary(self) -> DataFrame:
+        """
+        Returns the distribution of every stat per method: mean, standard deviation and percentiles, plus the share of
+        simulations that lost money and the value of the backtest on the real history.
+        """
+        rows: List[Dict[str, Any]] = list()
+        for method, df in self.results.groupby("method", sort=False):
+            for stat in self.STATS[method]:
+                values: ndarray = df[stat].to_numpy(dtype=np.float64)
+                percentiles: ndarray = np.percentile(values, self.PERCENTILES)
+                rows.append({
+                    "method": method,
+                    "stat": stat,
+                    "backtest": self.base_stats[method][stat],
+                    "mean": values.mean(),
+                    "std": values.std(),
+                    **{f"p{percentile}": value for percentile, value in zip(self.PERCENTILES, percentiles)},
+                    "loss_probability": float((df["profit"] < 0).mean()),
+                })
+        return DataFrame(rows).set_index(["method", "stat"])
+
+    def print_stats(self) -> None:
+        print("")
+        print(Color.OKCYAN + "====== MONTE CARLO ANALYSIS ======" + Color.ENDC)
+        print("")
+        print(Color.HEADER + "---Configuration---" + Color.ENDC)
+        print(f"Symbol: {self.symbol}")
+        print(f"Parameters: {self.parameters}")
+        print(f"Starting capital: {self.capital}€")
+        print(f"Simulations per method: {self.simulations}")
+        print(f"Block size: {self.block_size} candles")
+        print(f"Seed: {self.seed}")
+        print("")
+        print(Color.HEADER + "---Backtest---" + Color.ENDC)
+        stats: Dict[str, float] = self.base_stats[self.METHOD_BLOCK_BOOTSTRAP]
+        print(f"Final capital: {round(stats['final_capital'], 2)}€")
+        print(f"Profit: {round(stats['profit'], 2)}€")
+        print(f"Max drawdown: {round(stats['max_drawdown'] * 100, 2)}%")
+        if self.METHOD_TRADES in self.base_stats:
+            round_trip_drawdown: float = self.base_stats[self.METHOD_TRADES]["max_round_trip_drawdown"]
+            print(f"Max drawdown after round trips: {round(round_trip_drawdown * 100, 2)}%")
+        print("")
+        for method in self.summary.index.get_level_values("method").unique():
+            print(Color.HEADER + f"---{method.replace('_', ' ').capitalize()}---" + Color.ENDC)
+            df: DataFrame = self.summary.loc[method]
+            print(df.drop(columns="loss_probability").round(4).to_string())
+            print(f"Loss probability: {round(df['loss_probability'].iloc[0] * 100, 2)}%")
+            print("")
+        print(Color.OKCYAN + "==================================" + Color.ENDC)
+        print("")
+
+    def __submit_bootstrap(self, executor: ProcessPoolExecutor) -> List[Future]:
+        """Submits the block bootstrap simulations in chunks, a few chunks per worker"""
+        chunk_size: int = max(1, self.simulations // (self.sweep.workers * 4))
+        return [executor.submit(_run_bootstrap, list(range(first, min(first + chunk_size, self.simulations))),
+                                self.parameters, self.seed, self.block_size)
+                for first in range(0, self.simulations, chunk_size)]
+
+    def __resample_trades(self, backtest: Backtest) -> DataFrame:
+        """
+        Draws new sequences of the round trips of the backtest. Every sequence has as many round trips as the backtest,
+        the equity gets tracked after every round trip. The stats of the backtest get measured the same way, on its
+        round trips in the order they were closed.
+        """
+        profits: ndarray = _get_round_trip_profits(backtest)
+        equity: ndarray = self.capital + np.cumsum(profits)
+        final_capital: float = float(equity[-1]) if len(profits) else self.capital
+        self.base_stats[self.METHOD_TRADES] = {
+            "final_capital": final_capital,
+            "profit": final_capital - self.capital,
+            "max_round_trip_drawdown": float(_get_max_drawdowns(equity[np.newaxis], self.capital)[0]),
+        }
+
+        final_capitals: ndarray = np.full(self.simulations, self.capital)
+        max_drawdowns: ndarray = np.zeros(self.simulations)
+        if len(profits):
+            # Resample in batches of simulations, so the drawn sequences never exceed the memory budget
+            batch_size: int = max(1, self.TRADE_BATCH_SIZE // len(profits))
+            for first in range(0, self.simulations, batch_size):
+                simulations: range = range(first, min(first + batch_size, self.simulations))
+                draws: ndarray = np.stack([np.random.default_rng([self.seed, simulation]).integers(
+                    0, len(profits), len(profits)) for simulation in simulations])
+                equity: ndarray = self.capital + np.cumsum(profits[draws], axis=1)
+                final_capitals[simulations.start:simulations.stop] = equity[:, -1]
+                max_drawdowns[simulations.start:simulations.stop] = _get_max_drawdowns(equity, self.capital)
+        return DataFrame({
+            "method": self.METHOD_TRADES,
+            "simulation": np.arange(self.simulations),
+            "final_capital": final_capitals,
+            "profit": final_capitals - self.capital,
+            "max_round_trip_drawdown": max_drawdowns,
+        })
+
+
+def _run_backtest(symbol: str, candlestick_df: DataFrame, strategy, api: Union[Binance], capital: float,
+                  buy_quantity: float) -> Backtest:
+    """Simulates the strategy on the candles (the indicators get added to the data frame)"""
+    backtest: Backtest = Backtest(symbol, api, strategy, capital, buy_quantity, len(candlestick_df))
+    backtest.candlestick_df = strategy.add_indicators(candlestick_df, column_name="close")
+    backtest.simulate()
+    return backtest
+
+
+def _get_stats(backtest: Backtest) -> Dict[str, float]:
+    """Returns the final capital and profit (coins valued at the last close) and the max drawdown of a backtest"""
+    equity: ndarray = _get_equity(backtest)
+    return {
+        "final_capital": float(equity[-1]),
+        "profit": float(equity[-1] - backtest.starting_capital),
+        "max_drawdown": float(_get_max_drawdowns(equity[np.newaxis], backtest.starting_capital)[0]),
+    }
+
+
+def _get_equity(backtest: Backtest) -> ndarray:
+    """Returns the capital plus the value of the coins we hold at the close of every candle"""
+    times: ndarray = backtest.candlestick_df["time"].to_numpy(dtype=np.float64)
+    closes: ndarray = backtest.candlestick_df["close"].to_numpy(dtype=np.float64)
+    ledger: TradeLedger = backtest.ledger
+    is_buy: ndarray = ledger.get_column("side") == TradeLedger.SIDE_BUY
+    rows: ndarray = np.searchsorted(times, ledger.get_column("time"))  # Candle every trade happened on
+    amounts: ndarray = ledger.get_column("amount")
+    quantities: ndarray = ledger.get_column("quantity")
+    capital: ndarray = backtest.starting_capital + np.cumsum(
+        np.bincount(rows, weights=np.where(is_buy, -amounts, amounts), minlength=len(times)))
+    coins: ndarray = np.cumsum(np.bincount(rows, weights=np.where(is_buy, quantities, -quantities),
+                                           minlength=len(times)))
+    return capital + coins * closes
+
+
+def _get_max_drawdowns(equity: ndarray, capital: float) -> ndarray:
+    """Returns the largest drop from a previous peak (as share of the peak) of every equity path (one per row)"""
+    peaks: ndarray = np.maximum(np.maximum.accumulate(equity, axis=1), capital)
+    return np.max((peaks - equity) / peaks, axis=1, initial=0.0)
+
+
+def _get_round_trip_profits(backtest: Backtest) -> ndarray:
+    """
+    Returns the profit of every bought position, in the order the positions got closed. Positions that are still open
+    get valued at the last close price (minus the fee of selling them), and come last.
+    """
+    ledger: TradeLedger = backtest.ledger
+    sides: ndarray = ledger.get_column("side")
+    amounts: ndarray = ledger.get_column("amount")
+    buys: ndarray = np.flatnonzero(sides == TradeLedger.SIDE_BUY)
+    sells: ndarray = np.flatnonzero(sides == TradeLedger.SIDE_SELL)
+    closed: ndarray = ledger.get_column("position_id")[sells]
+    profits: List[ndarray] = [amounts[sells] - amounts[closed]]
+    open_positions: ndarray = np.setdiff1d(buys, closed)
+    if len(open_positions):
+        last_close: float = float(backtest.candlestick_df["close"].iloc[-1])
+        value: ndarray = ledger.get_column("quantity")[open_positions] * last_close * (1 - backtest.api.trading_fee)
+        profits.append(value - amounts[open_positions])
+    return np.concatenate(profits)
+
+
+def _run_bootstrap(simulations: List[int], parameters: Dict[str, Any], seed: int, block_size: int
+                   ) -> List[Dict[str, float]]:
+    """
+    Runs block bootstrap simulations in a worker process of a parameter sweep pool.
+
+    Every candle gets described relative to the close of the candle before it (close return, open/high/low relative
+    to its own close, volume). A simulation draws blocks of consecutive candles with replacement (wrapping around at
+    the end of the history) and chains their returns from the first close of the real history on. The times stay the
+    ones of the real history.
+    """
+    candles: DataFrame = shared_candles.get_candles(ParameterSweep.CANDLES)
+    config: Dict[str, Any] = shared_candles.get_config()
+    api: Binance = shared_candles.get_api()
+
+    closes: ndarray = candles["close"].to_numpy()
+    returns: ndarray = closes[1:] / closes[:-1]
+    relative: Dict[str, ndarray] = {column: candles[column].to_numpy()[1:] / closes[1:]
+                                    for column in ["open", "high", "low"]}
+    volumes: ndarray = candles["volume"].to_numpy()[1:]
+    count: int = len(returns)
+    offsets: ndarray = np.arange(block_size)
+
+    results: List[Dict[str, float]] = list()
+    for simulation in simulations:
+        rng: np.random.Generator = np.random.default_rng([seed, simulation])
+        starts: ndarray = rng.integers(0, count, -(-count // block_size))
+        rows: ndarray = ((starts[:, np.newaxis] + offsets) % count).ravel()[:count]
+        simulated_closes: ndarray = np.empty(count + 1)
+        simulated_closes[0] = closes[0]
+        simulated_closes[1:] = closes[0] * np.cumprod(returns[rows])
+        df: DataFrame = DataFrame({
+            "time": candles["time"].to_numpy(),
+            "open": np.concatenate(([candles["open"].iloc[0]], simulated_closes[1:] * relative["open"][rows])),
+            "high": np.concatenate(([candles["high"].iloc[0]], simulated_closes[1:] * relative["high"][rows])),
+            "low": np.concatenate(([candles["low"].iloc[0]], simulated_closes[1:] * relative["low"][rows])),
+            "close": simulated_closes,
+            "volume": np.concatenate(([candles["volume"].iloc[0]], volumes[rows])),
+        })
+        backtest: Backtest = _run_backtest(config["symbol"], df, config["strategy_class"](**parameters), api,
+                                           config["capital"], config["buy_quantity"])
+        results.append({"simulation": simulation, **_get_stats(backtest)})
+    return results
@@ -0,0 +1,169 @@
+import contextlib
+import itertools
+import logging
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from logging import Logger
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Type, Union
+from pandas import DataFrame
+from api.binance import Binance
+from backtest import shared_candles
+from backtest.backtest import Backtest
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+if TYPE_CHECKING:
+    from backtest.monte_carlo import MonteCarlo
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class ParameterSweep:
+    """
+    Runs backtests for every combination of a parameter grid across a pool of processes.
+
+    The candlestick data gets collected once and is put into shared memory. Every worker process attaches to it once,
+    so the tasks only contain the parameter combinations and no data frame has to be pickled. Workers cache the
+    indicator columns, so combinations that only differ in their trading parameters do not recalculate them.
+
+    Optionally, the best combination gets a Monte Carlo robustness analysis right after the sweep, on the same pool of
+    workers (which already hold the candles).
+    """
+    CANDLES: str = "candles"  # Key of the shared candles in the workers
+
+    def __init__(self, symbol: str, api: Union[Binance], capital: float, buy_quantity: float, kline_limit: int,
+                 parameter_grid: Dict[str, List[Any]], strategy_class: Type = MovingAverageStrategy,
+                 workers: int = None, rank_by: str = "profit", monte_carlo_simulations: int = 0,
+                 monte_carlo_seed: int = None) -> None:
+        """
+        Parameters:
+            - symbol: (str) The symbol we want to backtest
+            - api: The api we collect the candlestick data from
+            - capital: (float) Starting capital of every backtest
+            - buy_quantity: (float) Buy quantity of every backtest
+            - kline_limit: (int) Number of candles every backtest runs on
+            - parameter_grid: Values per strategy parameter, e.g. {"profit_target": [1.03, 1.05], "sma_period": [50]}
+            - strategy_class: Strategy that gets created with the parameters of every combination
+            - workers: (int) Number of worker processes, defaults to the number of CPUs
+            - rank_by: (str) The result column the backtests get ranked by (highest first)
+            - monte_carlo_simulations: (int) Number of Monte Carlo simulations per method for the best combination,
+              no analysis if 0
+            - monte_carlo_seed: (int) Seed of the Monte Carlo simulations, random if not set
+        """
+        self.symbol: str = symbol
+        self.api: Union[Binance] = api
+        self.capital: float = capital
+        self.buy_quantity: float = buy_quantity
+        self.kline_limit: int = kline_limit
+        self.parameter_grid: Dict[str, List[Any]] = parameter_grid
+        self.strategy_class: Type = strategy_class
+        self.workers: int = workers or os.cpu_count() or 1
+        self.rank_by: str = rank_by
+        self.monte_carlo_simulations: int = monte_carlo_simulations
+        self.monte_carlo_seed: Union[int, None] = monte_carlo_seed
+        self.monte_carlo: Union[MonteCarlo, None] = None  # Analysis of the best combination of the last run
+
+    def get_combinations(self) -> List[Dict[str, Any]]:
+        """Returns all parameter combinations of the grid"""
+        names: List[str] = list(self.parameter_grid.keys())
+        return [dict(zip(names, values)) for values in itertools.product(*self.parameter_grid.values())]
+
+    def run(self, candlestick_df: DataFrame = None) -> Union[DataFrame, bool]:
+        """
+        Runs the sweep and ranks the results.
+
+        Parameters:
+            - candlestick_df: (DataFrame) Candlestick data to run on, gets collected from the api if not passed
+
+        Returns:
+            - Data frame with one row per combination holding its parameters and stats, ranked by 'rank_by'
+            - False in case of missing candlestick data
+        """
+        if candlestick_df is None:
+            candlestick_df = self.api.get_candlestick_data(symbol=self.symbol, limit=self.kline_limit)
+            if not isinstance(candlestick_df, DataFrame):
+                logger.error("Missing candlestick data")
+                return False
+
+        combinations: List[Dict[str, Any]] = self.get_combinations()
+        logger.info(f"Running parameter sweep with {len(combinations)} combinations on {self.workers} workers...")
+        with self.create_pool(candlestick_df) as executor:
+            results: List[Dict[str, Any]] = list()
+            for chunk_results in executor.map(_run_combinations, self.split_into_chunks(combinations)):
+                results.extend(chunk_results)
+            ranked: DataFrame = self.rank_results(results)
+            if self.monte_carlo_simulations > 0 and not ranked.empty:
+                from backtest.monte_carlo import MonteCarlo
+                self.monte_carlo = MonteCarlo.from_sweep(self, ranked, simulations=self.monte_carlo_simulations,
+                                                         seed=self.monte_carlo_seed)
+                self.monte_carlo.run(candlestick_df, executor=executor)
+        return ranked
+
+    @contextlib.contextmanager
+    def create_pool(self, candlestick_df: DataFrame) -> Iterator[ProcessPoolExecutor]:
+        """
+        Puts the candles into shared memory and starts worker processes that are attached to them.
+
+        The workers run tasks of _run_combinations, the shared memory gets released once the pool is closed.
+
+        Parameters:
+            - candlestick_df: (DataFrame) Candlestick data the workers run on
+        """
+        config: Dict[str, Any] = {
+            "symbol": self.symbol,
+            "capital": self.capital,
+            "buy_quantity": self.buy_quantity,
+            "trading_fee": self.api.trading_fee,
+            "strategy_class": self.strategy_class,
+        }
+        with shared_candles.share_candles({self.CANDLES: candlestick_df}) as segments:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=shared_candles.init_worker,
+                                     initargs=(segments, config)) as executor:
+                yield executor
+
+    def rank_results(self, results: List[Dict[str, Any]]) -> DataFrame:
+        """Creates the ranked results table (best combination first)"""
+        df: DataFrame = DataFrame(results)
+        if not df.empty:
+            df = df.sort_values(by=self.rank_by, ascending=False, kind="mergesort").reset_index(drop=True)
+        df.insert(0, "rank", range(1, len(df) + 1))
+        return df
+
+    def split_into_chunks(self, combinations: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Splits the combinations into chunks for the workers.
+
+        The combinations get sorted by their indicator parameters first, so combinations that share them
+        end up in the same chunk and the worker can reuse its cached indicator columns.
+        """
+        indicator_parameters: List[str] = self.strategy_class.INDICATOR_PARAMETERS
+        ordered: List[Dict[str, Any]] = sorted(combinations, key=lambda combination: tuple(
+            combination.get(name, 0) for name in indicator_parameters))
+        chunk_size: int = max(1, len(ordered) // (self.workers * 4))
+        return [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+
+
+def _run_combinations(combinations: List[Dict[str, Any]], first_row: int = 0, last_row: int = None
+                      ) -> List[Dict[str, Any]]:
+    """
+    Runs the backtests of a chunk of parameter combinations in a worker process.
+
+    The indicators get calculated on all shared candles, afterwards the backtests only run on the candles between the
+    first and the last row. Because the indicators only look back in time, they do not leak any later candles into the
+    backtests, but already have their warm-up phase behind them at the first row.
+    """
+    config: Dict[str, Any] = shared_candles.get_config()
+    api: Binance = shared_candles.get_api()
+    results: List[Dict[str, Any]] = list()
+    for parameters in combinations:
+        strategy = config["strategy_class"](**parameters)
+        candles: DataFrame = shared_candles.get_candles_with_indicators(ParameterSweep.CANDLES, strategy)
+        backtest: Backtest = Backtest(config["symbol"], api, strategy, config["capital"], config["buy_quantity"],
+                                      len(candles))
+        backtest.candlestick_df = candles
+        if first_row or last_row is not None:
+            backtest.candlestick_df = backtest.candlestick_df.iloc[first_row:last_row].reset_index(drop=True)
+        backtest.simulate()
+        results.append({**parameters, **backtest.get_stats()})
+    return results
+
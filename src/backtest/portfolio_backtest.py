@@ -0,0 +1,333 @@
+import logging
+import os
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, Tuple, Type, Union
+from numpy import ndarray
+from pandas import DataFrame
+from api.binance import Binance
+from api.candle_store import CandleStore
+from strategies.moving_average_strategy import MovingAverageStrategy
+from trade_ledger import TradeLedger
+from util import TerminalColors as Color
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class PortfolioBacktest:
+    """
+    Backtests a strategy across many symbols that trade from one shared capital pool.
+
+    The klines of all symbols get collected concurrently. Every symbol gets its indicators and buy signals calculated
+    once, afterwards only its times, close prices, low prices and signals are kept in memory-mapped files, so the frames
+    of the symbols never have to be held in memory at the same time. The simulation walks through the data in time
+    windows of 'chunk_size' candles. Within a window, the symbols get aligned on their shared time index and all fills
+    happen in time order. Within one candle:
+        1. Symbols we hold coins of get their stop losses filled first, so capital of stop losses that got hit within
+           the candle is available for the buys at the close
+        2. Symbols with a buy signal get bought at the close (in the order of the symbols, as long as the capital
+           covers their buy quantity) and get checked afterwards, like in the single symbol backtest. A symbol never
+           buys with the capital of its own stop loss of the same candle, just like in the single symbol backtest.
+    With a single symbol and a buy quantity of 1, the trades are exactly the ones of the single symbol backtest (which
+    only requires the capital to cover the price of one coin).
+    """
+    COLUMNS: List[str] = ["time", "close", "low", "signal"]
+
+    def __init__(self, symbols: List[str], api: Union[Binance], capital: float,
+                 buy_quantity: Union[float, Dict[str, float]], kline_limit: int, interval: str = "1h",
+                 strategy_class: Type = MovingAverageStrategy, strategy_parameters: Dict[str, Any] = None,
+                 max_workers: int = 8, chunk_size: int = 50000) -> None:
+        """
+        Parameters:
+            - symbols: (List[str]) The symbols we want to trade, their order decides which buy gets filled first
+            - api: The api we collect the candlestick data from
+            - capital: (float) Starting capital that all symbols share
+            - buy_quantity: Coins we buy per signal, either the same for all symbols or a dict with one value per symbol
+            - kline_limit: (int) Number of candles per symbol
+            - interval: (str) The time interval of the candles, has to have a fixed length
+            - strategy_class: Strategy that gets created for every symbol
+            - strategy_parameters: Parameters the strategy of every symbol gets created with
+            - max_workers: (int) Number of symbols that get collected and prepared at the same time
+            - chunk_size: (int) Number of candles per symbol and window of the simulation, bounds the memory usage
+        """
+        self.symbols: List[str] = list(symbols)
+        self.api: Union[Binance] = api
+        self.starting_capital: float = capital
+        self.capital: float = capital
+        if isinstance(buy_quantity, dict):
+            self.buy_quantities: Dict[str, float] = dict(buy_quantity)
+        else:
+            self.buy_quantities = {symbol: buy_quantity for symbol in self.symbols}
+        self.kline_limit: int = kline_limit
+        self.interval: str = interval
+        self.strategy_class: Type = strategy_class
+        self.strategy_parameters: Dict[str, Any] = strategy_parameters or dict()
+        self.strategies: Dict[str, Any] = {symbol: strategy_class(**self.strategy_parameters) for symbol in self.symbols}
+        self.max_workers: int = max_workers
+        self.chunk_size: int = chunk_size
+        # Stats
+        self.money_spent: float = 0
+        self.money_earned: float = 0
+        self.transaction_costs: float = 0  # Sum of the money that got lost in transaction fees
+        self.signal_counts: Dict[str, int] = {symbol: 0 for symbol in self.symbols}
+        self.ledgers: Dict[str, TradeLedger] = {symbol: TradeLedger() for symbol in self.symbols}
+        self.trade_count: int = 0
+        self.coins_in_possession: Dict[str, float] = {symbol: 0.0 for symbol in self.symbols}
+        self.capital_over_time: List[Dict[str, float]] = list()  # Represents our capital over the time
+
+    def run(self, candles: Dict[str, DataFrame] = None) -> Union[Dict[str, Any], bool]:
+        """
+        Collects the candles of all symbols, simulates the trades and prints the stats.
+
+        Parameters:
+            - candles: Candlestick data per symbol, gets collected from the api if not passed
+
+        Returns:
+            - The stats of the backtest
+            - False in case of missing candlestick data or an unsupported interval
+        """
+        logger.info(f"Running portfolio backtest for {len(self.symbols)} symbols...")
+        if self.interval not in CandleStore.INTERVAL_MILLISECONDS:
+            logger.error(f"Portfolio backtests need an interval of fixed length, got '{self.interval}'")
+            return False
+
+        with TemporaryDirectory(prefix="portfolio_backtest_") as directory:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="portfolio") as executor:
+                prepared: List[Union[Dict[str, ndarray], bool]] = list(executor.map(
+                    lambda symbol: self.__prepare_symbol(symbol, directory, candles), self.symbols))
+            if not all(prepared):
+                return False
+            self.simulate(dict(zip(self.symbols, prepared)))
+            del prepared
+
+        self.print_stats()
+        return self.get_stats()
+
+    def simulate(self, data: Dict[str, Dict[str, ndarray]]) -> None:
+        """
+        Simulates the trades of all symbols window by window.
+
+        Parameters:
+            - data: Times, close prices, low prices and buy signals per symbol (sorted by time)
+        """
+        interval_ms: int = CandleStore.INTERVAL_MILLISECONDS[self.interval]
+        first_times: List[float] = [float(columns["time"][0]) for columns in data.values() if len(columns["time"])]
+        if not first_times:
+            return
+        start: float = min(first_times)
+        end: float = max(float(columns["time"][-1]) for columns in data.values() if len(columns["time"]))
+        self.capital_over_time.append({"time": start, "capital": self.capital})
+
+        # Profit target and stop loss price per symbol, -1 as long as we do not hold any coins of the symbol
+        profit_targets: List[float] = [-1.0] * len(self.symbols)
+        stop_losses: List[float] = [-1.0] * len(self.symbols)
+        window_start: float = start
+        while window_start <= end:
+            window_end: float = window_start + self.chunk_size * interval_ms
+            self.__simulate_window(data, window_start, window_end, profit_targets, stop_losses)
+            window_start = window_end
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the results of the simulation as dict, with the results of every symbol in 'symbols'"""
+        return {
+            "capital": self.capital,
+            "money_spent": self.money_spent,
+            "money_earned": self.money_earned,
+            "transaction_costs": self.transaction_costs,
+            "profit": self.money_earned - self.money_spent,
+            "buy_signals_created": sum(self.signal_counts.values()),
+            "buy_signals_accepted": sum(ledger.buy_count for ledger in self.ledgers.values()),
+            "sell_transactions": sum(ledger.sell_count for ledger in self.ledgers.values()),
+            "symbols": self.get_symbol_stats().to_dict(orient="index"),
+        }
+
+    def get_symbol_stats(self) -> DataFrame:
+        """Returns one row of stats per symbol"""
+        rows: List[Dict[str, float]] = list()
+        for symbol in self.symbols:
+            trades: DataFrame = self.ledgers[symbol].to_dataframe()
+            buys: DataFrame = trades[trades["side"] == TradeLedger.SIDE_BUY]
+            sells: DataFrame = trades[trades["side"] == TradeLedger.SIDE_SELL]
+            rows.append({
+                "buy_signals_created": self.signal_counts[symbol],
+                "buy_signals_accepted": len(buys),
+                "sell_transactions": len(sells),
+                "money_spent": buys["amount"].sum(),
+                "money_earned": sells["amount"].sum(),
+                "profit": sells["amount"].sum() - buys["amount"].sum(),
+                "coins_in_possession": self.coins_in_possession[symbol],
+            })
+        return DataFrame(rows, index=self.symbols)
+
+    def print_stats(self) -> None:
+        print("")
+        print(Color.OKCYAN + "====== PORTFOLIO BACKTEST ======" + Color.ENDC)
+        print("")
+        print(Color.HEADER + "---Configuration---" + Color.ENDC)
+        print(f"Symbols: {', '.join(self.symbols)}")
+        print(f"Interval: {self.interval}")
+        print(f"Trading fee: {self.api.trading_fee * 100}%")
+        print(f"Starting capital: {self.starting_capital}€")
+        print("")
+        print(Color.HEADER + "---Test Results---" + Color.ENDC)
+        print(f"Capital: {round(self.capital, 2)}€")
+        print(f"Money spent: {round(self.money_spent, 2)}€")
+        print(f"Money earned: {round(self.money_earned, 2)}€")
+        print(f"Money spent on transaction fees: {round(self.transaction_costs, 2)}€")
+        print(f"Profit: {round(self.money_earned - self.money_spent, 2)}€")
+        print("")
+        print(Color.HEADER + "---Symbols---" + Color.ENDC)
+        print(self.get_symbol_stats().round(2).to_string())
+        print("")
+        print(Color.OKCYAN + "================================" + Color.ENDC)
+        print("")
+
+    def __prepare_symbol(self, symbol: str, directory: str, candles: Dict[str, DataFrame] = None
+                         ) -> Union[Dict[str, ndarray], bool]:
+        """
+        Collects the candles of a symbol, calculates its buy signals and stores the columns the simulation needs.
+
+        Returns:
+            - The columns of the symbol, memory-mapped from the directory
+            - False in case of missing candlestick data
+        """
+        if candles is not None and symbol in candles:
+            df: DataFrame = candles[symbol].copy(deep=False)
+        else:
+            df = self.api.get_candlestick_data(symbol=symbol, interval=self.interval, limit=self.kline_limit)
+        if not isinstance(df, DataFrame):
+            logger.error(f"Missing candlestick data of {symbol}")
+            return False
+
+        strategy = self.strategies[symbol]
+        df = strategy.add_indicators(df, column_name="close")
+        signals: ndarray = strategy.get_buy_signals(df, column_name="close")
+        self.signal_counts[symbol] = int(np.count_nonzero(signals))
+
+        columns: Dict[str, ndarray] = dict()
+        for name, values in (("time", df["time"].to_numpy(dtype=np.float64)),
+                             ("close", df["close"].to_numpy(dtype=np.float64)),
+                             ("low", df["low"].to_numpy(dtype=np.float64)),
+                             ("signal", np.asarray(signals, dtype=bool))):
+            path: str = os.path.join(directory, f"{symbol}_{name}.npy")
+            np.save(path, values)
+            columns[name] = np.load(path, mmap_mode="r")
+        return columns
+
+    def __simulate_window(self, data: Dict[str, Dict[str, ndarray]], window_start: float, window_end: float,
+                          profit_targets: List[float], stop_losses: List[float]) -> None:
+        """Aligns the candles of all symbols within the window on their shared times and fills the trades in order"""
+        slices: List[Tuple[int, int]] = list()
+        for symbol in self.symbols:
+            times: ndarray = data[symbol]["time"]
+            slices.append((int(np.searchsorted(times, window_start)), int(np.searchsorted(times, window_end))))
+        window_times: ndarray = np.unique(np.concatenate([data[symbol]["time"][first:last] for symbol, (first, last)
+                                                          in zip(self.symbols, slices)]))
+        if not len(window_times):
+            return
+
+        # One row per symbol, candles a symbol does not have are NaN (no price) or False (no signal)
+        count: int = len(window_times)
+        close_matrix: ndarray = np.full((len(self.symbols), count), np.nan)
+        low_matrix: ndarray = np.full((len(self.symbols), count), np.nan)
+        signal_matrix: ndarray = np.zeros((len(self.symbols), count), dtype=bool)
+        for row, (symbol, (first, last)) in enumerate(zip(self.symbols, slices)):
+            positions: ndarray = np.searchsorted(window_times, data[symbol]["time"][first:last])
+            close_matrix[row, positions] = data[symbol]["close"][first:last]
+            low_matrix[row, positions] = data[symbol]["low"][first:last]
+            signal_matrix[row, positions] = data[symbol]["signal"][first:last]
+
+        # For every candle, get the index of the next candle (including itself) at which any symbol has a buy signal
+        any_signal: ndarray = signal_matrix.any(axis=0)
+        next_signal: List[int] = np.minimum.accumulate(
+            np.where(any_signal, np.arange(count), count)[::-1])[::-1].tolist()
+        signaling_symbols: Dict[int, List[int]] = {
+            int(index): np.flatnonzero(signal_matrix[:, index]).tolist() for index in np.flatnonzero(any_signal)}
+        times: List[float] = window_times.tolist()
+        closes: List[List[float]] = close_matrix.tolist()
+        lows: List[List[float]] = low_matrix.tolist()
+        strategies: List[Any] = [self.strategies[symbol] for symbol in self.symbols]
+        buy_quantities: List[float] = [self.buy_quantities[symbol] for symbol in self.symbols]
+        holding: List[int] = [row for row in range(len(self.symbols)) if stop_losses[row] != -1]
+
+        index: int = next_signal[0] if not holding else 0
+        while index < count:
+            time: float = times[index]
+            signaling: List[int] = signaling_symbols.get(index, [])
+            trades: int = self.trade_count
+            # 1. Symbols we hold coins of but got no buy signal, their stop losses get filled within the candle
+            for row in holding:
+                if row not in signaling:
+                    self.__check_sell(row, lows[row][index], closes[row][index], time, profit_targets, stop_losses)
+            # Stop losses of symbols with a buy signal also get hit before the close, so their capital is available
+            # for the buys of the other symbols. Their targets stay, so their new coins get sold at the same stop loss
+            # after their buy, like in the single symbol backtest.
+            stop_loss_earnings: Dict[int, float] = dict()
+            if len(signaling) > 1:
+                for row in signaling:
+                    if stop_losses[row] != -1 and lows[row][index] <= stop_losses[row]:
+                        capital: float = self.capital
+                        self.__sell(self.symbols[row], stop_losses[row], time)
+                        stop_loss_earnings[row] = self.capital - capital
+            # 2. Symbols with a buy signal get bought at the close, afterwards they get checked like in the single
+            #    symbol backtest
+            for row in signaling:
+                close_price: float = closes[row][index]
+                if self.capital - stop_loss_earnings.get(row, 0.0) >= close_price * buy_quantities[row]:
+                    self.__buy(self.symbols[row], close_price, time)
+                    if profit_targets[row] == -1 and stop_losses[row] == -1:
+                        profit_targets[row] = close_price * strategies[row].profit_target
+                        stop_losses[row] = close_price * strategies[row].stop_loss_target
+                self.__check_sell(row, lows[row][index], close_price, time, profit_targets, stop_losses)
+
+            if self.trade_count != trades:
+                holding = [row for row in range(len(self.symbols)) if stop_losses[row] != -1]
+            # Without coins there is nothing to sell, so skip all candles until the next buy signal
+            if holding:
+                index += 1
+            elif index + 1 < count:
+                index = next_signal[index + 1]
+            else:
+                break
+
+    def __check_sell(self, row: int, low_price: float, close_price: float, time: float, profit_targets: List[float],
+                     stop_losses: List[float]) -> None:
+        """Sells the coins of a symbol if its stop loss got hit, or raises its targets if it reached its profit target"""
+        if stop_losses[row] == -1:
+            return  # We do not hold any coins of the symbol
+        if low_price <= stop_losses[row]:  # Comparisons with NaN are False, so symbols without a candle are skipped
+            self.__sell(self.symbols[row], stop_losses[row], time)
+            profit_targets[row] = -1
+            stop_losses[row] = -1
+        elif close_price >= profit_targets[row]:
+            profit_targets[row] = close_price * self.strategies[self.symbols[row]].profit_target
+            stop_losses[row] = close_price * self.strategies[self.symbols[row]].stop_loss_target
+
+    def __buy(self, symbol: str, close_price: float, time: float) -> None:
+        buy_quantity: float = self.buy_quantities[symbol]
+        price: float = close_price * buy_quantity
+        quantity: float = buy_quantity - (buy_quantity * self.api.trading_fee)
+        transaction_cost: float = quantity * self.api.trading_fee
+        self.ledgers[symbol].add_buy(time, close_price, quantity, price, transaction_cost)
+        self.trade_count += 1
+        self.capital -= price
+        self.transaction_costs += transaction_cost
+        self.money_spent += price
+        self.coins_in_possession[symbol] += quantity
+        self.capital_over_time.append({"time": time, "capital": self.capital})
+
+    def __sell(self, symbol: str, price: float, time: float) -> None:
+        ledger: TradeLedger = self.ledgers[symbol]
+        for position_id, sell_quantity in list(ledger.open_positions.items()):
+            transaction_cost: float = sell_quantity * price * self.api.trading_fee
+            sell_price: float = sell_quantity * price - transaction_cost
+            ledger.add_sell(position_id, time, price, sell_quantity, sell_price, transaction_cost)
+            self.trade_count += 1
+            self.capital += sell_price
+            self.transaction_costs += transaction_cost
+            self.money_earned += sell_price
+            self.coins_in_possession[symbol] -= sell_quantity
+            self.capital_over_time.append({"time": time, "capital": self.capital})
@@ -0,0 +1,137 @@
+import contextlib
+import logging
+import numpy as np
+
+from logging import Logger
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.util import Finalize
+from typing import Any, Dict, Iterator, List, Tuple, Union
+from numpy import ndarray
+from pandas import DataFrame
+from api.binance import Binance
+
+logger: Logger = logging.getLogger("__main__")
+
+COLUMNS: List[str] = ["time", "open", "high", "low", "close", "volume"]
+MAX_CACHED_INDICATORS: int = 64  # Indicator columns a worker keeps, the oldest ones get dropped first
+
+# Candle data of a worker process, attached lazily per key and shared by all tasks of the worker
+_worker_segments: Dict[str, Tuple[str, Tuple[int, int]]] = dict()
+_worker_shared_memories: Dict[str, SharedMemory] = dict()
+_worker_candles: Dict[str, DataFrame] = dict()
+_worker_indicator_cache: Dict[Tuple, Dict[str, ndarray]] = dict()
+_worker_config: Dict[str, Any] = dict()
+_worker_api: Union[Binance, None] = None
+
+
+@contextlib.contextmanager
+def share_candles(frames: Dict[str, DataFrame]) -> Iterator[Dict[str, Tuple[str, Tuple[int, int]]]]:
+    """
+    Copies candlestick data into shared memory, so worker processes can attach to it instead of getting it pickled.
+
+    Parameters:
+        - frames: Candlestick data per key (e.g. per symbol, interval and end time)
+
+    Returns:
+        The name and shape of the shared memory per key (see init_worker), the shared memory gets released on exit
+    """
+    shared_memories: List[SharedMemory] = list()
+    try:
+        segments: Dict[str, Tuple[str, Tuple[int, int]]] = dict()
+        for key, df in frames.items():
+            # One row per column, so every column is contiguous
+            values: ndarray = df[COLUMNS].to_numpy(dtype=np.float64).T
+            shared_memory: SharedMemory = SharedMemory(create=True, size=max(values.nbytes, 1))
+            shared_memories.append(shared_memory)
+            np.ndarray(values.shape, dtype=np.float64, buffer=shared_memory.buf)[:] = values
+            segments[key] = (shared_memory.name, values.shape)
+        yield segments
+    finally:
+        for shared_memory in shared_memories:
+            shared_memory.close()
+            shared_memory.unlink()
+
+
+def init_worker(segments: Dict[str, Tuple[str, Tuple[int, int]]], config: Dict[str, Any]) -> None:
+    """
+    Initializes a worker process of a pool: tells it where the shared candles are, they get attached once needed.
+
+    Parameters:
+        - segments: The name and shape of the shared memory per key, as returned by share_candles
+        - config: Settings shared by all tasks of the pool (e.g. the trading fee)
+    """
+    global _worker_segments, _worker_config
+    _worker_segments = segments
+    _worker_config = config
+    # Runs when the worker process exits (atexit handlers do not run in the workers of a process pool)
+    Finalize(None, close_worker, exitpriority=10)
+
+
+def close_worker() -> None:
+    """Detaches the worker process from all shared candles it attached to"""
+    global _worker_api
+    # The candles and indicators are views of the shared memory, which can only be closed once they are gone
+    _worker_candles.clear()
+    _worker_indicator_cache.clear()
+    _worker_api = None
+    for key, shared_memory in list(_worker_shared_memories.items()):
+        try:
+            shared_memory.close()
+        except BufferError as e:
+            logger.warning(f"Could not detach from the shared candles {key}: {e}")
+        del _worker_shared_memories[key]
+
+
+def get_config() -> Dict[str, Any]:
+    return _worker_config
+
+
+def get_api() -> Binance:
+    """Returns the api of the worker process, it only provides the trading fee to the backtests"""
+    global _worker_api
+    if _worker_api is None:
+        _worker_api = Binance()
+        _worker_api.trading_fee = _worker_config["trading_fee"]
+    return _worker_api
+
+
+def get_candles(key: str) -> DataFrame:
+    """Returns the shared candles of the key, the worker process attaches to them on first use"""
+    candles: Union[DataFrame, None] = _worker_candles.get(key)
+    if candles is None:
+        name, shape = _worker_segments[key]
+        shared_memory: SharedMemory = SharedMemory(name=name)
+        _worker_shared_memories[key] = shared_memory
+        values: ndarray = np.ndarray(shape, dtype=np.float64, buffer=shared_memory.buf)
+        candles = _worker_candles[key] = DataFrame(values.T, columns=COLUMNS, copy=False)
+    return candles
+
+
+def get_candles_with_indicators(key: str, strategy, kline_limit: int = None) -> DataFrame:
+    """
+    Returns the shared candles plus the indicator columns of the strategy.
+
+    The indicators get calculated on exactly the returned candles, like a single backtest does, and are cached for
+    the following tasks with the same candles and indicator parameters.
+
+    Parameters:
+        - key: (str) Key of the shared candles
+        - strategy: The strategy whose indicators get added
+        - kline_limit: (int) Number of the latest candles that get returned, all candles if None
+    """
+    candles: DataFrame = get_candles(key)
+    first: int = 0 if kline_limit is None else max(0, len(candles) - kline_limit)
+    df: DataFrame = candles.iloc[first:].reset_index(drop=True) if first else candles.copy(deep=False)
+    cache_key: Tuple = (key, first, type(strategy).__name__,
+                        *(getattr(strategy, name) for name in strategy.INDICATOR_PARAMETERS))
+    indicator_columns: Union[Dict[str, ndarray], None] = _worker_indicator_cache.get(cache_key)
+    if indicator_columns is None:
+        df = strategy.add_indicators(df, column_name="close")
+        indicator_columns = {indicator.name: df[indicator.name].to_numpy() for indicator in strategy.indicators}
+        _worker_indicator_cache[cache_key] = indicator_columns
+        while len(_worker_indicator_cache) > MAX_CACHED_INDICATORS:
+            del _worker_indicator_cache[next(iter(_worker_indicator_cache))]
+    else:
+        for name, values in indicator_columns.items():
+            df[name] = values
+    return df
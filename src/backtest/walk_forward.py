@@ -0,0 +1,212 @@
+import logging
+
+from concurrent.futures import Future
+from datetime import datetime
+from logging import Logger
+from typing import Any, Dict, List, Tuple, Type, Union
+from pandas import DataFrame
+from api.binance import Binance
+from backtest.parameter_sweep import ParameterSweep, _run_combinations
+from strategies.moving_average_strategy import MovingAverageStrategy
+from util import TerminalColors as Color
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class WalkForward:
+    """
+    Walk-forward optimization of the strategy parameters.
+
+    The candle history gets split into rolling folds. Every fold optimizes the parameters on its in-sample candles and
+    evaluates the best combination on the out-of-sample candles that directly follow them. The out-of-sample windows of
+    consecutive folds line up without gaps or overlaps, so together they cover the history after the first in-sample
+    window exactly once.
+
+    The candles get loaded once and are shared by the worker processes of a parameter sweep pool. The in-sample backtests
+    of all folds run in parallel, afterwards the out-of-sample backtests of all folds do. Indicators always get
+    calculated on the whole history, so every fold starts with warmed up indicators instead of a fresh warm-up phase.
+    """
+    STATS: List[str] = ["capital", "money_spent", "money_earned", "transaction_costs", "profit", "buy_signals_created",
+                        "buy_signals_accepted", "sell_transactions", "coins_in_possession"]
+
+    def __init__(self, symbol: str, api: Union[Binance], capital: float, buy_quantity: float, kline_limit: int,
+                 parameter_grid: Dict[str, List[Any]], in_sample_size: int, out_of_sample_size: int,
+                 strategy_class: Type = MovingAverageStrategy, workers: int = None, rank_by: str = "profit") -> None:
+        """
+        Parameters:
+            - symbol: (str) The symbol we want to backtest
+            - api: The api we collect the candlestick data from
+            - capital: (float) Starting capital of every backtest
+            - buy_quantity: (float) Buy quantity of every backtest
+            - kline_limit: (int) Number of candles of the whole history
+            - parameter_grid: Values per strategy parameter, e.g. {"profit_target": [1.03, 1.05], "sma_period": [50]}
+            - in_sample_size: (int) Number of candles the parameters get optimized on per fold
+            - out_of_sample_size: (int) Number of candles the optimized parameters get evaluated on per fold
+            - strategy_class: Strategy that gets created with the parameters of every combination
+            - workers: (int) Number of worker processes, defaults to the number of CPUs
+            - rank_by: (str) The result column the best combination of a fold gets chosen by (highest wins)
+        """
+        self.symbol: str = symbol
+        self.api: Union[Binance] = api
+        self.kline_limit: int = kline_limit
+        self.in_sample_size: int = in_sample_size
+        self.out_of_sample_size: int = out_of_sample_size
+        self.sweep: ParameterSweep = ParameterSweep(symbol, api, capital, buy_quantity, kline_limit, parameter_grid,
+                                                    strategy_class=strategy_class, workers=workers, rank_by=rank_by)
+        self.fold_stats: DataFrame = DataFrame()
+        self.combined_stats: Dict[str, float] = dict()
+
+    def get_folds(self, candle_count: int) -> List[Tuple[int, int, int]]:
+        """
+        Splits the candles into folds.
+
+        Parameters:
+            - candle_count: (int) Number of candles of the history
+
+        Returns:
+            First row of the in-sample window, first row and end row (exclusive) of the out-of-sample window per fold
+        """
+        folds: List[Tuple[int, int, int]] = list()
+        start: int = 0
+        while start + self.in_sample_size + self.out_of_sample_size <= candle_count:
+            folds.append((start, start + self.in_sample_size, start + self.in_sample_size + self.out_of_sample_size))
+            start += self.out_of_sample_size
+        return folds
+
+    def run(self, candlestick_df: DataFrame = None) -> Union[DataFrame, bool]:
+        """
+        Runs the walk-forward optimization and prints the results.
+
+        Parameters:
+            - candlestick_df: (DataFrame) Candlestick data to run on, gets collected from the api if not passed
+
+        Returns:
+            - Data frame with one row per fold holding its windows, best parameters, in-sample score and
+              out-of-sample stats
+            - False in case of missing candlestick data or a history too short for a single fold
+        """
+        if self.in_sample_size <= 0 or self.out_of_sample_size <= 0:
+            logger.error("In-sample and out-of-sample sizes have to be positive")
+            return False
+        if candlestick_df is None:
+            candlestick_df = self.api.get_candlestick_data(symbol=self.symbol, limit=self.kline_limit)
+            if not isinstance(candlestick_df, DataFrame):
+                logger.error("Missing candlestick data")
+                return False
+        folds: List[Tuple[int, int, int]] = self.get_folds(len(candlestick_df))
+        if not folds:
+            logger.error(f"{len(candlestick_df)} candles are not enough for a fold of {self.in_sample_size} "
+                         f"in-sample and {self.out_of_sample_size} out-of-sample candles")
+            return False
+
+        combinations: List[Dict[str, Any]] = self.sweep.get_combinations()
+        logger.info(f"Running walk-forward optimization with {len(folds)} folds of {len(combinations)} combinations "
+                    f"on {self.sweep.workers} workers...")
+        with self.sweep.create_pool(candlestick_df) as executor:
+            # Optimize every fold on its in-sample window
+            in_sample_futures: List[List[Future]] = [
+                [executor.submit(_run_combinations, chunk, in_sample_start, out_of_sample_start)
+                 for chunk in self.sweep.split_into_chunks(combinations)]
+                for in_sample_start, out_of_sample_start, _ in folds]
+            best_results: List[Dict[str, Any]] = list()
+            for futures in in_sample_futures:
+                results: List[Dict[str, Any]] = list()
+                for future in futures:
+                    results.extend(future.result())
+                best_results.append(self.sweep.rank_results(results).iloc[0].to_dict())
+
+            # Evaluate the best combination of every fold on its out-of-sample window
+            parameter_names: List[str] = list(self.sweep.parameter_grid.keys())
+            best_parameters: List[Dict[str, Any]] = [
+                {name: self.__to_parameter(best[name], self.sweep.parameter_grid[name]) for name in parameter_names}
+                for best in best_results]
+            out_of_sample_futures: List[Future] = [
+                executor.submit(_run_combinations, [parameters], out_of_sample_start, out_of_sample_end)
+                for parameters, (_, out_of_sample_start, out_of_sample_end) in zip(best_parameters, folds)]
+            out_of_sample_results: List[Dict[str, Any]] = [future.result()[0] for future in out_of_sample_futures]
+
+        times: List[float] = candlestick_df["time"].tolist()
+        rows: List[Dict[str, Any]] = list()
+        for fold, ((in_sample_start, out_of_sample_start, out_of_sample_end), parameters, best, result) in enumerate(
+                zip(folds, best_parameters, best_results, out_of_sample_results)):
+            rows.append({
+                "fold": fold + 1,
+                "in_sample_start": self.__to_datetime(times[in_sample_start]),
+                "out_of_sample_start": self.__to_datetime(times[out_of_sample_start]),
+                "out_of_sample_end": self.__to_datetime(times[out_of_sample_end - 1]),
+                **parameters,
+                "in_sample_" + self.sweep.rank_by: best[self.sweep.rank_by],
+                **{name: result[name] for name in self.STATS},
+            })
+        self.fold_stats = DataFrame(rows).set_index("fold")
+        self.combined_stats = self.get_combined_stats()
+        self.print_stats()
+        return self.fold_stats
+
+    def get_combined_stats(self) -> Dict[str, float]:
+        """
+        Combines the out-of-sample results of all folds.
+
+        Every fold starts with the full capital, so the money flows and trade counts get summed up. The efficiency
+        compares the profit per candle out-of-sample with the in-sample profit per candle of the chosen combinations,
+        values far below 1 hint at overfitted parameters. It is only defined for a positive in-sample profit.
+        """
+        df: DataFrame = self.fold_stats
+        if df.empty:
+            return dict()
+        combined: Dict[str, float] = {name: float(df[name].sum()) for name in self.STATS if name != "capital"}
+        combined["folds"] = len(df)
+        combined["profitable_folds"] = int((df["profit"] > 0).sum())
+        combined["mean_profit"] = float(df["profit"].mean())
+        combined["profit_std"] = float(df["profit"].std(ddof=0))
+        if self.sweep.rank_by == "profit":
+            in_sample_profit: float = float(df["in_sample_profit"].sum()) / self.in_sample_size
+            combined["efficiency"] = ((combined["profit"] / self.out_of_sample_size) / in_sample_profit
+                                      if in_sample_profit > 0 else float("nan"))
+        return combined
+
+    def print_stats(self) -> None:
+        print("")
+        print(Color.OKCYAN + "====== WALK-FORWARD OPTIMIZATION ======" + Color.ENDC)
+        print("")
+        print(Color.HEADER + "---Configuration---" + Color.ENDC)
+        print(f"Symbol: {self.symbol}")
+        print(f"Trading fee: {self.api.trading_fee * 100}%")
+        print(f"Starting capital per fold: {self.sweep.capital}€")
+        print(f"In-sample candles: {self.in_sample_size}")
+        print(f"Out-of-sample candles: {self.out_of_sample_size}")
+        print(f"Optimized by: {self.sweep.rank_by}")
+        print("")
+        print(Color.HEADER + "---Folds---" + Color.ENDC)
+        print(self.fold_stats.round(2).to_string())
+        print("")
+        print(Color.HEADER + "---Combined Out-of-Sample Results---" + Color.ENDC)
+        stats: Dict[str, float] = self.combined_stats
+        print(f"Profitable folds: {stats['profitable_folds']}/{stats['folds']}")
+        print(f"Money spent: {round(stats['money_spent'], 2)}€")
+        print(f"Money earned: {round(stats['money_earned'], 2)}€")
+        print(f"Money spent on transaction fees: {round(stats['transaction_costs'], 2)}€")
+        print(f"Profit: {round(stats['profit'], 2)}€")
+        print(f"Profit per fold: {round(stats['mean_profit'], 2)}€ (std {round(stats['profit_std'], 2)}€)")
+        print(f"Buy signals accepted: {int(stats['buy_signals_accepted'])}")
+        print(f"Sell transactions: {int(stats['sell_transactions'])}")
+        if "efficiency" in stats:
+            print(f"Walk-forward efficiency: {round(stats['efficiency'], 2)}")
+        print("")
+        print(Color.OKCYAN + "=======================================" + Color.ENDC)
+        print("")
+
+    @staticmethod
+    def __to_parameter(value: Any, grid_values: List[Any]) -> Any:
+        """Restores the type of a parameter that got converted by the results data frame (e.g. int to float)"""
+        for grid_value in grid_values:
+            if grid_value == value:
+                return grid_value
+        return value
+
+    @staticmethod
+    def __to_datetime(time: Any) -> Any:
+        """Converts millisecond timestamps into datetimes, other times stay as they are"""
+        if isinstance(time, (int, float)):
+            return datetime.utcfromtimestamp(time / 1000)
+        return time
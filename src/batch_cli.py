@@ -0,0 +1,48 @@
+"""
+Runs a batch of backtests from a JSON file without any user interaction.
+
+Usage (from the src directory):
+    python3 batch_cli.py batch.json --output ../batch_results/nightly.json --workers 8
+"""
+import argparse
+import os
+import sys
+import logging_conf  # Init the logger config (do not remove)
+
+from datetime import datetime
+from typing import Any, Dict, List, Union
+from api.binance import Binance
+from api.candle_store import CandleStore
+from backtest.batch import BatchRunner, write_summary
+from util import get_project_root
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Runs a batch of backtests from a JSON file")
+    parser.add_argument("batch", help="Path of the JSON file with the backtest configurations")
+    parser.add_argument("--output", help="Path of the JSON summary (default: batch_results/ in the project root)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    args: argparse.Namespace = parser.parse_args()
+
+    configs: Union[List[Dict[str, Any]], bool] = BatchRunner.load_configs(args.batch)
+    if configs is False:
+        return 2
+    api: Binance = Binance(candle_store=CandleStore(),
+                           exchange_info_path=os.path.join(get_project_root(), "data/exchange_info.json"))
+    summary: Dict[str, Any] = BatchRunner(configs, api, workers=args.workers).run()
+    summary["batch"] = os.path.abspath(args.batch)
+
+    output: str = args.output
+    if not output:
+        filename: str = (os.path.splitext(os.path.basename(args.batch))[0] + "_"
+                         + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        output = os.path.join(get_project_root(), "batch_results", filename)
+    if not write_summary(summary, output):
+        return 2
+    print(f"{summary['backtests'] - summary['failed']}/{summary['backtests']} backtests ran in "
+          f"{summary['duration']:.1f}s, summary written to {output}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Runs the benchmark suite and writes the results as JSON file.
+
+Usage (from the src directory):
+    python3 -m benchmark --sizes 10000 100000 1000000 --repeat 3
+    python3 -m benchmark --compare ../benchmark_results/<previous results>.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from datetime import datetime
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from benchmark.benchmarks import BENCHMARKS, run_benchmarks
+from util import get_project_root
+
+DEFAULT_SIZES: List[int] = [10000, 100000, 1000000]
+
+
+def get_commit() -> Union[str, None]:
+    """Returns the hash of the checked out commit, None if it cannot be determined"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=get_project_root(), capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_bytes(size: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    print(f"{result['benchmark']:<24}{result['size']:>10}  min {result['min']:.4f}s  median {result['median']:.4f}s  "
+          f"peak memory {format_bytes(result['peak_memory'])}", flush=True)
+
+
+def print_comparison(previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Prints the change of the minimum time and peak memory of every benchmark that is part of both results"""
+    previous_results: Dict[Tuple[str, int], Dict[str, Any]] = {
+        (result["benchmark"], result["size"]): result for result in previous["results"]}
+    print("")
+    print(f"Compared with {previous.get('commit') or 'unknown commit'} ({previous.get('created')}):")
+    for result in current["results"]:
+        old: Dict[str, Any] = previous_results.get((result["benchmark"], result["size"]))
+        if old is None:
+            continue
+        speedup: float = old["min"] / result["min"] if result["min"] else float("inf")
+        memory: float = result["peak_memory"] / old["peak_memory"] if old["peak_memory"] else float("inf")
+        print(f"{result['benchmark']:<24}{result['size']:>10}  {old['min']:.4f}s -> {result['min']:.4f}s "
+              f"(speedup {speedup:.2f}x)  peak memory {memory:.2f}x")
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmarks the hot paths of the project")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of synthetic candles")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS.keys()), default=list(BENCHMARKS.keys()),
+                        help="Benchmarks that should run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per benchmark and size")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic candles")
+    parser.add_argument("--output", help="Path of the JSON results (default: benchmark_results/ in the project root)")
+    parser.add_argument("--compare", help="Path of previous JSON results to compare with")
+    args: argparse.Namespace = parser.parse_args()
+
+    commit: Union[str, None] = get_commit()
+    results: Dict[str, Any] = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": run_benchmarks(args.benchmarks, args.sizes, args.repeat, args.seed, report=print_result),
+    }
+
+    output: str = args.output
+    if not output:
+        filename: str = datetime.now().strftime("%Y%m%d-%H%M%S") + "_" + (commit or "unknown")[:10] + ".json"
+        output = os.path.join(get_project_root(), "benchmark_results", filename)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            print_comparison(json.load(file), results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
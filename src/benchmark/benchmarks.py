@@ -0,0 +1,184 @@
+import contextlib
+import io
+import itertools
+import json
+import statistics
+import time
+import tracemalloc
+
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Union
+from pandas import DataFrame
+from api.binance import Binance
+from api.rate_limiter import RequestWeightLimiter
+from backtest.backtest import Backtest
+from benchmark.kline_server import KlineServer
+from benchmark.synthetic_klines import SyntheticApi, generate_klines, to_raw_klines
+from indicators import SimpleMovingAverage
+from market_data import MarketData
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+SYMBOL: str = "BTCEUR"
+MARKET_DATA_CAPACITY: int = 2 * 30 * 24 * 60  # Window of a bot, two months of 1m candles
+RAW_PAGES: int = 16  # Distinct raw kline pages the parsing benchmark cycles through
+SERVER_LATENCY: float = 0.02  # Seconds the stub server delays every kline page, roughly the round trip to the api
+
+
+class Benchmark:
+    """
+    Times one hot path of the project.
+
+    The setup creates everything the hot path needs (e.g. the data) and returns a function that runs the hot path once.
+    Only that function gets timed, a new setup runs before every repetition.
+    """
+
+    def __init__(self, name: str, setup: Callable[[DataFrame], Callable[[], Any]], max_size: int = None) -> None:
+        """
+        Parameters:
+            - name: (str) Name of the benchmark in the results
+            - setup: Gets the synthetic candles and returns the function that runs the hot path
+            - max_size: (int) Largest number of candles the benchmark runs with, larger sizes get skipped
+        """
+        self.name: str = name
+        self.setup: Callable[[DataFrame], Callable[[], Any]] = setup
+        self.max_size: Union[int, None] = max_size
+
+    def run(self, klines: DataFrame, repeat: int) -> Dict[str, Any]:
+        """
+        Runs the benchmark on the candles.
+
+        Parameters:
+            - klines: (DataFrame) The synthetic candles
+            - repeat: (int) Number of timed runs
+
+        Returns:
+            Result holding the time of every run (in seconds) and the peak memory of one more run (in bytes)
+        """
+        times: List[float] = list()
+        for _ in range(repeat):
+            function: Callable[[], Any] = self.setup(klines)
+            start: float = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+
+        # Memory gets traced in a separate run, because tracing slows down the hot path
+        function = self.setup(klines)
+        tracemalloc.start()
+        try:
+            function()
+            peak_memory: int = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "benchmark": self.name,
+            "size": len(klines),
+            "repeat": repeat,
+            "times": times,
+            "min": min(times),
+            "median": statistics.median(times),
+            "peak_memory": peak_memory,
+        }
+
+
+def setup_sma_add_data(klines: DataFrame) -> Callable[[], Any]:
+    df: DataFrame = klines[["time", "close"]].copy()
+    sma: SimpleMovingAverage = SimpleMovingAverage("sma", 50)
+    return lambda: sma.add_data(df, "close")
+
+
+def setup_market_data_add_entry(klines: DataFrame) -> Callable[[], Any]:
+    market_data: MarketData = MarketData(SYMBOL, capacity=MARKET_DATA_CAPACITY)
+    times: List[float] = klines["time"].tolist()
+    prices: List[float] = klines["close"].tolist()
+
+    def add_entries() -> None:
+        for entry_time, price in zip(times, prices):
+            market_data.add_entry(entry_time, price)
+    return add_entries
+
+
+def setup_binance_parse_klines(klines: DataFrame) -> Callable[[], Any]:
+    """Parses raw kline pages like the api responses, without sending any request"""
+    page_size: int = Binance.KLINE_PAGE_SIZE
+    pages: List[bytes] = [json.dumps(to_raw_klines(klines.iloc[first:first + page_size])).encode()
+                          for first in range(0, min(len(klines), RAW_PAGES * page_size), page_size)]
+    page_count: int = -(-len(klines) // page_size)
+    api: Binance = Binance()
+
+    def parse_pages() -> None:
+        responses = itertools.cycle(pages)
+        api.http_request = lambda endpoint, params=None, weight=Binance.WEIGHT_DEFAULT, raw=False: next(responses)
+        for _ in range(page_count):
+            api.get_candlestick_data(SYMBOL, interval="1m", limit=page_size)
+    return parse_pages
+
+
+def setup_binance_download_klines(klines: DataFrame) -> Callable[[], Any]:
+    """Downloads all candles in pages from a local stub of the klines endpoint, with a latency on every page"""
+    server: KlineServer = KlineServer({SYMBOL: klines}, latency=SERVER_LATENCY)
+    api: Binance = Binance(base=server.start(), rate_limiter=RequestWeightLimiter(max_weight=10 ** 9))
+    end_time: int = int(klines["time"].iloc[-1])
+
+    def download() -> None:
+        try:
+            api.get_candlestick_data(SYMBOL, interval="1m", end_time=end_time, limit=len(klines))
+        finally:
+            server.stop()
+    return download
+
+
+def setup_backtest_simulate(klines: DataFrame) -> Callable[[], Any]:
+    backtest: Backtest = Backtest(SYMBOL, SyntheticApi(klines), MovingAverageStrategy(), 100000.0, 1.0, len(klines))
+    backtest.candlestick_df = backtest.strategy.add_indicators(klines.copy(), column_name="close")
+    return backtest.simulate
+
+
+def setup_backtest_run(klines: DataFrame) -> Callable[[], Any]:
+    """Runs the whole backtest including the dashboard, which gets written into a temporary directory"""
+    backtest: Backtest = Backtest(SYMBOL, SyntheticApi(klines), MovingAverageStrategy(), 100000.0, 1.0, len(klines))
+
+    def run_backtest() -> None:
+        with TemporaryDirectory(prefix="benchmark_") as directory, contextlib.redirect_stdout(io.StringIO()):
+            backtest.dashboard_dir = directory
+            backtest.run()
+    return run_backtest
+
+
+BENCHMARKS: Dict[str, Benchmark] = {benchmark.name: benchmark for benchmark in [
+    Benchmark("sma_add_data", setup_sma_add_data),
+    Benchmark("market_data_add_entry", setup_market_data_add_entry),
+    Benchmark("binance_parse_klines", setup_binance_parse_klines),
+    Benchmark("binance_download_klines", setup_binance_download_klines, max_size=1000000),
+    Benchmark("backtest_simulate", setup_backtest_simulate),
+    Benchmark("backtest_run", setup_backtest_run, max_size=1000000),  # The dashboard holds every single candle
+]}
+
+
+def run_benchmarks(names: List[str], sizes: List[int], repeat: int = 3, seed: int = 42,
+                   report: Callable[[Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+    """
+    Runs the benchmarks for every size, the candles of a size get generated once and are shared by all benchmarks.
+
+    Parameters:
+        - names: (List[str]) Names of the benchmarks that should run
+        - sizes: (List[int]) Numbers of candles
+        - repeat: (int) Number of timed runs per benchmark and size
+        - seed: (int) Seed of the synthetic candles
+        - report: Gets called with every result as soon as it is available
+
+    Returns:
+        The results of all benchmarks that ran
+    """
+    results: List[Dict[str, Any]] = list()
+    for size in sizes:
+        klines: DataFrame = generate_klines(size, seed=seed)
+        for name in names:
+            benchmark: Benchmark = BENCHMARKS[name]
+            if benchmark.max_size is not None and size > benchmark.max_size:
+                continue
+            result: Dict[str, Any] = benchmark.run(klines, repeat)
+            results.append(result)
+            if report:
+                report(result)
+    return results
@@ -0,0 +1,137 @@
+import json
+import logging
+import time
+import numpy as np
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import Logger
+from threading import Lock, Thread
+from typing import Dict, List, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+from numpy import ndarray
+from pandas import DataFrame
+from benchmark.synthetic_klines import to_raw_klines
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class KlineServer(ThreadingHTTPServer):
+    """
+    Local stub of the Binance klines endpoint.
+
+    Serves recorded (or synthetic) klines over HTTP with the same parameters and response format as the api, so the
+    download of candles (paging, parallel requests, parsing) can be tested and benchmarked offline. A fixed latency can
+    be added to every response, which makes the effect of the parallel requests measurable on a local machine. Requests
+    can be made to fail with given status codes (see fail_next), e.g. to test how the client retries them.
+    """
+    daemon_threads: bool = True
+    allow_reuse_address: bool = True
+    request_queue_size: int = 64
+
+    def __init__(self, klines: Dict[str, DataFrame], interval: str = "1m", host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0) -> None:
+        """
+        Parameters:
+            - klines: Candlestick data per symbol (oldest candle first)
+            - interval: (str) The time interval of the candles, other intervals get no klines
+            - host: (str) Host the server listens on
+            - port: (int) Port the server listens on (0 picks a free port)
+            - latency: (float) Seconds every response gets delayed
+        """
+        super().__init__((host, port), KlineHandler)
+        self.interval: str = interval
+        self.latency: float = latency
+        # Open times and the JSON text of every kline per symbol, so a response only has to join the requested klines
+        self.times: Dict[str, ndarray] = {symbol: df["time"].to_numpy(dtype=np.int64) for symbol, df in klines.items()}
+        self.rows: Dict[str, List[bytes]] = {symbol: [json.dumps(row).encode() for row in to_raw_klines(df, interval)]
+                                             for symbol, df in klines.items()}
+        self.request_count: int = 0
+        self.failures: List[int] = list()  # Status codes the next requests fail with, in order
+        self.lock: Lock = Lock()
+        self.thread: Union[Thread, None] = None
+
+    def start(self) -> str:
+        """Starts the server in a background thread and returns its base url"""
+        self.thread = Thread(target=self.serve_forever, kwargs={"poll_interval": 0.01}, name="kline-server",
+                             daemon=True)
+        self.thread.start()
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def fail_next(self, *status_codes: int) -> None:
+        """Lets the next requests fail, one per status code (e.g. fail_next(429, 503) fails the next two requests)"""
+        with self.lock:
+            self.failures.extend(status_codes)
+
+    def pop_failure(self) -> Union[int, None]:
+        """Counts the request and returns the status code it has to fail with, None if it gets answered"""
+        with self.lock:
+            if not self.failures:
+                return None
+            self.request_count += 1
+            return self.failures.pop(0)
+
+    def get_klines(self, symbol: str, interval: str, limit: int, start_time: int = None, end_time: int = None
+                   ) -> bytes:
+        """
+        Returns the JSON body of a klines request.
+
+        Like the api, the klines start at the start time if it is given, otherwise they are the latest ones before the
+        end time.
+        """
+        with self.lock:
+            self.request_count += 1
+        if symbol not in self.times or interval != self.interval:
+            return b"[]"
+        times: ndarray = self.times[symbol]
+        first: int = 0 if start_time is None else int(np.searchsorted(times, start_time, side="left"))
+        last: int = len(times) if end_time is None else int(np.searchsorted(times, end_time, side="right"))
+        if start_time is None:
+            first = max(first, last - limit)
+        else:
+            last = min(last, first + limit)
+        return b"[" + b",".join(self.rows[symbol][first:last]) + b"]"
+
+
+class KlineHandler(BaseHTTPRequestHandler):
+    """Answers the klines requests of one connection"""
+    protocol_version: str = "HTTP/1.1"  # Keep-alive, like the api
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/api/v3/klines":
+            self.__send(404, b'{"code":-1,"msg":"Unknown endpoint"}')
+            return
+        params: Dict[str, List[str]] = parse_qs(url.query)
+        try:
+            symbol: str = params["symbol"][0]
+            interval: str = params["interval"][0]
+            limit: int = min(int(params.get("limit", ["500"])[0]), 1000)
+            start_time: Union[int, None] = int(params["startTime"][0]) if "startTime" in params else None
+            end_time: Union[int, None] = int(params["endTime"][0]) if "endTime" in params else None
+        except (KeyError, ValueError):
+            self.__send(400, b'{"code":-1102,"msg":"Mandatory parameter was not sent or is malformed"}')
+            return
+        failure: Union[int, None] = self.server.pop_failure()
+        if failure is not None:
+            self.__send(failure, b'{"code":-1000,"msg":"Failed by the kline server"}')
+            return
+        body: bytes = self.server.get_klines(symbol, interval, limit, start_time, end_time)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.__send(200, body)
+
+    def __send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Tuple) -> None:
+        logger.debug(f"Kline server: {format % args}")
@@ -0,0 +1,94 @@
+"""
+Measures the startup time of the command line interface and fails if it regressed.
+
+Every run imports the CLI in a fresh interpreter, like a launch of the tool. Besides the time, the check fails if one of
+the heavy modules (which only backtests, bots and charts need) got imported during startup.
+
+Usage (from the src directory):
+    python3 -m benchmark.startup --repeat 10 --threshold 0.4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Any, Dict, List
+
+MODULE: str = "main_cli"
+THRESHOLD: float = 0.4  # Seconds the import of the CLI may take at most (minimum of all runs)
+HEAVY_MODULES: List[str] = ["pandas", "numpy", "plotly", "pyti", "backtest.backtest", "bot", "market_data"]
+# Imports the module and prints the import time and the heavy modules that got imported along with it
+MEASURE_SCRIPT: str = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{"import_time": duration, "heavy_modules": [m for m in {heavy_modules!r} if m in sys.modules]}}))
+"""
+
+
+def measure_startup(module: str = MODULE, repeat: int = 10) -> Dict[str, Any]:
+    """
+    Imports the module in 'repeat' fresh interpreters.
+
+    Returns:
+        The import times and process times (interpreter start included) of all runs in seconds, plus the heavy modules
+        that got imported
+    """
+    src_dir: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script: str = MEASURE_SCRIPT.format(module=module, heavy_modules=HEAVY_MODULES)
+    import_times: List[float] = list()
+    process_times: List[float] = list()
+    heavy_modules: List[str] = list()
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        output: str = subprocess.run([sys.executable, "-c", script], cwd=src_dir, capture_output=True, text=True,
+                                     check=True).stdout
+        process_times.append(time.perf_counter() - start)
+        run: Dict[str, Any] = json.loads(output.strip().splitlines()[-1])
+        import_times.append(run["import_time"])
+        heavy_modules = sorted(set(heavy_modules) | set(run["heavy_modules"]))
+    return {
+        "module": module,
+        "repeat": repeat,
+        "import_times": import_times,
+        "import_min": min(import_times),
+        "import_median": statistics.median(import_times),
+        "process_min": min(process_times),
+        "process_median": statistics.median(process_times),
+        "heavy_modules": heavy_modules,
+    }
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Measures the startup time of the CLI")
+    parser.add_argument("--module", default=MODULE, help="Module that gets imported on startup")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of fresh interpreters")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="Maximum import time in seconds (minimum of all runs)")
+    parser.add_argument("--output", help="Path of the JSON results (not written if not set)")
+    args: argparse.Namespace = parser.parse_args()
+
+    result: Dict[str, Any] = measure_startup(args.module, args.repeat)
+    result["threshold"] = args.threshold
+    print(f"Import of {result['module']}: min {result['import_min']:.4f}s  median {result['import_median']:.4f}s  "
+          f"(process min {result['process_min']:.4f}s  median {result['process_median']:.4f}s)")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+    passed: bool = True
+    if result["import_min"] > args.threshold:
+        print(f"Startup regressed: {result['import_min']:.4f}s exceeds the threshold of {args.threshold}s")
+        passed = False
+    if result["heavy_modules"]:
+        print(f"Startup imports heavy modules: {', '.join(result['heavy_modules'])}")
+        passed = False
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Measures the throughput and latency of the market stream ingestion offline.
+
+A local replay server sends synthetic klines (and optionally trades) of several symbols as fast as possible, or at a
+fixed rate. The market stream pushes them into one market data window per symbol, like the windows of the bots. The
+latency is the time from sending a message until its update was applied.
+
+Usage (from the src directory):
+    python3 -m benchmark.stream --symbols 4 --candles 50000 --trades 3
+    python3 -m benchmark.stream --rate 2000
+"""
+import argparse
+import json
+import sys
+import time
+
+from typing import Any, Dict
+from pandas import DataFrame
+from benchmark.synthetic_klines import generate_klines
+from market_data import MarketData
+from stream.market_stream import MarketStream
+from stream.replay import ReplayServer
+from stream.transports import ReplayTransport
+
+HISTORY: int = 100  # Candles every window starts with, the replay continues after them
+
+
+def measure_stream(symbols: int = 4, candles: int = 50000, trades_per_candle: int = 0,
+                   messages_per_second: float = None, seed: int = 42, timeout: float = 600.0) -> Dict[str, Any]:
+    """
+    Replays the candles of all symbols through a market stream.
+
+    Parameters:
+        - symbols: (int) Number of symbols that get streamed at the same time
+        - candles: (int) Number of replayed candles per symbol
+        - trades_per_candle: (int) Number of trade messages per candle, besides its kline message
+        - messages_per_second: (float) Send rate of the replay server, as fast as possible if None
+        - seed: (int) Seed of the synthetic candles
+        - timeout: (float) Seconds the replay may take at most
+
+    Returns:
+        The stats of the stream (messages, messages per second, average and max latency in milliseconds) plus the
+        wall time of the replay
+    """
+    klines: Dict[str, DataFrame] = {f"SYM{index}EUR": generate_klines(HISTORY + candles, seed=seed + index)
+                                    for index in range(symbols)}
+    server: ReplayServer = ReplayServer({symbol: df.iloc[HISTORY:] for symbol, df in klines.items()},
+                                        messages_per_second=messages_per_second, trades_per_candle=trades_per_candle)
+    host, port = server.start()
+    stream: MarketStream = MarketStream(ReplayTransport(host, port))
+    for symbol, df in klines.items():
+        stream.subscribe(symbol, MarketData.from_dataframe(symbol, df.iloc[:HISTORY], capacity=HISTORY + candles),
+                         trades=trades_per_candle > 0)
+
+    expected: int = symbols * candles * (1 + trades_per_candle)
+    start: float = time.perf_counter()
+    stream.start()
+    try:
+        while stream.get_stats()["messages"] < expected and time.perf_counter() - start < timeout:
+            time.sleep(0.01)
+        duration: float = time.perf_counter() - start
+    finally:
+        stream.stop()
+        server.stop()
+    return {
+        "symbols": symbols,
+        "candles": candles,
+        "trades_per_candle": trades_per_candle,
+        "rate": messages_per_second,
+        "duration": duration,
+        **stream.get_stats(),
+    }
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmarks the market stream ingestion")
+    parser.add_argument("--symbols", type=int, default=4, help="Number of streamed symbols")
+    parser.add_argument("--candles", type=int, default=50000, help="Number of replayed candles per symbol")
+    parser.add_argument("--trades", type=int, default=0, help="Number of trade messages per candle")
+    parser.add_argument("--rate", type=float,
+                        help="Messages per second the server sends (default: as fast as possible)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic candles")
+    parser.add_argument("--output", help="Path of the JSON results (not written if not set)")
+    args: argparse.Namespace = parser.parse_args()
+
+    result: Dict[str, Any] = measure_stream(args.symbols, args.candles, args.trades, args.rate, args.seed)
+    print(f"{result['messages']} messages of {result['symbols']} symbols in {result['duration']:.2f}s: "
+          f"{result['messages_per_second']:.0f} messages/s  latency average {result['average_latency']:.2f}ms  "
+          f"max {result['max_latency']:.2f}ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+    # Fails if the replay did not finish in time
+    return 0 if result["messages"] == args.symbols * args.candles * (1 + args.trades) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
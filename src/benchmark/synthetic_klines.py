@@ -0,0 +1,104 @@
+import numpy as np
+
+from typing import List, Union
+from numpy import ndarray
+from numpy.random import Generator, SeedSequence
+from pandas import DataFrame
+from api.candle_store import CandleStore
+
+DEFAULT_START_TIME: int = 1577836800000  # 01.01.2020 00:00 UTC in milliseconds
+
+
+def generate_klines(count: int, seed: int = 42, interval: str = "1m", start_time: int = DEFAULT_START_TIME,
+                    start_price: float = 30000.0, volatility: float = 0.001) -> DataFrame:
+    """
+    Generates synthetic candlestick data with the columns of the Binance candlestick data.
+
+    The close prices follow a geometric random walk, every candle opens at the close of the previous one and its high
+    and low lie slightly above and below its open and close. Every column gets its own random generator derived from
+    the seed, so the same seed always gives the same candles, no matter how many candles get generated.
+
+    Parameters:
+        - count: (int) Number of candles
+        - seed: (int) Seed of the random generators
+        - interval: (str) The time interval of the candles
+        - start_time: (int) Open time of the first candle in milliseconds
+        - start_price: (float) Price the random walk starts at
+        - volatility: (float) Standard deviation of the log returns per candle
+
+    Returns:
+        Data frame with the columns time, open, high, low, close and volume (oldest candle first)
+    """
+    close_generator, high_generator, low_generator, volume_generator = [
+        np.random.default_rng(child) for child in SeedSequence(seed).spawn(4)]
+    interval_ms: int = CandleStore.INTERVAL_MILLISECONDS[interval]
+
+    times: ndarray = start_time + interval_ms * np.arange(count, dtype=np.float64)
+    close: ndarray = start_price * np.exp(np.cumsum(close_generator.normal(0.0, volatility, count)))
+    open_: ndarray = np.empty(count)
+    open_[:1] = start_price
+    open_[1:] = close[:-1]
+    high: ndarray = np.maximum(open_, close) * (1 + np.abs(high_generator.normal(0.0, volatility / 2, count)))
+    low: ndarray = np.minimum(open_, close) * (1 - np.abs(low_generator.normal(0.0, volatility / 2, count)))
+    volume: ndarray = volume_generator.lognormal(0.0, 1.0, count)
+    return DataFrame({"time": times, "open": open_, "high": high, "low": low, "close": close, "volume": volume})
+
+
+def to_raw_klines(klines: DataFrame, interval: str = "1m") -> List[List[Union[int, str]]]:
+    """
+    Converts candlestick data into the raw format of the Binance klines endpoint (all twelve fields per kline).
+
+    Parameters:
+        - klines: (DataFrame) Candlestick data as returned by generate_klines
+        - interval: (str) The time interval of the candles
+
+    Returns:
+        The klines like they get decoded from the JSON response of the api
+    """
+    interval_ms: int = CandleStore.INTERVAL_MILLISECONDS[interval]
+    raw_klines: List[List[Union[int, str]]] = list()
+    for time, open_, high, low, close, volume in klines[CandleStore.COLUMNS].itertuples(index=False):
+        raw_klines.append([
+            int(time),  # Open time
+            f"{open_:.8f}",  # Open
+            f"{high:.8f}",  # High
+            f"{low:.8f}",  # Low
+            f"{close:.8f}",  # Close
+            f"{volume:.8f}",  # Volume
+            int(time) + interval_ms - 1,  # Close time
+            f"{volume * close:.8f}",  # Quote asset volume
+            int(volume * 100),  # Number of trades
+            f"{volume / 2:.8f}",  # Taker buy base asset volume
+            f"{volume * close / 2:.8f}",  # Taker buy quote asset volume
+            "0",  # Ignore
+        ])
+    return raw_klines
+
+
+class SyntheticApi:
+    """
+    Offline data source that serves synthetic (or any other given) candlestick data like the Binance api.
+
+    Only the methods the backtests need are available, no request ever leaves the machine.
+    """
+
+    def __init__(self, klines: DataFrame, trading_fee: float = 0.001) -> None:
+        """
+        Parameters:
+            - klines: (DataFrame) The candlestick data that gets served (oldest candle first)
+            - trading_fee: (float) The trading fee of the simulated exchange
+        """
+        self.base: str = "synthetic"
+        self.trading_fee: float = trading_fee
+        self.klines: DataFrame = klines
+
+    def get_candlestick_data(self, symbol: str, interval: str = "1h", end_time: int = None,
+                             limit: int = 1000) -> DataFrame:
+        """Returns the latest 'limit' candles that opened before the end time"""
+        klines: DataFrame = self.klines
+        if end_time is not None:
+            klines = klines[klines["time"] <= end_time]
+        return klines.tail(limit).reset_index(drop=True)
+
+    def get_current_price(self, symbol: str = None) -> float:
+        return float(self.klines["close"].iloc[-1])
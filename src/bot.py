@@ -2,14 +2,13 @@ import logging
 
 from datetime import datetime
 from logging import Logger
-from typing import Union, List, Dict
-from uuid import UUID
+from typing import Union, List
 from pandas import DataFrame
 from api.binance import Binance
 from buy_signal import BuySignal
 from market_data import MarketData
 from strategies.moving_average_strategy import MovingAverageStrategy
-from transactions import BuyTransaction, SellTransaction
+from trade_ledger import TradeLedger
 
 logger: Logger = logging.getLogger("__main__")
 
@@ -19,9 +18,18 @@ class Bot:
     STATUS_INIT: str = "init"  # Bot got created but did not start to trade yet and has not traded before
     STATUS_ABORTED: str = "aborted"  # Bot encountered an exception which interrupted the bot
     STATUS_PAUSED: str = "paused"  # The bot got paused by the user
+    # Window of the market data: 2 months * 30 days * 24 hours * 60 minutes = 86.400 candles of one minute
+    MARKET_DATA_INTERVAL: str = "1m"  # Binance interval of one minute ("1M" would be one month)
+    MARKET_DATA_CAPACITY: int = 2 * 30 * 24 * 60
 
     def __init__(self, name: str, symbol: str, api: Union[Binance], strategy: Union[MovingAverageStrategy],
-                 starting_capital: float, buy_quantity: float, description: str = "") -> None:
+                 starting_capital: float, buy_quantity: float, description: str = "",
+                 market_data: MarketData = None) -> None:
+        """
+        Parameters:
+            - market_data: (MarketData) Window of the bot (e.g. the shared window of the symbol), gets collected from
+              the api if not passed
+        """
         self.id: int = -1  # Until the bot is not managed by the bot runner, its id will be -1
         self.name: str = name
         self.symbol: str = symbol
@@ -31,27 +39,26 @@ class Bot:
         self.capital: float = starting_capital
         self.buy_quantity: float = buy_quantity
         self.description: str = description
-        self.market_data: MarketData = self.__get_init_data()  # Create market data with historical price data
+        # Create market data with historical price data
+        self.market_data: MarketData = market_data if market_data is not None else self.__get_init_data()
         self.buy_signals: List[BuySignal] = list()
-        self.buy_transactions: List[BuyTransaction] = list()
-        self.sell_transactions: List[SellTransaction] = list()
-        self.not_sold_yet: Dict[UUID, BuySignal] = dict()
+        self.ledger: TradeLedger = TradeLedger()  # All buys and sells, tracks the coins we have not sold yet
         self.status: str = self.STATUS_INIT
 
     def __get_init_data(self) -> MarketData:
         logger.info(f"Collecting initial market data for bot '{self.name}'...")
+        return self.collect_market_data(self.api, self.symbol)
 
-        # Calculate limit: 2 months * 30 days * 24 hours * 60 minutes = 86.400 candles
-        #   -> Two months of price data for every minute
-        limit: int = 2 * 30 * 24 * 60
-        candlestick_df: DataFrame = self.api.get_candlestick_data(symbol=self.symbol, interval="1M", limit=limit)
+    @classmethod
+    def collect_market_data(cls, api: Union[Binance], symbol: str) -> MarketData:
+        """Collects the window of market data a bot of the symbol starts with"""
+        # Two months of price data for every minute
+        limit: int = cls.MARKET_DATA_CAPACITY
+        candlestick_df: DataFrame = api.get_candlestick_data(symbol=symbol, interval=cls.MARKET_DATA_INTERVAL,
+                                                             limit=limit)
 
-        # Extract only the time and price columns
-        times: List[datetime] = candlestick_df["time"].tolist()
-        prices: List[float] = candlestick_df["close"].tolist()
-
-        # Create market data object
-        market_data: MarketData = MarketData(self.symbol, times, prices)
+        # Create market data object holding the OHLCV columns of the candles
+        market_data: MarketData = MarketData.from_dataframe(symbol, candlestick_df, capacity=limit)
         return market_data
 
     def __update_price_data(self) -> None:
@@ -70,5 +77,15 @@ class Bot:
     def __sell(self):
         logger.info("Selling coin...")
 
-    def run(self):
-        pass
+    def add_price(self, time: datetime, price: float) -> None:
+        """Adds a price that got collected for this bot (e.g. by a shared price poller) to the market data"""
+        self.market_data.add_entry(time, price)
+
+    def evaluate(self) -> None:
+        """Evaluates the strategy on the current market data"""
+        self.__evaluate_buy()
+
+    def run(self) -> None:
+        """Runs one cycle of the bot: updates the price data and evaluates the strategy on it"""
+        self.__update_price_data()
+        self.evaluate()
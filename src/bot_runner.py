@@ -1,21 +1,94 @@
+from __future__ import annotations  # Bots and their heavy dependencies only get imported once a bot gets created
+
+import asyncio
 import logging
 
+from asyncio import AbstractEventLoop, Event, Task
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
-from typing import Dict
-from bot import Bot
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+from market_data_registry import MarketDataRegistry
+from price_poller import PricePoller
+
+if TYPE_CHECKING:
+    from api.binance import Binance
+    from bot import Bot
+    from bot_store import BotStore
+    from market_data import MarketData
+    from stream.market_stream import MarketStream
 
 logger: Logger = logging.getLogger("__main__")
 
 
 class BotRunner:
+    """
+    Manages the trading bots and drives all running bots.
+
+    Every 'cycle_interval' seconds, a shared price poller collects the current prices of all symbols with one batched
+    request and hands them to the market data of every running bot. With a market stream, the market data gets updated
+    by the stream as soon as new klines arrive instead, and nothing gets polled. Afterwards, every running bot gets
+    woken up in its own asyncio task and evaluates its strategy. Exchange calls and evaluations block, so they run on a
+    thread pool while the event loop only schedules them. The event loop runs in a background thread, so the methods of
+    the bot runner can be called from the (synchronous) command line interface.
+
+    Bots that trade the same symbol share one market data window, which gets collected once for the first of them.
+    The bots read views of the windows, which are only valid until the next write. So the evaluations read the windows
+    while holding the access lock of the registry, and the poller or stream only write while holding its write side.
+
+    With a bot store, the bots, their trades and their market data get persisted, so they can be restored after a
+    restart. Writing happens in the background thread of the store, the bots only queue their changes.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, cycle_interval: float = 60.0, max_workers: int = 16, price_api: Union[Binance] = None,
+                 store: BotStore = None, checkpoint_interval: float = 300.0, market_stream: MarketStream = None
+                 ) -> None:
+        """
+        Parameters:
+            - cycle_interval: (float) Seconds between the start of two cycles of a bot
+            - max_workers: (int) Number of threads the bots get evaluated on
+            - price_api: The api the prices get collected from, defaults to the api of the first started bot
+            - store: (BotStore) Persists the bots (not persisted if None)
+            - checkpoint_interval: (float) Seconds between two checkpoints of the market data of the running bots
+            - market_stream: (MarketStream) Feeds the market data of the running bots instead of the price poller, it
+              gets started with the first running bot and uses the access lock of the shared market data
+        """
         self.bot_id = 0
         self.bots: Dict[int, Bot] = dict()
+        self.cycle_interval: float = cycle_interval  # Seconds between the start of two cycles of a bot
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bot")
+        self.loop: Union[AbstractEventLoop, None] = None
+        self.loop_thread: Union[Thread, None] = None
+        self.loop_lock: Lock = Lock()
+        self.market_data_registry: MarketDataRegistry = MarketDataRegistry()  # Market data shared by the bots
+        # Collects the prices for all running bots at once
+        self.price_poller: PricePoller = PricePoller(price_api, lock=self.market_data_registry.access)
+        self.market_stream: Union[MarketStream, None] = market_stream
+        if market_stream:
+            market_stream.lock = self.market_data_registry.access
+        self.store: Union[BotStore, None] = store
+        self.checkpoint_interval: float = checkpoint_interval
+        # Only accessed within the event loop
+        self.tasks: Dict[int, Task] = dict()
+        self.poll_task: Union[Task, None] = None
+        self.wakeups: Dict[int, Event] = dict()  # Wakes a bot up after new prices arrived or when it gets stopped
+
+    def acquire_market_data(self, symbol: str, api: Union[Binance]) -> MarketData:
+        """
+        Returns the shared market data window of the symbol for a new bot, only the first bot of a symbol waits for the
+        window to be collected. The reference gets released when the bot gets deleted.
+
+        Parameters:
+            - symbol: (str) The symbol of the bot
+            - api: The api the window gets collected from if the symbol is not tracked yet
+        """
+        from bot import Bot
+        return self.market_data_registry.acquire(symbol, Bot.MARKET_DATA_INTERVAL,
+                                                 lambda: Bot.collect_market_data(api, symbol))
 
     def add_bot(self, bot: Bot) -> int:
         """
-        Adds a trading bot to the bot runner.
+        Adds a trading bot to the bot runner, its market data should be acquired from the bot runner.
 
         Parameters:
             bot: The bot that we want to add
@@ -28,28 +101,196 @@ class BotRunner:
         bot.id = new_id
         self.bots[bot.id] = bot
         self.bot_id = new_id
+        self.__save_bot(bot)
         return new_id
 
+    def restore_bots(self, api: Union[Binance]) -> int:
+        """
+        Restores the bots of the store with their ids, and starts the bots that were running before.
+
+        Parameters:
+            - api: The api of the restored bots
+
+        Returns:
+            The number of restored bots
+        """
+        bots: List[Bot] = self.store.load_bots(api, self.market_data_registry)
+        for bot in bots:
+            self.bots[bot.id] = bot
+            self.bot_id = max(self.bot_id, bot.id)
+        for bot in bots:
+            if bot.status == bot.STATUS_RUNNING:
+                self.start_bot(bot.id)
+        return len(bots)
+
     def delete_bot(self, bot_id: int) -> None:
-        logger.info(f"Removing bot '<name>' with ID {bot_id}...")
+        bot: Bot = self.bots.get(bot_id)
+        logger.info(f"Removing bot '{bot.name}' with ID {bot_id}...")
+        if bot.status == bot.STATUS_RUNNING:
+            self.stop_bot(bot_id)
         self.bots.pop(bot_id)
+        window: Union[MarketData, None] = self.market_data_registry.release(bot.symbol, bot.MARKET_DATA_INTERVAL)
+        if window is not None and self.market_stream:
+            self.market_stream.unsubscribe(bot.symbol, window)
+            if not self.market_stream.subscriptions and self.market_stream.running:
+                self.market_stream.stop()
+        if self.store:
+            self.store.delete_bot(bot_id)
 
     def start_bot(self, bot_id: int) -> None:
-        logger.info(f"Starting bot '<name>' with ID {bot_id}...")
         bot: Bot = self.bots.get(bot_id)
-        bot.status = Bot.STATUS_RUNNING
+        logger.info(f"Starting bot '{bot.name}' with ID {bot_id}...")
+        bot.status = bot.STATUS_RUNNING
+        self.__save_bot(bot)
+        self.__call_in_loop(self.__start_task(bot))
 
     def start_all_bots(self) -> None:
         logger.info(f"Starting all bots...")
-        for bot in self.bots:
-            bot.status = Bot.STATUS_RUNNING
+        for bot in self.bots.values():
+            bot.status = bot.STATUS_RUNNING
+            self.__save_bot(bot)
+            self.__call_in_loop(self.__start_task(bot))
 
     def stop_bot(self, bot_id: int) -> None:
-        logger.info(f"Stopping bot '<name>' with ID {bot_id}...")
+        """Pauses a bot, returns after the cycle the bot is currently running has finished"""
         bot: Bot = self.bots.get(bot_id)
-        bot.status = Bot.STATUS_PAUSED
+        logger.info(f"Stopping bot '{bot.name}' with ID {bot_id}...")
+        bot.status = bot.STATUS_PAUSED
+        self.__save_bot(bot)
+        if self.loop:
+            self.__call_in_loop(self.__stop_task(bot_id))
 
     def stop_all_bots(self) -> None:
         logger.info(f"Stopping all bots...")
-        for bot in self.bots:
-            bot.status = Bot.STATUS_PAUSED
+        for bot in self.bots.values():
+            if bot.status == bot.STATUS_RUNNING:
+                bot.status = bot.STATUS_PAUSED
+                self.__save_bot(bot)
+        if self.loop:
+            self.__call_in_loop(self.__stop_all_tasks())
+
+    def shutdown(self) -> None:
+        """Stops all bots and the scheduler, the bots get restored as running with the next restore"""
+        logger.info("Shutting down bot runner...")
+        running: List[Bot] = [bot for bot in self.bots.values() if bot.status == bot.STATUS_RUNNING]
+        self.stop_all_bots()
+        if self.market_stream and self.market_stream.running:
+            self.market_stream.stop()
+        with self.loop_lock:
+            if self.loop:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.loop_thread.join()
+                self.loop.close()
+                self.loop = None
+                self.loop_thread = None
+        self.executor.shutdown(wait=True)
+        if self.store:
+            for bot in running:
+                bot.status = bot.STATUS_RUNNING
+            for bot in self.bots.values():
+                self.store.save_bot(bot)
+                self.store.save_trades(bot)
+            self.__save_checkpoints()
+            self.store.close()
+
+    def __save_bot(self, bot: Bot) -> None:
+        if self.store:
+            self.store.save_bot(bot)
+
+    def __save_checkpoints(self) -> None:
+        """Saves the shared market data of every symbol"""
+        windows: List[Tuple[str, MarketData]] = self.market_data_registry.get_windows()
+        with self.market_data_registry.access.reading():
+            for interval, market_data in windows:
+                self.store.save_market_data(market_data, interval)
+
+    def __evaluate(self, bot: Bot) -> None:
+        """Evaluates the strategy of the bot, the market data does not change meanwhile"""
+        with self.market_data_registry.access.reading():
+            bot.evaluate()
+
+    def __call_in_loop(self, coroutine) -> None:
+        """Runs a coroutine within the event loop of the scheduler and waits for it to finish"""
+        with self.loop_lock:
+            if self.loop is None:
+                # Start the event loop lazily, with the first bot that gets started
+                self.loop = asyncio.new_event_loop()
+                self.loop_thread = Thread(target=self.loop.run_forever, name="bot-runner", daemon=True)
+                self.loop_thread.start()
+        asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def __start_task(self, bot: Bot) -> None:
+        task: Task = self.tasks.get(bot.id)
+        if task is None or task.done():
+            if self.market_stream:
+                self.market_stream.subscribe(bot.symbol, bot.market_data)
+                if not self.market_stream.running:
+                    self.market_stream.start()
+            else:
+                self.price_poller.subscribe(bot)
+            self.wakeups[bot.id] = Event()
+            self.tasks[bot.id] = asyncio.ensure_future(self.__run_bot(bot))
+        if self.poll_task is None or self.poll_task.done():
+            self.poll_task = asyncio.ensure_future(self.__poll_prices())
+
+    async def __stop_task(self, bot_id: int) -> None:
+        task: Task = self.tasks.pop(bot_id, None)
+        wakeup: Event = self.wakeups.pop(bot_id, None)
+        self.price_poller.unsubscribe(bot_id)
+        if not self.tasks and self.poll_task:
+            self.poll_task.cancel()  # No bot is running anymore
+            self.poll_task = None
+        if task is None:
+            return
+        wakeup.set()
+        await task  # The task ends after its current cycle because the bot is not running anymore
+
+    async def __stop_all_tasks(self) -> None:
+        await asyncio.gather(*[self.__stop_task(bot_id) for bot_id in list(self.tasks.keys())])
+
+    async def __run_bot(self, bot: Bot) -> None:
+        """Evaluates the strategy of a bot every time new prices arrived, as long as the bot is running"""
+        loop: AbstractEventLoop = asyncio.get_running_loop()
+        wakeup: Event = self.wakeups[bot.id]
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            if bot.status != bot.STATUS_RUNNING:
+                return
+            try:
+                await loop.run_in_executor(self.executor, self.__evaluate, bot)
+            except Exception as e:
+                logger.exception(f"Bot '{bot.name}' with ID {bot.id} got aborted: {e}")
+                bot.status = bot.STATUS_ABORTED
+                self.__save_bot(bot)
+                self.price_poller.unsubscribe(bot.id)
+                return
+            if self.store and self.store.save_trades(bot):
+                self.store.save_bot(bot)  # The trades changed the capital of the bot
+
+    async def __poll_prices(self) -> None:
+        """
+        Collects the prices for all running bots every cycle and wakes the bots up afterwards. With a market stream,
+        the market data is kept up to date by the stream, so the bots only get woken up.
+        """
+        loop: AbstractEventLoop = asyncio.get_running_loop()
+        next_cycle: float = loop.time()
+        next_checkpoint: float = loop.time() + self.checkpoint_interval
+        while self.tasks:
+            polled: bool = True
+            if not self.market_stream:
+                try:
+                    polled = await loop.run_in_executor(self.executor, self.price_poller.poll)
+                except Exception as e:
+                    logger.exception(f"Polling prices failed: {e}")
+                    polled = False
+            if polled:
+                for wakeup in self.wakeups.values():
+                    wakeup.set()
+            if self.store and loop.time() >= next_checkpoint:
+                await loop.run_in_executor(self.executor, self.__save_checkpoints)
+                next_checkpoint = loop.time() + self.checkpoint_interval
+
+            # Wait for the next cycle, if the cycle took longer than the interval we skip the missed cycles
+            next_cycle = max(next_cycle + self.cycle_interval, loop.time())
+            await asyncio.sleep(next_cycle - loop.time())
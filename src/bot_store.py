@@ -0,0 +1,293 @@
+from __future__ import annotations  # Bots and their heavy dependencies only get imported once bots get restored
+
+import inspect
+import json
+import logging
+import sqlite3
+import time
+
+from logging import Logger
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from api.binance import Binance
+    from bot import Bot
+    from market_data import MarketData
+    from market_data_registry import MarketDataRegistry
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class BotStore:
+    """
+    Persists the bots of the bot runner, their trades and their market data in a SQLite database (in WAL mode).
+
+    Writes never block the bots: they get queued and a background thread writes them in batches, one transaction per
+    batch. Trades get appended incrementally, only the trades recorded since the last save get queued. The market data
+    windows get saved as checkpoints (e.g. every few minutes and on shutdown), on restart only the candles that were
+    missed since the last checkpoint get collected from the api.
+    """
+    SCHEMA: List[str] = [
+        """CREATE TABLE IF NOT EXISTS bots (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL, symbol TEXT NOT NULL, strategy TEXT NOT NULL,
+            strategy_parameters TEXT NOT NULL, starting_capital REAL NOT NULL, capital REAL NOT NULL,
+            buy_quantity REAL NOT NULL, description TEXT NOT NULL, status TEXT NOT NULL)""",
+        """CREATE TABLE IF NOT EXISTS trades (
+            bot_id INTEGER NOT NULL, trade_id INTEGER NOT NULL, time REAL NOT NULL, side INTEGER NOT NULL,
+            price REAL NOT NULL, quantity REAL NOT NULL, amount REAL NOT NULL, fee REAL NOT NULL,
+            position_id INTEGER NOT NULL, PRIMARY KEY (bot_id, trade_id)) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS market_data (
+            symbol TEXT NOT NULL, interval TEXT NOT NULL, columns TEXT NOT NULL, capacity INTEGER NOT NULL,
+            size INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (symbol, interval))""",
+    ]
+    SQL_SAVE_BOT: str = ("INSERT OR REPLACE INTO bots (id, name, symbol, strategy, strategy_parameters, "
+                         "starting_capital, capital, buy_quantity, description, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, "
+                         "?, ?)")
+    SQL_SAVE_TRADE: str = ("INSERT OR REPLACE INTO trades (bot_id, trade_id, time, side, price, quantity, amount, fee, "
+                           "position_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    SQL_SAVE_MARKET_DATA: str = ("INSERT OR REPLACE INTO market_data (symbol, interval, columns, capacity, size, data) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_batch_size: int = 10000) -> None:
+        """
+        Parameters:
+            - path: (str) Path of the SQLite database, gets created if it does not exist
+            - flush_interval: (float) Seconds queued writes may wait to be batched with later writes
+            - max_batch_size: (int) Maximum number of queued writes per transaction
+        """
+        self.path: str = path
+        self.flush_interval: float = flush_interval
+        self.max_batch_size: int = max_batch_size
+        self.queue: Queue = Queue()  # Queued writes as (sql, rows), None stops the writer
+        self.writer: Union[Thread, None] = None
+        self.lock: Lock = Lock()
+        self.saved_trades: Dict[int, int] = dict()  # Number of trades per bot that are saved or queued already
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        connection: sqlite3.Connection = self.__connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")  # Persistent, readers do not block the writer
+            with connection:
+                for statement in self.SCHEMA:
+                    connection.execute(statement)
+        finally:
+            connection.close()
+
+    def has_bots(self) -> bool:
+        connection: sqlite3.Connection = self.__connect()
+        try:
+            return connection.execute("SELECT EXISTS (SELECT 1 FROM bots)").fetchone()[0] == 1
+        finally:
+            connection.close()
+
+    def save_bot(self, bot: Bot) -> None:
+        """Queues the configuration and state of a bot (not its trades and market data)"""
+        strategy_parameters: Dict[str, Any] = {
+            name: getattr(bot.strategy, name) for name in inspect.signature(type(bot.strategy).__init__).parameters
+            if name != "self" and hasattr(bot.strategy, name)}
+        self.__queue(self.SQL_SAVE_BOT, [(bot.id, bot.name, bot.symbol, type(bot.strategy).__name__,
+                                          json.dumps(strategy_parameters), bot.starting_capital, bot.capital,
+                                          bot.buy_quantity, bot.description, bot.status)])
+
+    def save_trades(self, bot: Bot) -> bool:
+        """
+        Queues the trades the bot recorded since its trades got saved the last time.
+
+        Returns:
+            False if there were no new trades
+        """
+        with self.lock:
+            first: int = self.saved_trades.get(bot.id, 0)
+            last: int = len(bot.ledger)
+            if first >= last:
+                return False
+            self.saved_trades[bot.id] = last
+        columns: List[List[Any]] = [bot.ledger.get_column(column)[first:last].tolist()
+                                    for column in bot.ledger.COLUMNS]
+        self.__queue(self.SQL_SAVE_TRADE, [(bot.id, trade_id, *values)
+                                           for trade_id, values in zip(range(first, last), zip(*columns))])
+        return True
+
+    def save_market_data(self, market_data: MarketData, interval: str) -> None:
+        """Queues a checkpoint of the market data window (copied, so the window can keep changing)"""
+        self.__queue(self.SQL_SAVE_MARKET_DATA, [(market_data.symbol, interval, json.dumps(market_data.columns),
+                                                  market_data.capacity, len(market_data),
+                                                  market_data.get_window().tobytes())])
+
+    def delete_bot(self, bot_id: int) -> None:
+        with self.lock:
+            self.saved_trades.pop(bot_id, None)
+        self.__queue("DELETE FROM trades WHERE bot_id = ?", [(bot_id,)])
+        self.__queue("DELETE FROM bots WHERE id = ?", [(bot_id,)])
+
+    def load_bots(self, api: Union[Binance], registry: MarketDataRegistry) -> List[Bot]:
+        """
+        Restores all saved bots with their trades and market data.
+
+        The market data of every symbol gets loaded once and is brought up to date by collecting only the candles that
+        were missed since the last checkpoint. Symbols without a checkpoint get their whole window collected. The bots
+        of a symbol share its window.
+
+        Parameters:
+            - api: The api of the restored bots
+            - registry: (MarketDataRegistry) Tracks the shared windows, every restored bot holds a reference
+
+        Returns:
+            The restored bots (ordered by id), with their saved ids and status
+        """
+        from bot import Bot
+        from strategies.moving_average_strategy import MovingAverageStrategy
+        from trade_ledger import TradeLedger
+        strategy_classes: Dict[str, type] = {MovingAverageStrategy.__name__: MovingAverageStrategy}
+
+        self.flush()
+        connection: sqlite3.Connection = self.__connect()
+        try:
+            bot_rows: List[Tuple] = connection.execute(
+                "SELECT id, name, symbol, strategy, strategy_parameters, starting_capital, capital, buy_quantity, "
+                "description, status FROM bots ORDER BY id").fetchall()
+            bots: List[Bot] = list()
+            for (bot_id, name, symbol, strategy_name, strategy_parameters, starting_capital, capital, buy_quantity,
+                 description, status) in bot_rows:
+                strategy_class: Union[type, None] = strategy_classes.get(strategy_name)
+                if strategy_class is None:
+                    logger.error(f"Could not restore bot '{name}' with ID {bot_id}: unknown strategy {strategy_name}")
+                    continue
+                market_data: MarketData = registry.acquire(
+                    symbol, Bot.MARKET_DATA_INTERVAL,
+                    lambda: self.__restore_market_data(connection, api, symbol, Bot.MARKET_DATA_INTERVAL))
+                bot: Bot = Bot(name, symbol, api, strategy_class(**json.loads(strategy_parameters)), starting_capital,
+                               buy_quantity, description, market_data=market_data)
+                bot.id = bot_id
+                bot.capital = capital
+                bot.status = status
+                bot.ledger = TradeLedger()
+                for _, time_, side, price, quantity, amount, fee, position_id in connection.execute(
+                        "SELECT trade_id, time, side, price, quantity, amount, fee, position_id FROM trades "
+                        "WHERE bot_id = ? ORDER BY trade_id", (bot_id,)):
+                    if side == TradeLedger.SIDE_BUY:
+                        bot.ledger.add_buy(time_, price, quantity, amount, fee)
+                    else:
+                        bot.ledger.add_sell(position_id, time_, price, quantity, amount, fee)
+                with self.lock:
+                    self.saved_trades[bot_id] = len(bot.ledger)
+                bots.append(bot)
+        finally:
+            connection.close()
+        logger.info(f"Restored {len(bots)} bots from {self.path}")
+        return bots
+
+    def flush(self) -> None:
+        """Waits until all queued writes are written"""
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self) -> None:
+        """Writes all queued writes and stops the writer"""
+        with self.lock:
+            writer: Union[Thread, None] = self.writer
+            self.writer = None
+        if writer is not None:
+            self.queue.put(None)
+            writer.join()
+
+    def __queue(self, sql: str, rows: List[Tuple]) -> None:
+        with self.lock:
+            if self.writer is None:
+                # Start the writer lazily, with the first write
+                self.writer = Thread(target=self.__write, name="bot-store", daemon=True)
+                self.writer.start()
+        self.queue.put((sql, rows))
+
+    def __write(self) -> None:
+        """Writes the queued writes in batches, until it gets stopped"""
+        connection: sqlite3.Connection = self.__connect()
+        try:
+            running: bool = True
+            while running:
+                batch: List[Tuple[str, List[Tuple]]] = [self.queue.get()]
+                deadline: float = time.monotonic() + self.flush_interval
+                # Collect the writes that arrive within the flush interval into the same transaction
+                while batch[-1] is not None and len(batch) < self.max_batch_size:
+                    try:
+                        batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except Empty:
+                        break
+                running = batch[-1] is not None
+                try:
+                    with connection:
+                        for write in batch:
+                            if write is not None:
+                                connection.executemany(*write)
+                except sqlite3.Error as e:
+                    logger.error(f"Could not write {len(batch)} changes to {self.path}: {e}")
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+        finally:
+            connection.close()
+
+    def __connect(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=30.0)
+        connection.execute("PRAGMA synchronous=NORMAL")  # Safe in WAL mode, only the last commits may get lost
+        return connection
+
+    def __restore_market_data(self, connection: sqlite3.Connection, api: Union[Binance], symbol: str, interval: str
+                              ) -> MarketData:
+        """Restores the window from its checkpoint, or collects the whole window if there is no usable checkpoint"""
+        from bot import Bot
+        market_data: Union[MarketData, None] = self.__load_market_data(connection, api, symbol, interval)
+        if market_data is None:
+            market_data = Bot.collect_market_data(api, symbol)
+        return market_data
+
+    def __load_market_data(self, connection: sqlite3.Connection, api: Union[Binance], symbol: str, interval: str
+                           ) -> Union[MarketData, None]:
+        """
+        Loads the checkpoint of the market data and collects the candles that were missed since then.
+
+        Returns:
+            - The up to date market data
+            - None if there is no usable checkpoint (the window has to be collected from scratch)
+        """
+        import numpy as np
+        import pandas as pd
+        from api.candle_store import CandleStore
+        from market_data import MarketData
+
+        row: Union[Tuple, None] = connection.execute(
+            "SELECT columns, capacity, size, data FROM market_data WHERE symbol = ? AND interval = ?",
+            (symbol, interval)).fetchone()
+        interval_ms: Union[int, None] = CandleStore.INTERVAL_MILLISECONDS.get(interval)
+        if row is None or not interval_ms:
+            return None
+        columns: List[str] = json.loads(row[0])
+        entries: np.ndarray = np.frombuffer(row[3], dtype=np.float64).reshape(row[2], len(columns))
+        if not len(entries) or columns != MarketData.COLUMNS_OHLCV:
+            return None
+        market_data: MarketData = MarketData(symbol, capacity=row[1], columns=columns)
+
+        # Collect the candles since the one the latest entry of the checkpoint belongs to. The latest entries may be
+        # prices polled within that candle (at any time, not at its open time), so they get replaced by the candle.
+        last_time: int = int(entries[-1, 0]) // interval_ms * interval_ms
+        missed: int = int((time.time() * 1000 - last_time) // interval_ms) + 1
+        if missed >= market_data.capacity:
+            return None  # Down for longer than the window, nothing of the checkpoint would be kept
+        logger.info(f"Collecting {missed} missed candles of {symbol}...")
+        df: Union[DataFrame, bool] = api.get_candlestick_data(symbol=symbol, interval=interval, limit=missed)
+        if not isinstance(df, pd.DataFrame):
+            logger.error(f"Could not collect the missed candles of {symbol}, continuing with the checkpoint")
+            market_data.add_entries(entries)
+            return market_data
+        rows: np.ndarray = df.loc[df["time"] >= last_time, columns].to_numpy(dtype=np.float64)
+        if not len(rows):
+            market_data.add_entries(entries)
+            return market_data
+        # Keep the entries before the first collected candle, the collected candles hold their final values
+        market_data.add_entries(entries[:int(np.searchsorted(entries[:, 0], rows[0, 0], side="left"))])
+        market_data.add_entries(rows)
+        return market_data
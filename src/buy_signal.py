@@ -5,6 +5,8 @@ from uuid import UUID
 
 
 class BuySignal:
+    __slots__ = ("signal_id", "price", "time", "accepted")
+
     def __init__(self, price: float, time: datetime, ) -> None:
         self.signal_id: UUID = uuid.uuid4()
         self.price: float = price
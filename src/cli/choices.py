@@ -1,8 +1,15 @@
-from typing import Union, List, Tuple
+from __future__ import annotations  # Strategies and the candle store only get imported once they are chosen
+
+import os
+
+from typing import TYPE_CHECKING, Union, List, Tuple
 
 from api.binance import Binance
 from cli.cli_util import choose_option
-from strategies.moving_average_strategy import MovingAverageStrategy
+from util import get_project_root
+
+if TYPE_CHECKING:
+    from strategies.moving_average_strategy import MovingAverageStrategy
 
 
 def choose_api(header: str) -> Union[Binance, int]:
@@ -11,7 +18,9 @@ def choose_api(header: str) -> Union[Binance, int]:
     api_choice: int = choose_option(api_title, api_options, header)
 
     if api_choice == 1:
-        return Binance()
+        from api.candle_store import CandleStore
+        return Binance(candle_store=CandleStore(),
+                       exchange_info_path=os.path.join(get_project_root(), "data/exchange_info.json"))
     elif api_choice == 99:
         return 99
 
@@ -37,6 +46,7 @@ def choose_strat(header: str) -> Union[MovingAverageStrategy, int]:
     strat_choice: int = choose_option(strat_title, strat_options, header)
 
     if strat_choice == 1:
+        from strategies.moving_average_strategy import MovingAverageStrategy
         return MovingAverageStrategy()
     elif strat_choice == 99:
         return 99
@@ -1,24 +1,33 @@
+from __future__ import annotations  # Backtests and bots only get imported once the user creates one
+
 import sys
 import logging_conf  # Init the logger config (do not remove)
 
 from prompt_toolkit import prompt
-from typing import List, Union
-from api.binance import Binance
-from backtest.backtest import Backtest
-from bot import Bot
+from typing import TYPE_CHECKING, List, Union
 from bot_runner import BotRunner
 from cli.choices import choose_api, choose_symbol, choose_strat, choose_time_frame
 from cli.headers import HEADER_NEW_BACKTEST, HEADER_WELCOME, HEADER_NEW_BOT, HEADER_DISPLAY_BOTS
 from cli.cli_util import choose_option, display_header, print_bold
 from cli.validators import FloatValidator, YesNoValidator
-from strategies.moving_average_strategy import MovingAverageStrategy
 from util import TerminalColors
 
+if TYPE_CHECKING:
+    from api.binance import Binance
+    from market_data import MarketData
+    from strategies.moving_average_strategy import MovingAverageStrategy
+
 
 class CommandLineInterface:
 
-    def __init__(self, bot_runner: BotRunner) -> None:
+    def __init__(self, bot_runner: BotRunner, profile: bool = False) -> None:
+        """
+        Parameters:
+            - bot_runner: (BotRunner) Runs the trading bots
+            - profile: (bool) Whether backtests record and write a profile of the time and memory of their stages
+        """
         self.bot_runner: BotRunner = bot_runner
+        self.profile: bool = profile
 
     def display_main_menu(self) -> None:
         """Displays the main menu and lets the user choose what he would like to do."""
@@ -76,8 +85,10 @@ class CommandLineInterface:
         print("")
 
         if user_input == "y":
-            # Create backtest
-            backtest: Backtest = Backtest(symbol, api, strategy, starting_capital, buy_quantity, kline_limit)
+            # Create backtest (imported on demand, it pulls in plotly)
+            from backtest.backtest import Backtest
+            backtest: Backtest = Backtest(symbol, api, strategy, starting_capital, buy_quantity, kline_limit,
+                                          profile=self.profile)
             backtest.run()
             input("Press Enter to continue...")
         elif user_input == "n":
@@ -128,7 +139,11 @@ class CommandLineInterface:
 
         if user_input == "y":
             # Create bot
-            bot: Bot = Bot(name, symbol, api, strategy, starting_capital, buy_quantity, description)
+            from bot import Bot
+            # Bots of an already tracked symbol share its market data, only the first one collects it
+            market_data: MarketData = self.bot_runner.acquire_market_data(symbol, api)
+            bot: Bot = Bot(name, symbol, api, strategy, starting_capital, buy_quantity, description,
+                           market_data=market_data)
             bot_id: int = self.bot_runner.add_bot(bot)
         elif user_input == "n":
             return
@@ -1,5 +1,6 @@
 import logging
 
+from typing import Iterable
 from pandas import DataFrame
 from logging import Logger
 from pyti.smoothed_moving_average import smoothed_moving_average as sma
@@ -12,12 +13,38 @@ logger: Logger = logging.getLogger("__main__")
 class Indicator(ABC):
     def __init__(self, name: str) -> None:
         self.name: str = name
+        self.value: float = float("nan")  # Latest value of the indicator in streaming mode
 
     @abstractmethod
     def add_data(self, data: DataFrame, column_name: str):
         # Needs to be overridden in every subclass
         raise NotImplementedError("Missing implementation: Please override this method in the subclass")
 
+    def reset(self) -> None:
+        """Resets the state of the streaming mode"""
+        # Needs to be overridden in every subclass that supports the streaming mode
+        raise NotImplementedError("Missing implementation: Please override this method in the subclass")
+
+    def update(self, price: float) -> float:
+        """Updates the indicator with the next price in O(1) and returns its new value (streaming mode)"""
+        # Needs to be overridden in every subclass that supports the streaming mode
+        raise NotImplementedError("Missing implementation: Please override this method in the subclass")
+
+    def start_stream(self, prices: Iterable[float]) -> float:
+        """
+        Starts the streaming mode with the historical prices, afterwards every new price only needs an update.
+
+        Parameters:
+            - prices: The historical prices (oldest price first)
+
+        Returns:
+            The latest value of the indicator
+        """
+        self.reset()
+        for price in prices:
+            self.update(price)
+        return self.value
+
 
 # Subclass
 class SimpleMovingAverage(Indicator):
@@ -26,6 +53,9 @@ class SimpleMovingAverage(Indicator):
         logger.info(f"Creating new indicator {name}...")
         super().__init__(name)  # Init parent class
         self.period: int = period
+        # State of the streaming mode
+        self.weight_factor: float = 1 - 1.0 / period  # Weight decay of the previous prices per new price
+        self.weight: float = 0.0  # Sum of the weights of all previous prices
 
     def add_data(self, data: DataFrame, column_name: str) -> DataFrame:
         """
@@ -41,3 +71,35 @@ class SimpleMovingAverage(Indicator):
         logger.info(f"Adding indicator '{self.name}' to market data...")
         data[self.name] = sma(data[column_name].tolist(), self.period)
         return data
+
+    def reset(self) -> None:
+        self.value = float("nan")
+        self.weight = 0.0
+
+    def update(self, price: float) -> float:
+        """
+        Updates the smoothed moving average with the next price.
+
+        The batch calculation is an adjusted exponentially weighted mean with alpha = 1 / period. Every new price gets the
+        weight 1 while the weights of all previous prices decay by (1 - alpha), so we only need to keep the current mean
+        and the sum of the previous weights. The steps are the same as in the batch calculation, which gives the same
+        values.
+
+        Parameters:
+            - price: (float) The next price
+
+        Returns:
+            The new value of the sma
+        """
+        if price != price:
+            # Missing prices do not change the mean, but the previous prices still lose weight
+            self.weight *= self.weight_factor
+        elif self.value != self.value:
+            self.value = price
+            self.weight = 1.0
+        else:
+            self.weight *= self.weight_factor
+            if self.value != price:
+                self.value = (self.weight * self.value + price) / (self.weight + 1.0)
+            self.weight += 1.0
+        return self.value
@@ -1,15 +1,42 @@
+import argparse
+import os
+
 from bot_runner import BotRunner
+from bot_store import BotStore
 from cli.cli import CommandLineInterface
+from util import get_project_root
 
 
 def main():
-    # If db exists
-    #   load config
-    # else
-    #   create new bot runner
-    bot_runner: BotRunner = BotRunner()
-    cli: CommandLineInterface = CommandLineInterface(bot_runner)
-    cli.display_main_menu()
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Algorithmic trading command line interface")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print and write a profile of the time and memory of every stage of the backtests")
+    parser.add_argument("--stream", action="store_true",
+                        help="Feed the running bots from the Binance market streams instead of polling the prices")
+    args: argparse.Namespace = parser.parse_args()
+
+    market_stream = None
+    if args.stream:
+        # Only needed for streaming, so the stream and its dependencies do not slow down the startup otherwise
+        from api.binance import Binance
+        from bot import Bot
+        from stream.market_stream import MarketStream
+        from stream.transports import BinanceWebSocketTransport
+        market_stream = MarketStream(BinanceWebSocketTransport(), api=Binance(), interval=Bot.MARKET_DATA_INTERVAL)
+
+    # Restore the bots of the last session (running bots continue to run)
+    store: BotStore = BotStore(os.path.join(get_project_root(), "data/bots.db"))
+    bot_runner: BotRunner = BotRunner(store=store, market_stream=market_stream)
+    if store.has_bots():
+        from api.binance import Binance
+        from api.candle_store import CandleStore
+        bot_runner.restore_bots(Binance(candle_store=CandleStore(),
+                                        exchange_info_path=os.path.join(get_project_root(), "data/exchange_info.json")))
+    cli: CommandLineInterface = CommandLineInterface(bot_runner, profile=args.profile)
+    try:
+        cli.display_main_menu()
+    finally:
+        bot_runner.shutdown()  # Persists the state of all bots
 
 
 if __name__ == "__main__":
@@ -1,33 +1,167 @@
 import logging
+import numpy as np
 
 from datetime import datetime
 from logging import Logger
-from typing import List
+from typing import Dict, List, Sequence, Tuple, Union
+from numpy import ndarray
 from pandas import DataFrame
 
 logger: Logger = logging.getLogger("__main__")
 
 
 class MarketData:
+    """
+    Fixed size window of the latest market data of a symbol.
 
-    def __init__(self, symbol: str, init_times: List[datetime], init_prices: List[float]) -> None:
+    The entries are kept in a NumPy ring buffer with one row per column, so adding an entry is O(1) and the oldest entry
+    gets dropped once the window is full. Every entry gets written twice, once at its slot and once at its slot plus the
+    capacity. Because of that, the window of every column is always one contiguous slice of the buffer and can be handed
+    out as array or data frame without copying. Those views share the memory of the buffer, so they are only valid until
+    the next entry gets added.
+    """
+    COLUMNS_PRICE: List[str] = ["time", "price"]
+    COLUMNS_OHLCV: List[str] = ["time", "open", "high", "low", "close", "volume"]
+
+    def __init__(self, symbol: str, init_times: Sequence[Union[datetime, float]] = (),
+                 init_prices: Sequence[float] = (), capacity: int = None, columns: List[str] = None) -> None:
+        """
+        Parameters:
+            - symbol: (str) The symbol of the market data
+            - init_times: Times of the initial prices (datetimes or timestamps in milliseconds)
+            - init_prices: Initial prices of the window
+            - capacity: (int) Maximum number of entries, defaults to the number of initial prices
+            - columns: (List[str]) Columns of the window, either the price columns or the OHLCV columns
+        """
         logger.info("Creating new market data...")
         self.symbol: str = symbol
-        self.times: List[datetime] = init_times
-        self.prices: List[float] = init_prices
+        self.columns: List[str] = list(columns or self.COLUMNS_PRICE)
+        self.capacity: int = max(capacity or len(init_prices), 1)
+        self.buffer: ndarray = np.zeros((len(self.columns), 2 * self.capacity), dtype=np.float64)
+        self.end: int = 0  # Slot the next entry will be written to
+        self.size: int = 0  # Number of entries in the window
+        if len(init_prices):
+            times: ndarray = np.array([self.__to_timestamp(time) for time in init_times], dtype=np.float64)
+            prices: ndarray = np.asarray(init_prices, dtype=np.float64)
+            if self.columns == self.COLUMNS_PRICE:
+                self.add_entries(np.column_stack([times, prices]))
+            else:
+                self.add_entries(np.column_stack([times, prices, prices, prices, prices, np.zeros(len(prices))]))
+
+    @classmethod
+    def from_dataframe(cls, symbol: str, df: DataFrame, capacity: int = None,
+                       columns: List[str] = None) -> "MarketData":
+        """
+        Creates market data from a data frame (e.g. candlestick data).
+
+        Parameters:
+            - symbol: (str) The symbol of the market data
+            - df: (DataFrame) Frame containing all columns of the window
+            - capacity: (int) Maximum number of entries, defaults to the number of rows
+            - columns: (List[str]) Columns of the window, defaults to the OHLCV columns
+
+        Returns:
+            - The market data holding the rows of the frame
+        """
+        columns = list(columns or cls.COLUMNS_OHLCV)
+        market_data: MarketData = cls(symbol, capacity=capacity or len(df), columns=columns)
+        market_data.add_entries(df[columns].to_numpy(dtype=np.float64))
+        return market_data
+
+    @property
+    def times(self) -> ndarray:
+        return self.get_array("time")
+
+    @property
+    def prices(self) -> ndarray:
+        return self.get_array("price" if "price" in self.columns else "close")
+
+    def add_entry(self, time: Union[datetime, float], price: float) -> None:
+        """Adds the latest price to the window (for OHLCV windows as candle with the price as open/high/low/close)"""
+        timestamp: float = self.__to_timestamp(time)
+        if self.columns == self.COLUMNS_PRICE:
+            self.add_row((timestamp, price))
+        else:
+            self.add_row((timestamp, price, price, price, price, 0.0))
+
+    def add_row(self, row: Sequence[float]) -> None:
+        """Adds one entry with a value for every column and drops the oldest entry if the window is full"""
+        self.buffer[:, self.end] = row
+        self.buffer[:, self.end + self.capacity] = row
+        self.end = (self.end + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
 
-    def add_entry(self, time: datetime, price: float):
-        # Append entry to the end
-        self.times.append(time)
-        self.prices.append(price)
-        # Remove oldest entry to keep the same amount of entries
-        self.times.pop(0)
-        self.prices.pop(0)
+    def add_entries(self, rows: ndarray) -> None:
+        """Adds many entries at once, rows is a 2D array with a value for every column"""
+        rows = rows[-self.capacity:]  # Older rows would be dropped right away
+        for first, last, offset in self.__split_at_wrap(len(rows)):
+            self.buffer[:, first:last] = rows[offset:offset + last - first].T
+            self.buffer[:, first + self.capacity:last + self.capacity] = rows[offset:offset + last - first].T
+        self.end = (self.end + len(rows)) % self.capacity
+        self.size = min(self.size + len(rows), self.capacity)
+
+    def update_latest_row(self, row: Sequence[float]) -> None:
+        """Overwrites the latest entry (e.g. a candle that is not closed yet)"""
+        if not self.size:
+            self.add_row(row)
+            return
+        latest: int = (self.end - 1) % self.capacity
+        self.buffer[:, latest] = row
+        self.buffer[:, latest + self.capacity] = row
+
+    def get_window(self) -> ndarray:
+        """Returns all entries as 2D array with one row per entry (oldest entry first), as view on the buffer"""
+        return self.__get_columns().T
+
+    def get_array(self, column: str) -> ndarray:
+        """Returns the values of one column (oldest entry first), as contiguous view on the buffer"""
+        return self.__get_columns()[self.columns.index(column)]
 
     def create_dataframe(self) -> DataFrame:
-        return DataFrame(list(zip(self.times, self.prices)), columns=["time", "price"])
+        """Returns the window as data frame that shares the memory of the buffer"""
+        return DataFrame(self.get_window(), columns=self.columns, copy=False)
+
+    def resample(self, interval: str) -> DataFrame:
+        """
+        Aggregates the window into candles of a longer interval (e.g. '15m' or '1h') without collecting any candles.
+        The oldest candle gets dropped if the window starts within it, the latest candle may still be open.
+        """
+        from api.candle_resampler import resample_candles
+        from api.candle_store import CandleStore
+        window: ndarray = self.__get_columns()
+        prices: ndarray = self.prices
+        columns: Dict[str, ndarray] = {col: window[self.columns.index(col)] if col in self.columns else prices
+                                       for col in CandleStore.COLUMNS if col != "volume"}
+        columns["volume"] = window[self.columns.index("volume")] if "volume" in self.columns else np.zeros(len(self))
+        resampled: Dict[str, ndarray] = resample_candles(columns, CandleStore.INTERVAL_MILLISECONDS[interval],
+                                                         drop_partial_first=True)
+        return DataFrame(resampled, columns=CandleStore.COLUMNS)
+
+    def get_latest_entry(self) -> Tuple[float, float]:
+        latest: int = (self.end - 1) % self.capacity
+        price_index: int = self.columns.index("price" if "price" in self.columns else "close")
+        return self.buffer[0, latest], self.buffer[price_index, latest]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __get_columns(self) -> ndarray:
+        """Returns the window with one row per column, the slots of the window never wrap around in the buffer"""
+        if self.end >= self.size:
+            return self.buffer[:, self.end - self.size:self.end]
+        return self.buffer[:, self.end - self.size + self.capacity:self.end + self.capacity]
+
+    def __split_at_wrap(self, count: int) -> List[Tuple[int, int, int]]:
+        """Splits the next 'count' slots into parts that do not wrap around (first slot, last slot, row offset)"""
+        first_part: int = min(count, self.capacity - self.end)
+        parts: List[Tuple[int, int, int]] = [(self.end, self.end + first_part, 0)]
+        if first_part < count:
+            parts.append((0, count - first_part, first_part))
+        return parts
 
-    def get_latest_entry(self):
-        time: datetime = self.times[len(self.times)-1]
-        price: float = self.prices[len(self.times)-1]
-        return time, price
+    @staticmethod
+    def __to_timestamp(time: Union[datetime, float]) -> float:
+        """Converts datetimes to timestamps in milliseconds (the format of the candlestick data)"""
+        if isinstance(time, datetime):
+            return time.timestamp() * 1000
+        return float(time)
@@ -0,0 +1,132 @@
+from __future__ import annotations  # Market data only gets imported once a window gets loaded
+
+import logging
+
+from contextlib import contextmanager
+from logging import Logger
+from threading import Condition, Lock
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from market_data import MarketData
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class ReadWriteLock:
+    """
+    Lets any number of readers or a single writer access the shared windows.
+
+    Readers (e.g. evaluating bots) work on views of the windows, which are only valid until the next write. Writers
+    (e.g. the price poller or a market stream) wait until all readers are done. Waiting writers go first, so a steady
+    stream of readers cannot hold back the updates.
+    """
+
+    def __init__(self) -> None:
+        self.condition: Condition = Condition()
+        self.readers: int = 0
+        self.writer_active: bool = False
+        self.writers_waiting: int = 0
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        with self.condition:
+            self.condition.wait_for(lambda: not self.writer_active and not self.writers_waiting)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        with self.condition:
+            self.writers_waiting += 1
+            self.condition.wait_for(lambda: not self.writer_active and not self.readers)
+            self.writers_waiting -= 1
+            self.writer_active = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer_active = False
+                self.condition.notify_all()
+
+
+class MarketDataRegistry:
+    """
+    Shares one market data window per (symbol, interval) between all bots that trade the symbol.
+
+    The windows are reference counted: the first bot of a symbol loads the window, every further bot gets the same
+    window right away and the window gets dropped once the last bot released it. Because the bots share the window, it
+    has to be updated once per symbol (not once per bot). Everything that reads or writes the windows while the bots
+    run has to hold the access lock of the registry.
+    """
+
+    def __init__(self) -> None:
+        self.windows: Dict[Tuple[str, str], MarketData] = dict()
+        self.references: Dict[Tuple[str, str], int] = dict()
+        self.lock: Lock = Lock()
+        self.loading_locks: Dict[Tuple[str, str], Lock] = dict()  # Loads a window only once, even if acquired at once
+        self.access: ReadWriteLock = ReadWriteLock()  # Keeps the readers and writers of all windows apart
+
+    def acquire(self, symbol: str, interval: str, load: Callable[[], MarketData]) -> MarketData:
+        """
+        Returns the window of the symbol and interval and adds a reference to it.
+
+        Parameters:
+            - symbol: (str) The symbol of the window
+            - interval: (str) The candle interval of the window
+            - load: Creates the window if it is not tracked yet
+
+        Returns:
+            The shared window
+        """
+        key: Tuple[str, str] = (symbol, interval)
+        with self.lock:
+            loading_lock: Lock = self.loading_locks.setdefault(key, Lock())
+        with loading_lock:
+            with self.lock:
+                if key in self.windows:
+                    self.references[key] += 1
+                    return self.windows[key]
+            logger.info(f"Loading shared market data of {symbol} ({interval})...")
+            market_data: MarketData = load()  # Other symbols can be acquired meanwhile
+            with self.lock:
+                self.windows[key] = market_data
+                self.references[key] = 1
+            return market_data
+
+    def release(self, symbol: str, interval: str) -> Union[MarketData, None]:
+        """
+        Removes a reference to the window, the window gets dropped with its last reference.
+
+        Returns:
+            - The window if it got dropped
+            - None if it is still referenced
+        """
+        key: Tuple[str, str] = (symbol, interval)
+        with self.lock:
+            if key not in self.references:
+                return None
+            self.references[key] -= 1
+            if self.references[key] > 0:
+                return None
+            logger.info(f"Dropping shared market data of {symbol} ({interval})...")
+            self.references.pop(key)
+            return self.windows.pop(key)
+
+    def get_reference_count(self, symbol: str, interval: str) -> int:
+        with self.lock:
+            return self.references.get((symbol, interval), 0)
+
+    def get_windows(self) -> List[Tuple[str, MarketData]]:
+        """Returns the interval and window of every tracked symbol"""
+        with self.lock:
+            return [(interval, market_data) for (_, interval), market_data in self.windows.items()]
+
+    def __len__(self) -> int:
+        return len(self.windows)
@@ -0,0 +1,77 @@
+from __future__ import annotations  # Bots and their heavy dependencies only get imported once a bot gets created
+
+import contextlib
+import logging
+
+from datetime import datetime
+from logging import Logger
+from threading import Lock
+from typing import TYPE_CHECKING, ContextManager, Dict, Set, Union
+
+if TYPE_CHECKING:
+    from api.binance import Binance
+    from bot import Bot
+    from market_data_registry import ReadWriteLock
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class PricePoller:
+    """
+    Collects the current prices for many bots with a constant number of requests.
+
+    Every poll makes one server time request and one request for the prices of all symbols, no matter how many bots
+    are subscribed. The prices then get added to the market data of the subscribed bots, once per window because bots
+    of the same symbol share their window. With a lock, the prices get added while holding its write side, the
+    requests happen before.
+    """
+
+    def __init__(self, api: Union[Binance] = None, lock: ReadWriteLock = None) -> None:
+        self.api: Union[Binance, None] = api  # If not set, the api of the first subscribed bot gets used
+        self.market_data_lock: Union[ReadWriteLock, None] = lock  # Lock of the readers of the market data
+        self.subscribers: Dict[int, Bot] = dict()
+        self.lock: Lock = Lock()
+
+    def subscribe(self, bot: Bot) -> None:
+        with self.lock:
+            if self.api is None:
+                self.api = bot.api
+            self.subscribers[bot.id] = bot
+
+    def unsubscribe(self, bot_id: int) -> None:
+        with self.lock:
+            self.subscribers.pop(bot_id, None)
+
+    def poll(self) -> bool:
+        """
+        Collects the current prices of all symbols and adds them to the market data of all subscribed bots.
+
+        Returns:
+            - True if the prices got collected
+            - False in case of missing price data
+        """
+        with self.lock:
+            subscribers: Dict[int, Bot] = dict(self.subscribers)
+        if not subscribers:
+            return True
+
+        logger.debug(f"Polling prices for {len(subscribers)} bots...")
+        server_time: Union[datetime, bool] = self.api.get_server_time()
+        prices: Union[Dict[str, float], bool] = self.api.get_current_price()
+        if not server_time or not prices:
+            logger.error("Missing price data, could not update the market data of the bots")
+            return False
+
+        updated: Set[int] = set()  # Windows that got the price already
+        writing: ContextManager = self.market_data_lock.writing() if self.market_data_lock else contextlib.nullcontext()
+        with writing:
+            for bot in subscribers.values():
+                if id(bot.market_data) in updated:
+                    continue
+                price: float = prices.get(bot.symbol)
+                if price is None:
+                    logger.error(f"Missing price for symbol '{bot.symbol}' of bot '{bot.name}'")
+                    continue
+                bot.add_price(server_time, price)
+                updated.add(id(bot.market_data))
+        return True
@@ -0,0 +1,195 @@
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+from logging import Logger
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Set, Union
+
+logger: Logger = logging.getLogger("__main__")
+
+# The profiler that records the stages of the current context (e.g. of the running backtest), None if no profiler does
+_recording: contextvars.ContextVar = contextvars.ContextVar("profiler_recording", default=None)
+
+
+class StageStats:
+    """Wall time, call count and peak memory of one stage"""
+    __slots__ = ("calls", "total_time", "min_time", "max_time", "peak_memory")
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.total_time: float = 0.0
+        self.min_time: float = float("inf")
+        self.max_time: float = 0.0
+        self.peak_memory: int = 0  # Highest memory allocated on top of the memory at the start of a call (in bytes)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "total_time": self.total_time,
+            "mean_time": self.total_time / self.calls if self.calls else 0.0,
+            "min_time": self.min_time if self.calls else 0.0,
+            "max_time": self.max_time,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class _Frame:
+    """A running call of a stage"""
+    __slots__ = ("name", "start_time", "start_memory", "peak_memory")
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.start_time: float = 0.0
+        self.start_memory: int = 0
+        self.peak_memory: int = 0
+
+
+class Profiler:
+    """
+    Records the wall time, call count and peak memory of named stages.
+
+    Stages get marked with 'with profiler.stage("name"):' and may be nested or run in several threads at once. Only the
+    stages of the context that enabled the profiler get recorded: threads started elsewhere (e.g. the bots running
+    next to a backtest) are not part of the profile, threads working for the profiled code have to run in a copy of
+    its context (see contextvars.copy_context). While the profiler is disabled, a stage is a shared no-op context
+    manager, so the instrumented code runs at almost full speed. Memory gets traced with tracemalloc, which slows down
+    the code while the profiler is enabled. The peak memory of a stage is the peak of the whole process during the
+    stage, minus the memory allocated when the stage started. Before Python 3.9, tracemalloc cannot reset its peak, so
+    only the memory allocated when stages start and end counts towards their peak.
+    """
+    NO_STAGE: ContextManager = contextlib.nullcontext()
+    CAN_RESET_PEAK: bool = hasattr(tracemalloc, "reset_peak")  # Python 3.9 and later
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.trace_memory: bool = False
+        self.stats: Dict[str, StageStats] = dict()
+        self.started_at: float = 0.0
+        self.stopped_at: float = 0.0
+        self.lock: threading.Lock = threading.Lock()
+        self.running: Set[_Frame] = set()  # Running stage calls of all threads, their peak memory gets updated
+        self.started_tracing: bool = False  # Whether tracemalloc got started by the profiler (and has to be stopped)
+        self.token: Union[contextvars.Token, None] = None  # Restores the recording profiler of the context on disable
+
+    def enable(self, trace_memory: bool = True) -> None:
+        """
+        Clears the recorded stats and starts recording.
+
+        Parameters:
+            - trace_memory: (bool) Whether the peak memory of the stages gets traced
+        """
+        self.stats = dict()
+        self.running = set()
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.started_at = time.perf_counter()
+        self.stopped_at = 0.0
+        self.token = _recording.set(self)
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stops recording, the recorded stats stay available"""
+        if self.enabled:
+            self.stopped_at = time.perf_counter()
+        self.enabled = False
+        if self.token is not None:
+            try:
+                _recording.reset(self.token)
+            except ValueError:  # Disabled in another context than it got enabled in
+                _recording.set(None)
+            self.token = None
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def stage(self, name: str) -> ContextManager:
+        """Returns the context manager that records a call of the stage (does nothing if disabled or not recording the
+        current context)"""
+        if not self.enabled or _recording.get() is not self:
+            return self.NO_STAGE
+        return self.__record(name)
+
+    @contextlib.contextmanager
+    def __record(self, name: str) -> Iterator[None]:
+        frame: _Frame = _Frame(name)
+        if self.trace_memory:
+            with self.lock:
+                self.__update_peak_memory()
+                frame.start_memory = frame.peak_memory = tracemalloc.get_traced_memory()[0]
+                self.running.add(frame)
+        frame.start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration: float = time.perf_counter() - frame.start_time
+            with self.lock:
+                if self.trace_memory:
+                    self.__update_peak_memory()
+                    self.running.discard(frame)
+                stats: StageStats = self.stats.get(name)
+                if stats is None:
+                    stats = self.stats[name] = StageStats()
+                stats.calls += 1
+                stats.total_time += duration
+                stats.min_time = min(stats.min_time, duration)
+                stats.max_time = max(stats.max_time, duration)
+                stats.peak_memory = max(stats.peak_memory, frame.peak_memory - frame.start_memory)
+
+    def __update_peak_memory(self) -> None:
+        """
+        Hands the peak since the last reset to all running frames and resets it, so the next reset does not lose it.
+        Has to be called while holding the lock.
+        """
+        # Without resetting, the peak would be the peak since tracing started, so only the current memory is known
+        peak: int = tracemalloc.get_traced_memory()[1 if self.CAN_RESET_PEAK else 0]
+        for frame in self.running:
+            frame.peak_memory = max(frame.peak_memory, peak)
+        if self.CAN_RESET_PEAK:
+            tracemalloc.reset_peak()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the profile as dict, the stages ordered by their total time (longest first)"""
+        stages: List[Dict[str, Any]] = [{"stage": name, **stats.to_dict()} for name, stats in self.stats.items()]
+        stages.sort(key=lambda stage: stage["total_time"], reverse=True)
+        end: float = time.perf_counter() if self.enabled else self.stopped_at
+        return {
+            "wall_time": end - self.started_at if self.started_at else 0.0,
+            "memory_traced": self.trace_memory,
+            "stages": stages,
+        }
+
+    def print_stats(self) -> None:
+        """Prints the stages as table, the share of stages that run in several threads at once can exceed 100%"""
+        stats: Dict[str, Any] = self.get_stats()
+        print(f"{'Stage':<20}{'Calls':>8}{'Total':>12}{'Mean':>12}{'Max':>12}{'Share':>8}{'Peak memory':>14}")
+        for stage in stats["stages"]:
+            share: float = stage["total_time"] / stats["wall_time"] * 100 if stats["wall_time"] else 0.0
+            memory: str = f"{stage['peak_memory'] / 1024 / 1024:.1f} MB" if stats["memory_traced"] else "-"
+            print(f"{stage['stage']:<20}{stage['calls']:>8}{stage['total_time']:>11.4f}s{stage['mean_time']:>11.4f}s"
+                  f"{stage['max_time']:>11.4f}s{share:>7.1f}%{memory:>14}")
+
+    def write_json(self, path: str) -> bool:
+        """
+        Writes the profile into a JSON file.
+
+        Returns:
+            False if the file could not be written
+        """
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w") as file:
+                json.dump(self.get_stats(), file, indent=2)
+        except OSError as e:
+            logger.error(f"Could not write profile to {path}: {e}")
+            return False
+        return True
+
+
+profiler: Profiler = Profiler()  # Profiler shared by the whole application
@@ -2,6 +2,7 @@ import logging
 
 from datetime import datetime
 from typing import List, Union
+from numpy import ndarray
 from pandas import DataFrame, Series
 from logging import Logger
 from buy_signal import BuySignal
@@ -14,12 +15,16 @@ logger: Logger = logging.getLogger("__main__")
 class MovingAverageStrategy(Strategy):
 
     INDICATOR_NAME_SLOW_SMA = "slow_sma"
+    INDICATOR_PARAMETERS: List[str] = ["sma_period"]  # Parameters that change the indicator values
 
-    def __init__(self):
+    def __init__(self, profit_target: float = 1.05, stop_loss_target: float = 0.85,
+                 sma_to_price_difference: float = 1.03, sma_period: int = 50):
         self.name: str = "Moving Average Strategy"
-        self.profit_target: float = 1.05
-        self.stop_loss_target: float = 0.85
-        self.sma_to_price_difference: float = 1.03  # The difference between price and sma -> if met create buy signal
+        self.profit_target: float = profit_target
+        self.stop_loss_target: float = stop_loss_target
+        # The difference between price and sma -> if met create buy signal
+        self.sma_to_price_difference: float = sma_to_price_difference
+        self.sma_period: int = sma_period  # Period of the slow sma
         self.indicators: List[Indicator] = list()  # Necessary for backtest plotting
 
     def check_buy_condition(self, price: float, time: datetime, row: Series = None) -> Union[BuySignal, bool]:
@@ -41,6 +46,21 @@ class MovingAverageStrategy(Strategy):
         else:
             return False
 
+    def get_buy_signals(self, price_data: DataFrame, column_name: str = "close") -> ndarray:
+        """
+        Checks the buy condition of our strategy for all rows of the price data at once.
+
+        Parameters:
+            - price_data: The data frame containing the price data and the indicators added by this strategy
+            - column_name: The name of the column holding the prices we compare the sma with
+
+        Returns:
+            Boolean array that is True for every row which meets the strategy condition
+        """
+        sma: ndarray = price_data[self.INDICATOR_NAME_SLOW_SMA].to_numpy(dtype=float)
+        prices: ndarray = price_data[column_name].to_numpy(dtype=float)
+        return sma > self.sma_to_price_difference * prices
+
     def add_indicators(self, price_data: DataFrame, column_name: str) -> DataFrame:
         """
         Adds all indicators that are needed for this strategy to the market data.
@@ -53,7 +73,7 @@ class MovingAverageStrategy(Strategy):
             A data frame containing the price data and all indicators added by this strategy
         """
         self.indicators = list()  # Reset list of added indicators
-        price_data: DataFrame = self.__add_sma(price_data, "slow_sma", column_name, 50)
+        price_data: DataFrame = self.__add_sma(price_data, self.INDICATOR_NAME_SLOW_SMA, column_name, self.sma_period)
         return price_data
 
     def __add_sma(self, price_data: DataFrame, indicator_name: str, column_name: str, period: int) -> DataFrame:
@@ -1,5 +1,8 @@
+import numpy as np
+
 from abc import ABC, abstractmethod
 from datetime import datetime
+from numpy import ndarray
 from pandas import DataFrame
 
 EXCEPTION_MESSAGE: str = "Missing implementation: Please override this method in the subclass"
@@ -14,3 +17,20 @@ class Strategy(ABC):
     @abstractmethod
     def add_indicators(self, price_data: DataFrame, column_name: str):
         raise NotImplementedError(EXCEPTION_MESSAGE)
+
+    def get_buy_signals(self, price_data: DataFrame, column_name: str = "close") -> ndarray:
+        """
+        Checks the buy condition for all rows of the price data at once.
+
+        This default implementation calls check_buy_condition for every row. Strategies should override it with a
+        vectorized version, so no signal object gets created for every row that meets the condition.
+
+        Parameters:
+            - price_data: The data frame containing the price data and the indicators added by the strategy
+            - column_name: The name of the column holding the prices
+
+        Returns:
+            Boolean array that is True for every row which meets the strategy condition
+        """
+        return np.array([bool(self.check_buy_condition(getattr(row, column_name), getattr(row, "time"), row))
+                         for row in price_data.itertuples(index=False)], dtype=bool)
@@ -0,0 +1,298 @@
+import contextlib
+import json
+import logging
+import time
+
+from json.decoder import JSONDecodeError
+from logging import Logger
+from threading import Lock, Thread
+from typing import ContextManager, Dict, List, Tuple, Union
+from numpy import ndarray
+from pandas import DataFrame
+from api.binance import Binance
+from api.candle_store import CandleStore
+from market_data import MarketData
+from market_data_registry import ReadWriteLock
+from stream.transports import StreamTransport
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class MarketStream:
+    """
+    Pushes streamed klines and trades straight into market data.
+
+    The stream keeps one long-lived connection for all subscribed symbols and reconnects automatically (with
+    exponential backoff) when it gets lost. The market data is expected to hold one entry per candle. Whenever a message
+    shows that candles are missing since the latest entry (e.g. after a reconnect), the missing candles get backfilled
+    from the REST api before the message gets applied. Closed and still open klines update the entry of their candle,
+    trades update the close, high, low and volume of the current candle.
+
+    Market data can be subscribed while the stream runs (e.g. when a bot of a new symbol starts), the stream then
+    reconnects with the new streams. If the market data gets read by others at the same time (e.g. bots evaluating
+    their strategy), every message gets applied while holding the write side of their lock. Missing candles get
+    downloaded before taking the lock, so the readers are only blocked while the candles get added.
+    """
+
+    def __init__(self, transport: StreamTransport, api: Union[Binance] = None, interval: str = "1m",
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 60.0, lock: ReadWriteLock = None
+                 ) -> None:
+        """
+        Parameters:
+            - transport: The connection the messages arrive on (e.g. Binance web socket or a local replay server)
+            - api: The api missing candles get backfilled from (no backfill if None)
+            - interval: (str) The time interval of the candles
+            - reconnect_delay: (float) Seconds to wait before the first reconnect, doubles with every failed attempt
+            - max_reconnect_delay: (float) Maximum number of seconds between two reconnects
+            - lock: (ReadWriteLock) Lock of the readers of the market data (no locking if None)
+        """
+        self.transport: StreamTransport = transport
+        self.api: Union[Binance, None] = api
+        self.interval: str = interval
+        self.interval_ms: int = CandleStore.INTERVAL_MILLISECONDS[interval]
+        self.reconnect_delay: float = reconnect_delay
+        self.max_reconnect_delay: float = max_reconnect_delay
+        self.lock: Union[ReadWriteLock, None] = lock
+        self.subscriptions: Dict[str, List[MarketData]] = dict()  # Market data per symbol
+        self.trade_symbols: List[str] = list()  # Symbols we also want the trades for
+        self.subscription_lock: Lock = Lock()
+        self.resubscribing: bool = False  # Whether the connection got closed to connect with changed streams
+        self.running: bool = False
+        self.thread: Union[Thread, None] = None
+        # Stats
+        self.stats_lock: Lock = Lock()
+        self.messages: int = 0
+        self.reconnects: int = 0
+        self.backfilled_candles: int = 0
+        self.first_message_time: float = 0.0
+        self.last_message_time: float = 0.0
+        self.total_latency: float = 0.0  # Milliseconds from the event time of the messages until the update was done
+        self.max_latency: float = 0.0
+
+    def subscribe(self, symbol: str, market_data: MarketData, trades: bool = False) -> None:
+        """
+        Subscribes market data to the klines (and optionally trades) of a symbol.
+
+        Parameters:
+            - symbol: (str) The symbol we want to stream
+            - market_data: (MarketData) The market data the updates get pushed into (only once if subscribed again)
+            - trades: (bool) Whether the trades should update the current candle as well
+        """
+        with self.subscription_lock:
+            streams: List[str] = self.get_streams()
+            subscribed: List[MarketData] = self.subscriptions.setdefault(symbol, list())
+            if not any(other is market_data for other in subscribed):
+                subscribed.append(market_data)
+            if trades and symbol not in self.trade_symbols:
+                self.trade_symbols.append(symbol)
+            changed: bool = self.get_streams() != streams
+        if changed:
+            self.__resubscribe()
+
+    def unsubscribe(self, symbol: str, market_data: MarketData) -> None:
+        """Stops pushing updates into the market data, the streams of the symbol end with its last market data"""
+        with self.subscription_lock:
+            streams: List[str] = self.get_streams()
+            subscribed: List[MarketData] = [other for other in self.subscriptions.get(symbol, ())
+                                            if other is not market_data]
+            if subscribed:
+                self.subscriptions[symbol] = subscribed
+            else:
+                self.subscriptions.pop(symbol, None)
+                if symbol in self.trade_symbols:
+                    self.trade_symbols.remove(symbol)
+            changed: bool = self.get_streams() != streams
+        if changed:
+            self.__resubscribe()
+
+    def get_streams(self) -> List[str]:
+        streams: List[str] = [symbol.lower() + "@kline_" + self.interval for symbol in self.subscriptions]
+        streams.extend(symbol.lower() + "@trade" for symbol in self.trade_symbols)
+        return streams
+
+    def start(self) -> None:
+        """Starts streaming in a background thread"""
+        logger.info(f"Starting market stream for {', '.join(self.subscriptions.keys())}...")
+        self.running = True
+        self.thread = Thread(target=self.run, name="market-stream", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        logger.info("Stopping market stream...")
+        self.running = False
+        self.transport.close()  # Unblocks the receiving thread
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def run(self) -> None:
+        """Receives messages until the stream gets stopped, reconnects if the connection gets lost"""
+        delay: float = self.reconnect_delay
+        while self.running:
+            with self.subscription_lock:
+                streams: List[str] = self.get_streams()
+                self.resubscribing = False
+            try:
+                self.transport.connect(streams)
+            except Exception as e:
+                logger.error(f"Could not connect market stream: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            delay = self.reconnect_delay
+
+            # Streams that changed while connecting close the connection right away
+            while self.running and not self.resubscribing:
+                message: Union[str, None] = self.transport.receive()
+                if message is None:
+                    break
+                try:
+                    self.handle_message(message)
+                except Exception as e:  # A broken message must not stop the stream
+                    logger.error(f"Could not apply market stream message {message[:200]!r}: {e!r}")
+
+            self.transport.close()
+            if self.running and not self.resubscribing:
+                logger.warning("Market stream connection lost, reconnecting...")
+                self.reconnects += 1
+                time.sleep(delay)
+
+    def handle_message(self, message: str) -> None:
+        """Applies one kline or trade message to the subscribed market data"""
+        try:
+            data: Dict = json.loads(message)["data"]
+        except (JSONDecodeError, KeyError, TypeError) as e:
+            logger.error(f"Could not decode market stream message: {e}")
+            return
+
+        if data.get("e") == "kline":
+            kline: Dict = data["k"]
+            candle: Tuple[float, ...] = (float(kline["t"]), float(kline["o"]), float(kline["h"]), float(kline["l"]),
+                                         float(kline["c"]), float(kline["v"]))
+            subscribed: List[MarketData] = self.__get_subscribed(kline["s"])
+            missed: Union[DataFrame, None] = self.__collect_missed(kline["s"], subscribed, candle[0])
+            with self.__writing():
+                for market_data in subscribed:
+                    self.__apply_candle(kline["s"], market_data, candle, missed)
+        elif data.get("e") == "trade":
+            trade_time: int = int(data["T"])
+            price: float = float(data["p"])
+            quantity: float = float(data["q"])
+            subscribed = self.__get_subscribed(data["s"])
+            open_time: float = float(trade_time // self.interval_ms * self.interval_ms)
+            missed = self.__collect_missed(data["s"], subscribed, open_time)
+            with self.__writing():
+                for market_data in subscribed:
+                    self.__apply_trade(data["s"], market_data, trade_time, price, quantity, missed)
+        else:
+            return
+        self.__record_message(data.get("E"))
+
+    def get_stats(self) -> Dict[str, float]:
+        """Returns the number of messages, messages per second and update latency (in milliseconds) of the stream"""
+        with self.stats_lock:
+            duration: float = self.last_message_time - self.first_message_time
+            return {
+                "messages": self.messages,
+                "messages_per_second": self.messages / duration if duration > 0 else 0.0,
+                "average_latency": self.total_latency / self.messages if self.messages else 0.0,
+                "max_latency": self.max_latency,
+                "reconnects": self.reconnects,
+                "backfilled_candles": self.backfilled_candles,
+            }
+
+    def __get_subscribed(self, symbol: str) -> List[MarketData]:
+        with self.subscription_lock:
+            return list(self.subscriptions.get(symbol, ()))
+
+    def __reading(self) -> ContextManager:
+        return self.lock.reading() if self.lock else contextlib.nullcontext()
+
+    def __writing(self) -> ContextManager:
+        return self.lock.writing() if self.lock else contextlib.nullcontext()
+
+    def __resubscribe(self) -> None:
+        """Closes the connection of a running stream, so it reconnects right away with the changed streams"""
+        if self.running:
+            self.resubscribing = True
+            self.transport.close()
+
+    def __apply_candle(self, symbol: str, market_data: MarketData, candle: Tuple[float, ...],
+                       missed: Union[DataFrame, None]) -> None:
+        """Adds the candle to the market data or updates the latest entry if it belongs to the same candle"""
+        latest_time: Union[float, None] = market_data.get_latest_entry()[0] if len(market_data) else None
+        if latest_time is not None and candle[0] < latest_time:
+            return  # Outdated message
+        if latest_time is not None and candle[0] > latest_time + self.interval_ms:
+            self.__backfill(symbol, market_data, latest_time, candle[0], missed)
+        row: Tuple[float, ...] = candle if market_data.columns == MarketData.COLUMNS_OHLCV else (candle[0], candle[4])
+        if candle[0] == latest_time:
+            market_data.update_latest_row(row)
+        else:
+            market_data.add_row(row)
+
+    def __apply_trade(self, symbol: str, market_data: MarketData, trade_time: int, price: float, quantity: float,
+                      missed: Union[DataFrame, None]) -> None:
+        """Updates the current candle with the trade or starts a new candle if the trade belongs to the next one"""
+        open_time: float = float(trade_time // self.interval_ms * self.interval_ms)
+        latest_time: Union[float, None] = market_data.get_latest_entry()[0] if len(market_data) else None
+        if latest_time is not None and open_time == latest_time and market_data.columns == MarketData.COLUMNS_OHLCV:
+            _, open_price, high, low, _, volume = market_data.get_window()[-1]
+            market_data.update_latest_row((open_time, open_price, max(high, price), min(low, price), price,
+                                           volume + quantity))
+        else:
+            self.__apply_candle(symbol, market_data, (open_time, price, price, price, price, quantity), missed)
+
+    def __collect_missed(self, symbol: str, subscribed: List[MarketData], next_time: float
+                         ) -> Union[DataFrame, None]:
+        """
+        Downloads the candles that are missing between the latest entries of the market data and the next streamed
+        candle, without blocking the readers of the market data while downloading.
+
+        Returns:
+            - The missed candles (before the next candle) of all subscribed market data
+            - None if no candles are missing or they could not be collected
+        """
+        with self.__reading():
+            latest_times: List[float] = [market_data.get_latest_entry()[0] for market_data in subscribed
+                                         if len(market_data)]
+        gaps: List[float] = [latest_time for latest_time in latest_times if next_time > latest_time + self.interval_ms]
+        if not gaps:
+            return None
+        missing: int = int((next_time - min(gaps)) // self.interval_ms) - 1
+        if not self.api:
+            logger.warning(f"Missing {missing} candle(s) of {symbol}, but there is no api to backfill them")
+            return None
+        logger.info(f"Backfilling {missing} missing candle(s) of {symbol}...")
+        df: Union[DataFrame, bool] = self.api.get_candlestick_data(symbol, self.interval,
+                                                                   end_time=int(next_time) - 1, limit=missing)
+        if not isinstance(df, DataFrame):
+            logger.error(f"Could not backfill the missing candles of {symbol}")
+            return None
+        return df[df["time"] < next_time]
+
+    def __backfill(self, symbol: str, market_data: MarketData, latest_time: float, next_time: float,
+                   missed: Union[DataFrame, None]) -> None:
+        """Adds the collected candles between the latest entry and the next streamed candle"""
+        if missed is None:
+            return
+        df: DataFrame = missed[(missed["time"] > latest_time) & (missed["time"] < next_time)]
+        if market_data.columns == MarketData.COLUMNS_OHLCV:
+            rows: ndarray = df[MarketData.COLUMNS_OHLCV].to_numpy(dtype=float)
+        else:
+            rows = df[["time", "close"]].to_numpy(dtype=float)
+        market_data.add_entries(rows)
+        with self.stats_lock:
+            self.backfilled_candles += len(rows)
+
+    def __record_message(self, event_time: Union[int, None]) -> None:
+        now: float = time.time()
+        with self.stats_lock:
+            if not self.messages:
+                self.first_message_time = now
+            self.last_message_time = now
+            self.messages += 1
+            if event_time:
+                latency: float = now * 1000 - event_time
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
@@ -0,0 +1,138 @@
+import logging
+import socketserver
+import time
+
+from logging import Logger
+from threading import Thread
+from typing import Dict, List, Set, Tuple, Union
+from pandas import DataFrame
+from api.candle_store import CandleStore
+
+logger: Logger = logging.getLogger("__main__")
+
+
+class ReplayServer(socketserver.ThreadingTCPServer):
+    """
+    Local server that replays recorded klines as market stream messages.
+
+    The messages have the same format as the Binance combined streams and get sent as newline delimited JSON texts,
+    so the stream ingestion can be tested and benchmarked offline. The event time of every message is the time it gets
+    sent, so the receiver can measure the latency until its market data got updated. The replay position is kept by the
+    server, so a client that reconnects continues where it stopped. Dropped connections can be simulated, the candles
+    that get skipped while the client is disconnected then have to be backfilled by the client.
+    """
+    daemon_threads: bool = True
+    allow_reuse_address: bool = True
+
+    def __init__(self, candles: Dict[str, DataFrame], interval: str = "1m", host: str = "127.0.0.1", port: int = 0,
+                 messages_per_second: float = None, trades_per_candle: int = 0, disconnect_every: int = None,
+                 candles_skipped_on_disconnect: int = 0) -> None:
+        """
+        Parameters:
+            - candles: Recorded candlestick data per symbol
+            - interval: (str) The time interval of the candles
+            - host: (str) Host the server listens on
+            - port: (int) Port the server listens on (0 picks a free port)
+            - messages_per_second: (float) Maximum send rate, as fast as possible if None
+            - trades_per_candle: (int) Number of trade messages that get sent before every closed kline
+            - disconnect_every: (int) Drops the connection after this many messages, never if None
+            - candles_skipped_on_disconnect: (int) Number of candles that get lost when the connection drops
+        """
+        super().__init__((host, port), ReplayHandler)
+        self.interval: str = interval
+        self.interval_ms: int = CandleStore.INTERVAL_MILLISECONDS[interval]
+        self.messages_per_second: Union[float, None] = messages_per_second
+        self.trades_per_candle: int = trades_per_candle
+        self.disconnect_every: Union[int, None] = disconnect_every
+        self.candles_skipped_on_disconnect: int = candles_skipped_on_disconnect
+        # All candles of all symbols ordered by their open time: (open time, symbol, open, high, low, close, volume)
+        self.timeline: List[Tuple] = sorted(
+            (row[0], symbol) + tuple(row[1:])
+            for symbol, df in candles.items()
+            for row in df[CandleStore.COLUMNS].itertuples(index=False, name=None)
+        )
+        self.position: int = 0  # Index of the next candle of the timeline
+        self.thread: Union[Thread, None] = None
+
+    @classmethod
+    def from_candle_store(cls, store: CandleStore, symbols: List[str], interval: str = "1m", **kwargs
+                          ) -> "ReplayServer":
+        """Creates a replay server for the candles that are stored in a candle store"""
+        return cls({symbol: store.load(symbol, interval) for symbol in symbols}, interval, **kwargs)
+
+    def start(self) -> Tuple[str, int]:
+        """Starts the server in a background thread and returns its host and port"""
+        self.thread = Thread(target=self.serve_forever, name="replay-server", daemon=True)
+        self.thread.start()
+        return self.server_address[0], self.server_address[1]
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def is_finished(self) -> bool:
+        return self.position >= len(self.timeline)
+
+
+class ReplayHandler(socketserver.StreamRequestHandler):
+    """Sends the replayed messages to one connected client"""
+
+    def handle(self) -> None:
+        server: ReplayServer = self.server
+        # The client starts with the streams it wants, e.g. 'btceur@kline_1m/btceur@trade'
+        streams: Set[str] = set(self.rfile.readline().decode("utf-8").strip().split("/"))
+        sent: int = 0
+        start: float = time.perf_counter()
+        try:
+            while not server.is_finished():
+                open_time, symbol, open_price, high, low, close, volume = server.timeline[server.position]
+                server.position += 1
+                messages: List[str] = list()
+                trade_stream: str = symbol.lower() + "@trade"
+                kline_stream: str = symbol.lower() + "@kline_" + server.interval
+                if trade_stream in streams:
+                    messages.extend(self.__create_trades(symbol, trade_stream, open_time, open_price, close))
+                if kline_stream in streams:
+                    messages.append(self.__create_kline(symbol, kline_stream, open_time, open_price, high, low, close,
+                                                        volume))
+                for message in messages:
+                    if server.messages_per_second:
+                        # Keep the send rate
+                        delay: float = start + sent / server.messages_per_second - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    self.wfile.write(message.replace("{event_time}", str(int(time.time() * 1000))).encode("utf-8"))
+                    sent += 1
+                    if server.disconnect_every and sent % server.disconnect_every == 0:
+                        logger.debug("Replay server drops the connection...")
+                        server.position += server.candles_skipped_on_disconnect
+                        return
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def __create_kline(self, symbol: str, stream: str, open_time: float, open_price: float, high: float, low: float,
+                       close: float, volume: float) -> str:
+        interval_ms: int = self.server.interval_ms
+        return (
+            f'{{"stream": "{stream}", "data": {{"e": "kline", "E": {{event_time}}, "s": "{symbol}", "k": {{'
+            f'"t": {int(open_time)}, "T": {int(open_time) + interval_ms - 1}, "s": "{symbol}", '
+            f'"i": "{self.server.interval}", "o": "{open_price}", "c": "{close}", "h": "{high}", "l": "{low}", '
+            f'"v": "{volume}", "x": true}}}}}}\n'
+        )
+
+    def __create_trades(self, symbol: str, stream: str, open_time: float, open_price: float, close: float
+                        ) -> List[str]:
+        """Creates trades with prices moving from the open to the close price of the candle"""
+        count: int = self.server.trades_per_candle
+        trades: List[str] = list()
+        for i in range(count):
+            price: float = open_price + (close - open_price) * i / count
+            trade_time: int = int(open_time) + self.server.interval_ms * i // count
+            trades.append(
+                f'{{"stream": "{stream}", "data": {{"e": "trade", "E": {{event_time}}, "s": "{symbol}", '
+                f'"p": "{price}", "q": "0.0", "T": {trade_time}}}}}\n'
+            )
+        return trades
@@ -0,0 +1,100 @@
+import logging
+import socket
+
+from abc import ABC, abstractmethod
+from logging import Logger
+from typing import List, Union
+
+logger: Logger = logging.getLogger("__main__")
+
+EXCEPTION_MESSAGE: str = "Missing implementation: Please override this method in the subclass"
+
+
+class StreamTransport(ABC):
+    """
+    Long-lived connection that delivers market data messages.
+
+    Every message is one JSON text in the format of the Binance combined streams:
+    {"stream": "btceur@kline_1m", "data": {...}}
+    """
+
+    @abstractmethod
+    def connect(self, streams: List[str]) -> None:
+        """Opens the connection and subscribes to the given streams (e.g. 'btceur@kline_1m', 'btceur@trade')"""
+        raise NotImplementedError(EXCEPTION_MESSAGE)
+
+    @abstractmethod
+    def receive(self) -> Union[str, None]:
+        """Blocks until the next message arrives, returns None if the connection got closed"""
+        raise NotImplementedError(EXCEPTION_MESSAGE)
+
+    @abstractmethod
+    def close(self) -> None:
+        raise NotImplementedError(EXCEPTION_MESSAGE)
+
+
+class BinanceWebSocketTransport(StreamTransport):
+    """Connection to the combined market streams of Binance"""
+
+    def __init__(self, base: str = "wss://stream.binance.com:9443", timeout: float = 30.0) -> None:
+        self.base: str = base
+        self.timeout: float = timeout  # Seconds without any message until we consider the connection dead
+        self.connection = None
+
+    def connect(self, streams: List[str]) -> None:
+        # Only needed for live streaming, so the websocket client does not get imported before
+        import websocket
+
+        url: str = self.base + "/stream?streams=" + "/".join(streams)
+        logger.debug(f"Connecting to {url}...")
+        self.connection = websocket.create_connection(url, timeout=self.timeout)
+
+    def receive(self) -> Union[str, None]:
+        connection = self.connection
+        if connection is None:
+            return None
+        try:
+            message: str = connection.recv()
+        except Exception as e:
+            logger.error(f"Market stream connection lost: {e}")
+            return None
+        return message or None
+
+    def close(self) -> None:
+        connection, self.connection = self.connection, None
+        if connection:
+            connection.close()
+
+
+class ReplayTransport(StreamTransport):
+    """Connection to a local replay server, messages are sent as newline delimited JSON texts"""
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.timeout: float = timeout
+        self.connection: Union[socket.socket, None] = None
+        self.reader = None
+
+    def connect(self, streams: List[str]) -> None:
+        self.connection = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.reader = self.connection.makefile("r", encoding="utf-8")
+        # Tell the server which streams we want
+        self.connection.sendall(("/".join(streams) + "\n").encode("utf-8"))
+
+    def receive(self) -> Union[str, None]:
+        reader = self.reader
+        if reader is None:
+            return None
+        try:
+            line: str = reader.readline()
+        except (OSError, ValueError) as e:
+            logger.error(f"Replay connection lost: {e}")
+            return None
+        return line or None
+
+    def close(self) -> None:
+        connection, self.connection = self.connection, None
+        if connection:
+            connection.close()
+            self.reader = None
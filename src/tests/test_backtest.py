@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from pandas import DataFrame
+from backtest.backtest import Backtest
+from benchmark.synthetic_klines import SyntheticApi, generate_klines
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+SYMBOL: str = "BTCEUR"
+STRATEGIES = [
+    dict(),
+    dict(profit_target=1.01, stop_loss_target=0.99, sma_to_price_difference=1.005, sma_period=20),
+    dict(profit_target=1.02, stop_loss_target=0.95, sma_to_price_difference=1.01, sma_period=100),
+]
+
+
+def simulate(klines: DataFrame, engine: str, strategy: dict, capital: float, buy_quantity: float) -> Backtest:
+    backtest: Backtest = Backtest(SYMBOL, SyntheticApi(klines), MovingAverageStrategy(**strategy), capital,
+                                  buy_quantity, len(klines), engine=engine)
+    backtest.candlestick_df = backtest.strategy.add_indicators(klines.copy(), column_name="close")
+    assert backtest.simulate()
+    return backtest
+
+
+@pytest.mark.parametrize("seed, volatility", [(1, 0.002), (2, 0.01), (3, 0.03)])
+@pytest.mark.parametrize("strategy", STRATEGIES)
+@pytest.mark.parametrize("capital, buy_quantity", [(100000.0, 1.0), (40000.0, 0.5)])
+def test_engines_are_identical(seed: int, volatility: float, strategy: dict, capital: float,
+                               buy_quantity: float) -> None:
+    klines: DataFrame = generate_klines(5000, seed=seed, volatility=volatility)
+    iterrows: Backtest = simulate(klines, Backtest.ENGINE_ITERROWS, strategy, capital, buy_quantity)
+    vectorized: Backtest = simulate(klines, Backtest.ENGINE_VECTORIZED, strategy, capital, buy_quantity)
+
+    assert iterrows.get_stats() == vectorized.get_stats()
+    assert iterrows.ledger.to_dataframe().equals(vectorized.ledger.to_dataframe())
+    assert iterrows.capital_over_time == vectorized.capital_over_time
+    assert np.array_equal(iterrows.signal_times, vectorized.signal_times)
+    assert np.array_equal(iterrows.signal_prices, vectorized.signal_prices)
+    assert np.array_equal(iterrows.signal_accepted, vectorized.signal_accepted)
+
+
+def test_unknown_engine() -> None:
+    klines: DataFrame = generate_klines(500)
+    backtest: Backtest = Backtest(SYMBOL, SyntheticApi(klines), MovingAverageStrategy(), 1000.0, 1.0, len(klines),
+                                  engine="unknown")
+    backtest.candlestick_df = backtest.strategy.add_indicators(klines.copy(), column_name="close")
+    assert not backtest.simulate()
@@ -0,0 +1,25 @@
+import pytest
+
+from typing import Any, Dict
+from backtest.batch import BatchRunner
+from benchmark.synthetic_klines import SyntheticApi, generate_klines
+
+
+@pytest.mark.parametrize("kline_limit, expected", [(5000, 5000), (5000.0, 5000), (1, 1)])
+def test_valid_kline_limit(kline_limit: Any, expected: int) -> None:
+    config: Dict[str, Any] = BatchRunner.validate_config({"symbol": "BTCEUR", "kline_limit": kline_limit})
+    assert config["kline_limit"] == expected
+    assert type(config["kline_limit"]) is int
+
+
+@pytest.mark.parametrize("kline_limit", [True, False, 5000.5, 0, -1, 0.0, "5000", float("nan"), float("inf")])
+def test_invalid_kline_limit(kline_limit: Any) -> None:
+    assert isinstance(BatchRunner.validate_config({"symbol": "BTCEUR", "kline_limit": kline_limit}), str)
+
+
+def test_batch_runs_float_kline_limits() -> None:
+    configs = [{"symbol": "BTCEUR", "kline_limit": 500.0}, {"symbol": "BTCEUR", "kline_limit": True}]
+    summary: Dict[str, Any] = BatchRunner(configs, SyntheticApi(generate_klines(1000, interval="1h")),
+                                          workers=1).run()
+    assert [result["status"] for result in summary["results"]] == [BatchRunner.STATUS_OK, BatchRunner.STATUS_FAILED]
+
@@ -0,0 +1,123 @@
+import time
+import numpy as np
+import pytest
+
+from typing import Iterator, Tuple
+from pandas import DataFrame
+from api.binance import Binance
+from api.rate_limiter import RequestWeightLimiter
+from benchmark.kline_server import KlineServer
+from benchmark.synthetic_klines import generate_klines
+
+SYMBOL: str = "BTCEUR"
+MONDAY: int = 1578268800000  # 06.01.2020 00:00 UTC, weekly candles open on Mondays
+
+
+@pytest.fixture
+def serve() -> Iterator:
+    servers = list()
+
+    def start(klines: DataFrame, interval: str = "1m", latency: float = 0.0, max_retries: int = 0,
+              retry_backoff: float = 0.5) -> Tuple[Binance, KlineServer]:
+        server: KlineServer = KlineServer({SYMBOL: klines}, interval=interval, latency=latency)
+        servers.append(server)
+        api: Binance = Binance(base=server.start(), max_retries=max_retries, retry_backoff=retry_backoff,
+                               rate_limiter=RequestWeightLimiter(max_weight=10 ** 9))
+        return api, server
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def assert_same_candles(df: DataFrame, klines: DataFrame) -> None:
+    assert len(df) == len(klines)
+    assert np.array_equal(df["time"].to_numpy(), klines["time"].to_numpy())
+    for column in ["open", "high", "low", "close", "volume"]:
+        assert np.allclose(df[column].to_numpy(), klines[column].to_numpy(), rtol=0.0, atol=1e-8)
+
+
+def test_downloads_pages_in_parallel(serve) -> None:
+    klines: DataFrame = generate_klines(8000)
+    api, server = serve(klines, latency=0.1)
+    start: float = time.perf_counter()
+    df: DataFrame = api.get_candlestick_data(SYMBOL, "1m", end_time=int(klines["time"].iloc[-1]), limit=8000)
+    elapsed: float = time.perf_counter() - start
+    assert_same_candles(df, klines)
+    assert server.request_count == 8
+    assert elapsed < 8 * 0.1 * 0.6  # Sequential pages would take at least 0.8s
+
+
+def test_partial_first_page(serve) -> None:
+    klines: DataFrame = generate_klines(2500)
+    api, _ = serve(klines)
+    df: DataFrame = api.get_candlestick_data(SYMBOL, "1m", end_time=int(klines["time"].iloc[-1]), limit=2500)
+    assert_same_candles(df, klines)
+
+
+def test_pages_before_listing_are_empty(serve) -> None:
+    klines: DataFrame = generate_klines(1500)
+    api, server = serve(klines)
+    df: DataFrame = api.get_candlestick_data(SYMBOL, "1m", end_time=int(klines["time"].iloc[-1]), limit=4000)
+    assert_same_candles(df, klines)
+    assert server.request_count == 4
+
+
+def test_no_klines_at_all(serve) -> None:
+    klines: DataFrame = generate_klines(1500)
+    api, _ = serve(klines)
+    assert api.get_candlestick_data(SYMBOL, "1m", end_time=int(klines["time"].iloc[0]) - 1, limit=3000) is False
+
+
+def test_weekly_candles_are_walked(serve) -> None:
+    klines: DataFrame = generate_klines(2500, interval="1w", start_time=MONDAY)
+    api, _ = serve(klines, interval="1w")
+    df: DataFrame = api.get_candlestick_data(SYMBOL, "1w", end_time=int(klines["time"].iloc[-1]), limit=2500)
+    assert_same_candles(df, klines)
+    # Before the listing the walk stops without failing
+    df = api.get_candlestick_data(SYMBOL, "1w", end_time=int(klines["time"].iloc[-1]), limit=3500)
+    assert_same_candles(df, klines)
+
+
+@pytest.mark.parametrize("status_codes", [(429,), (500, 502), (503, 504), (429, 503)])
+def test_retries_temporary_errors_with_backoff(serve, status_codes: Tuple[int, ...]) -> None:
+    klines: DataFrame = generate_klines(500)
+    api, server = serve(klines, max_retries=2, retry_backoff=0.05)
+    server.fail_next(*status_codes)
+    start: float = time.perf_counter()
+    df: DataFrame = api.get_candlestick_data(SYMBOL, "1m", end_time=int(klines["time"].iloc[-1]), limit=500)
+    elapsed: float = time.perf_counter() - start
+
+    assert_same_candles(df, klines)
+    assert server.request_count == len(status_codes) + 1
+    # The first retry waits the backoff, every further retry twice as long as the one before
+    assert elapsed >= sum(0.05 * 2 ** retry for retry in range(len(status_codes))) * 0.9
+    stats = api.get_request_stats()["/api/v3/klines"]
+    assert stats["calls"] == len(status_codes) + 1
+    assert stats["errors"] == len(status_codes)
+    assert 0 < stats["average_latency"] <= stats["max_latency"]
+
+
+def test_gives_up_after_the_last_retry(serve) -> None:
+    klines: DataFrame = generate_klines(500)
+    api, server = serve(klines, max_retries=2, retry_backoff=0.01)
+    server.fail_next(503, 503, 503, 503)
+    assert api.http_request("/api/v3/klines", [f"symbol={SYMBOL}", "interval=1m", "limit=10"]) is False
+    assert server.request_count == 3
+    assert api.get_request_stats()["/api/v3/klines"]["errors"] == 3
+
+    # The remaining failure gets retried by the next request
+    assert len(api.http_request("/api/v3/klines", [f"symbol={SYMBOL}", "interval=1m", "limit=10"])) == 10
+    stats = api.get_request_stats()["/api/v3/klines"]
+    assert (stats["calls"], stats["errors"]) == (5, 4)
+
+
+@pytest.mark.parametrize("status_code", [400, 403, 404])
+def test_does_not_retry_other_errors(serve, status_code: int) -> None:
+    klines: DataFrame = generate_klines(500)
+    api, server = serve(klines, max_retries=2, retry_backoff=0.01)
+    server.fail_next(status_code)
+    assert api.http_request("/api/v3/klines", [f"symbol={SYMBOL}", "interval=1m", "limit=10"]) is False
+    assert server.request_count == 1
+    stats = api.get_request_stats()
+    assert list(stats) == ["/api/v3/klines"]
+    assert (stats["/api/v3/klines"]["calls"], stats["/api/v3/klines"]["errors"]) == (1, 1)
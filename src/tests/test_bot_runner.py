@@ -0,0 +1,74 @@
+import time
+
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List
+from bot_runner import BotRunner
+
+
+class FakeApi:
+    def get_server_time(self) -> datetime:
+        return datetime.now()
+
+    def get_current_price(self, symbol: str = None) -> Dict[str, float]:
+        return {"BTCEUR": 1.0}
+
+
+class FakeWindow:
+    """Records whether prices got added while a bot was reading the window"""
+
+    def __init__(self) -> None:
+        self.lock: Lock = Lock()
+        self.writing: bool = False
+        self.readers: int = 0
+        self.overlaps: int = 0
+        self.writes: int = 0
+
+
+class FakeBot:
+    STATUS_RUNNING: str = "running"
+    STATUS_PAUSED: str = "paused"
+    STATUS_ABORTED: str = "aborted"
+    MARKET_DATA_INTERVAL: str = "1m"
+
+    def __init__(self, name: str, market_data: FakeWindow) -> None:
+        self.id: int = -1
+        self.name: str = name
+        self.symbol: str = "BTCEUR"
+        self.status: str = "init"
+        self.api: FakeApi = FakeApi()
+        self.market_data: FakeWindow = market_data
+        self.evaluations: int = 0
+
+    def add_price(self, time_: datetime, price: float) -> None:
+        with self.market_data.lock:
+            self.market_data.writing = True
+            self.market_data.overlaps += self.market_data.readers > 0
+        time.sleep(0.02)
+        with self.market_data.lock:
+            self.market_data.writing = False
+            self.market_data.writes += 1
+
+    def evaluate(self) -> None:
+        with self.market_data.lock:
+            self.market_data.readers += 1
+            self.market_data.overlaps += self.market_data.writing
+        time.sleep(0.03)
+        with self.market_data.lock:
+            self.market_data.readers -= 1
+            self.market_data.overlaps += self.market_data.writing
+        self.evaluations += 1
+
+
+def test_prices_are_not_added_while_bots_evaluate() -> None:
+    window: FakeWindow = FakeWindow()
+    runner: BotRunner = BotRunner(cycle_interval=0.0, max_workers=8)
+    bots: List[FakeBot] = [FakeBot(f"bot {index}", window) for index in range(6)]
+    for bot in bots:
+        runner.add_bot(bot)
+    runner.start_all_bots()
+    time.sleep(1.0)
+    runner.shutdown()
+    assert window.writes > 5
+    assert min(bot.evaluations for bot in bots) > 5
+    assert window.overlaps == 0
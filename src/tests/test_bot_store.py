@@ -0,0 +1,61 @@
+import time
+import numpy as np
+
+from typing import List
+from pandas import DataFrame
+from benchmark.synthetic_klines import generate_klines
+from bot import Bot
+from bot_store import BotStore
+from market_data import MarketData
+from market_data_registry import MarketDataRegistry
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+MINUTE: int = 60 * 1000
+CAPACITY: int = 200
+
+
+class FakeApi:
+    def __init__(self, klines: DataFrame) -> None:
+        self.klines: DataFrame = klines
+
+    def get_candlestick_data(self, symbol: str, interval: str = "1m", end_time: int = None,
+                             limit: int = 1000) -> DataFrame:
+        return self.klines.tail(limit).reset_index(drop=True)
+
+
+def restore(tmp_path, checkpoint: MarketData, klines: DataFrame) -> MarketData:
+    store: BotStore = BotStore(str(tmp_path / "bots.db"), flush_interval=0.0)
+    try:
+        store.save_bot(Bot("bot", "BTCEUR", None, MovingAverageStrategy(), 1000.0, 1.0, market_data=checkpoint))
+        store.save_market_data(checkpoint, Bot.MARKET_DATA_INTERVAL)
+        bots: List[Bot] = store.load_bots(FakeApi(klines), MarketDataRegistry())
+    finally:
+        store.close()
+    assert len(bots) == 1
+    return bots[0].market_data
+
+
+def test_restore_replaces_polled_prices_with_their_candle(tmp_path) -> None:
+    # Candles up to the current minute, the checkpoint was written a few minutes ago after polling prices
+    now: int = int(time.time() * 1000) // MINUTE * MINUTE
+    klines: DataFrame = generate_klines(150, start_time=now - 149 * MINUTE)
+    checkpoint: MarketData = MarketData.from_dataframe("BTCEUR", klines.iloc[:140], capacity=CAPACITY)
+    candle_time: float = float(klines["time"].iloc[139])
+    for offset in [10000, 25000, 40000]:  # Polled within the candle that opened last before the checkpoint
+        checkpoint.add_entry(candle_time + offset, 30000.0)
+
+    restored: MarketData = restore(tmp_path, checkpoint, klines)
+
+    assert np.array_equal(restored.get_window(), klines[MarketData.COLUMNS_OHLCV].to_numpy(dtype=np.float64))
+    assert np.all(np.diff(restored.times) == MINUTE)
+
+
+def test_restore_replaces_open_candle(tmp_path) -> None:
+    now: int = int(time.time() * 1000) // MINUTE * MINUTE
+    klines: DataFrame = generate_klines(150, start_time=now - 149 * MINUTE)
+    checkpoint: MarketData = MarketData.from_dataframe("BTCEUR", klines.iloc[:140], capacity=CAPACITY)
+    checkpoint.update_latest_row((klines["time"].iloc[139], 1.0, 1.0, 1.0, 1.0, 0.0))  # Still open when saved
+
+    restored: MarketData = restore(tmp_path, checkpoint, klines)
+
+    assert np.array_equal(restored.get_window(), klines[MarketData.COLUMNS_OHLCV].to_numpy(dtype=np.float64))
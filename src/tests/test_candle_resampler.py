@@ -0,0 +1,35 @@
+import time
+import numpy as np
+
+from pandas import DataFrame
+from api.candle_resampler import CandleResampler, resample
+from api.candle_store import CandleStore
+from benchmark.synthetic_klines import generate_klines
+
+MINUTE: int = 60 * 1000
+HOUR: int = 60 * MINUTE
+NOW: int = int(time.time() * 1000) // HOUR * HOUR - HOUR  # Leaves the current hour alone, its candle is still open
+KLINES: DataFrame = generate_klines(48 * 60, seed=3, start_time=NOW - 48 * HOUR)
+
+
+def fetch(symbol: str, interval: str, end_time: int, limit: int) -> DataFrame:
+    return KLINES[KLINES["time"] <= end_time].tail(limit).reset_index(drop=True)
+
+
+def test_cache_keeps_only_the_requested_candles(tmp_path) -> None:
+    resampler: CandleResampler = CandleResampler(CandleStore(str(tmp_path)))
+    hours: DataFrame = resample(KLINES, "1h")
+
+    for end_time in range(NOW - 24 * HOUR, NOW, HOUR):  # A sliding window of 6 hourly candles
+        df: DataFrame = resampler.get_candlestick_data("BTCEUR", "1h", end_time, 6, fetch)
+        assert np.array_equal(df.to_numpy(), hours[hours["time"] <= end_time].tail(6).to_numpy())
+        assert len(resampler.cache[("BTCEUR", "1h")]["time"]) <= 6
+
+
+def test_cache_keeps_the_latest_requested_intervals(tmp_path) -> None:
+    resampler: CandleResampler = CandleResampler(CandleStore(str(tmp_path)), max_cached=2)
+    for interval in ["5m", "15m", "1h", "15m"]:
+        df: DataFrame = resampler.get_candlestick_data("BTCEUR", interval, NOW - MINUTE, 4, fetch)
+        assert np.array_equal(df.to_numpy(), resample(KLINES[KLINES["time"] < NOW], interval).tail(4).to_numpy())
+
+    assert list(resampler.cache) == [("BTCEUR", "1h"), ("BTCEUR", "15m")]
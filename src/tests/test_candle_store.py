@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import multiprocessing
+
+from typing import List
+from pandas import DataFrame
+from api.binance import Binance
+from api.candle_store import CandleStore
+from api.rate_limiter import RequestWeightLimiter
+from benchmark.kline_server import KlineServer
+from benchmark.synthetic_klines import DEFAULT_START_TIME, generate_klines
+
+MINUTE: int = 60 * 1000
+KLINES: DataFrame = generate_klines(3000, seed=7)
+
+
+def fetch(symbol: str, interval: str, end_time: int, limit: int) -> DataFrame:
+    return KLINES[KLINES["time"] <= end_time].tail(limit).reset_index(drop=True)
+
+
+def get(store: CandleStore, last: int, limit: int) -> DataFrame:
+    return store.get_candlestick_data("BTCEUR", "1m", DEFAULT_START_TIME + last * MINUTE, limit, fetch)
+
+
+def expected(first: int, last: int) -> np.ndarray:
+    return KLINES[CandleStore.COLUMNS].to_numpy(dtype=np.float64)[first:last + 1]
+
+
+def test_appends_new_candles_without_rewriting_stored_ones(tmp_path) -> None:
+    store: CandleStore = CandleStore(str(tmp_path))
+    assert np.array_equal(get(store, 999, 1000).to_numpy(), expected(0, 999))
+    directory: str = os.path.join(str(tmp_path), "BTCEUR_1m")
+    first_segment: List[str] = [name for name in os.listdir(directory) if name.startswith(CandleStore.SEGMENT_PREFIX)]
+    modified: float = os.stat(os.path.join(directory, first_segment[0], "close.npy")).st_mtime_ns
+
+    for last in range(1009, 1100, 10):
+        assert np.array_equal(get(store, last, 50).to_numpy(), expected(last - 49, last))
+
+    assert os.stat(os.path.join(directory, first_segment[0], "close.npy")).st_mtime_ns == modified
+    assert np.array_equal(store.load("BTCEUR", "1m").to_numpy(), expected(0, 1099))
+
+
+def test_compacts_segments(tmp_path) -> None:
+    store: CandleStore = CandleStore(str(tmp_path))
+    store.MAX_SEGMENTS = 4
+    for last in range(100, 2000, 100):  # Every request downloads its own segment
+        get(store, last, 10)
+    get(store, 1999, 2000)  # Fills the gaps
+
+    segments: List[str] = [name for name in os.listdir(os.path.join(str(tmp_path), "BTCEUR_1m"))
+                           if name.startswith(CandleStore.SEGMENT_PREFIX)]
+    assert len(segments) <= store.MAX_SEGMENTS
+    assert np.array_equal(store.load("BTCEUR", "1m").to_numpy(), expected(0, 1999))
+    assert store.count_missing("BTCEUR", "1m", DEFAULT_START_TIME, DEFAULT_START_TIME + 1999 * MINUTE) == 0
+
+
+def download(directory: str, offset: int) -> None:
+    store: CandleStore = CandleStore(directory)
+    for last in range(200 + offset, 3000, 250):
+        get(store, last, 300)
+
+
+def test_processes_share_the_store(tmp_path) -> None:
+    processes: List[multiprocessing.Process] = [
+        multiprocessing.get_context("fork").Process(target=download, args=(str(tmp_path), offset))
+        for offset in range(0, 100, 25)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    stored: DataFrame = CandleStore(str(tmp_path)).load("BTCEUR", "1m")
+    first, last = ((stored["time"].iloc[[0, -1]].to_numpy() - DEFAULT_START_TIME) // MINUTE).astype(int)
+    assert last == 2975
+    assert np.array_equal(stored.to_numpy(), expected(first, last))
+
+
+def test_range_before_listing_counts_as_downloaded(tmp_path) -> None:
+    klines: DataFrame = generate_klines(1500)
+    server: KlineServer = KlineServer({"BTCEUR": klines})
+    api: Binance = Binance(candle_store=CandleStore(str(tmp_path)), base=server.start(), max_retries=0,
+                           rate_limiter=RequestWeightLimiter(max_weight=10 ** 9), resample=False)
+    end_time: int = int(klines["time"].iloc[-1])
+    try:
+        for limit in [3000, 3000, 1600, 5000]:  # Repeated, longer and shorter requests reaching before the listing
+            df: DataFrame = api.get_candlestick_data("BTCEUR", "1m", end_time=end_time, limit=limit)
+            assert isinstance(df, DataFrame)
+            assert np.allclose(df.to_numpy(), klines[CandleStore.COLUMNS].to_numpy(dtype=np.float64), rtol=0.0,
+                               atol=1e-8)
+        requests: int = server.request_count
+        assert isinstance(api.get_candlestick_data("BTCEUR", "1m", end_time=end_time, limit=5000), DataFrame)
+        assert server.request_count == requests
+    finally:
+        server.stop()
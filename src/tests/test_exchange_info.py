@@ -0,0 +1,48 @@
+import json
+import time
+
+from typing import Dict
+from api.exchange_info import ExchangeInfoCache
+
+EXCHANGE_INFO: Dict = {"symbols": [{"symbol": "BTCEUR", "status": "TRADING", "filters": []}]}
+
+
+def test_update_keeps_an_update_time_of_zero() -> None:
+    cache: ExchangeInfoCache = ExchangeInfoCache()
+    assert cache.update(EXCHANGE_INFO, updated_at=0.0, persist=False)
+    assert cache.updated_at == 0.0
+    assert cache.is_expired()
+
+    assert cache.update(EXCHANGE_INFO, persist=False)
+    assert not cache.is_expired()
+
+
+def test_load_persisted_info(tmp_path) -> None:
+    path: str = str(tmp_path / "exchange_info.json")
+    ExchangeInfoCache(path=path).update(EXCHANGE_INFO)
+
+    cache: ExchangeInfoCache = ExchangeInfoCache(path=path)
+    assert cache.load()
+    assert cache.get("BTCEUR") is not None
+    assert not cache.is_expired()
+
+
+def test_load_info_without_update_time_as_expired(tmp_path) -> None:
+    path: str = str(tmp_path / "exchange_info.json")
+    for cached in [{"exchange_info": EXCHANGE_INFO}, {"updated_at": None, "exchange_info": EXCHANGE_INFO}]:
+        with open(path, "w") as file:
+            json.dump(cached, file)
+
+        cache: ExchangeInfoCache = ExchangeInfoCache(path=path)
+        assert cache.load()
+        assert cache.get("BTCEUR") is not None
+        assert cache.is_expired()
+
+
+def test_load_expired_info(tmp_path) -> None:
+    path: str = str(tmp_path / "exchange_info.json")
+    ExchangeInfoCache(path=path).update(EXCHANGE_INFO, updated_at=time.time() - 7200)
+
+    cache: ExchangeInfoCache = ExchangeInfoCache(path=path)
+    assert cache.load()
+    assert cache.is_expired()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import SimpleMovingAverage
+
+
+def get_prices(n: int, seed: int = 0) -> np.ndarray:
+    rng: np.random.Generator = np.random.default_rng(seed)
+    return 100.0 + np.cumsum(rng.normal(0.0, 1.0, n))
+
+
+def get_streamed(indicator: SimpleMovingAverage, prices: np.ndarray) -> np.ndarray:
+    indicator.reset()
+    return np.array([indicator.update(price) for price in prices])
+
+
+def get_batch(indicator: SimpleMovingAverage, prices: np.ndarray) -> np.ndarray:
+    return indicator.add_data(pd.DataFrame({"close": prices}), "close")[indicator.name].to_numpy(dtype=np.float64)
+
+
+@pytest.mark.parametrize("period", [1, 2, 7, 50])
+def test_streaming_matches_batch(period: int) -> None:
+    indicator: SimpleMovingAverage = SimpleMovingAverage("sma", period)
+    prices: np.ndarray = get_prices(500)
+    assert np.allclose(get_streamed(indicator, prices), get_batch(indicator, prices), equal_nan=True)
+
+
+def test_streaming_matches_batch_during_warm_up() -> None:
+    # The values are defined from the first price on, before the period is filled
+    indicator: SimpleMovingAverage = SimpleMovingAverage("sma", 50)
+    prices: np.ndarray = get_prices(60)
+    streamed: np.ndarray = get_streamed(indicator, prices)
+    assert streamed[0] == prices[0]
+    assert np.allclose(streamed[:50], get_batch(indicator, prices)[:50], equal_nan=True)
+
+
+@pytest.mark.parametrize("missing", [[0], [0, 1, 2], [5], [5, 6, 7, 8], [499], list(range(100, 500, 7))])
+def test_streaming_matches_batch_with_missing_prices(missing: list) -> None:
+    indicator: SimpleMovingAverage = SimpleMovingAverage("sma", 14)
+    prices: np.ndarray = get_prices(500)
+    prices[missing] = np.nan
+    assert np.allclose(get_streamed(indicator, prices), get_batch(indicator, prices), equal_nan=True)
+
+
+def test_start_stream_continues_like_batch() -> None:
+    indicator: SimpleMovingAverage = SimpleMovingAverage("sma", 20)
+    prices: np.ndarray = get_prices(300)
+    batch: np.ndarray = get_batch(indicator, prices)
+    assert np.isclose(indicator.start_stream(prices[:200]), batch[199])
+    for index in range(200, 300):
+        assert np.isclose(indicator.update(prices[index]), batch[index])
@@ -0,0 +1,36 @@
+import json
+import numpy as np
+import pytest
+
+from numpy import ndarray
+from api.kline_parser import INTEGER_FIELDS, KLINE_DTYPE, KLINE_FIELDS, parse_klines, to_dataframe
+from benchmark.synthetic_klines import generate_klines, to_raw_klines
+
+
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_parses_all_fields(separators) -> None:
+    raw: list = to_raw_klines(generate_klines(1000))
+    klines: ndarray = parse_klines(json.dumps(raw, separators=separators).encode())
+    assert klines.dtype == KLINE_DTYPE
+    assert len(klines) == 1000
+    for index, field in enumerate(KLINE_FIELDS):
+        expected: ndarray = np.array([kline[index] for kline in raw],
+                                     dtype=np.int64 if field in INTEGER_FIELDS else np.float64)
+        assert np.array_equal(klines[field], expected)
+
+
+def test_parses_single_and_no_kline() -> None:
+    klines: ndarray = parse_klines(b'[[1499040000000,"0.01634790","0.80000000","0.01575800","0.01577100",'
+                                   b'"148976.11427815",1499644799999,"2434.19055334",308,"1756.87402397",'
+                                   b'"28.46694368","17928899.62484339"]]')
+    assert len(klines) == 1
+    assert klines["time"][0] == 1499040000000 and klines["trades"][0] == 308
+    assert klines["close"][0] == 0.01577100
+    assert len(parse_klines(b"[]")) == 0
+    assert to_dataframe(parse_klines(b"[]")).empty
+
+
+@pytest.mark.parametrize("content", [b'{"code":-1121,"msg":"Invalid symbol."}', b"", b'[[1,"2",3]]',
+                                     b'[[1,"x",3,4,5,6,7,8,9,10,11,12]]', b"[[1,2,3,4,5,6,7,8,9,10,11,12]"])
+def test_rejects_other_bodies(content: bytes) -> None:
+    assert parse_klines(content) is False
@@ -0,0 +1,132 @@
+import random
+import numpy as np
+import pytest
+
+from typing import List
+from pandas import DataFrame
+from market_data import MarketData
+
+
+class ListWindow:
+    """Plain list the ring buffer gets compared against"""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = capacity
+        self.rows: List[List[float]] = list()
+
+    def add_row(self, row: List[float]) -> None:
+        self.rows = (self.rows + [row])[-self.capacity:]
+
+    def add_entries(self, rows: List[List[float]]) -> None:
+        self.rows = (self.rows + rows)[-self.capacity:]
+
+    def update_latest_row(self, row: List[float]) -> None:
+        if self.rows:
+            self.rows[-1] = row
+        else:
+            self.rows.append(row)
+
+
+def assert_same_window(market_data: MarketData, expected: ListWindow) -> None:
+    window: np.ndarray = np.array(expected.rows, dtype=np.float64).reshape(-1, len(market_data.columns))
+    assert len(market_data) == len(expected.rows)
+    assert np.array_equal(market_data.get_window(), window)
+    for index, column in enumerate(market_data.columns):
+        assert np.array_equal(market_data.get_array(column), window[:, index])
+    assert np.array_equal(market_data.create_dataframe().to_numpy(), window)
+    if expected.rows:
+        assert market_data.get_latest_entry() == (expected.rows[-1][0], expected.rows[-1][-2])
+    # Every slot and its mirror slot hold the same entry, so the window never has to wrap around
+    capacity: int = market_data.capacity
+    assert np.array_equal(market_data.buffer[:, :capacity], market_data.buffer[:, capacity:])
+
+
+def create_rows(first: int, count: int) -> List[List[float]]:
+    return [[float(i), i + 0.1, i + 0.2, i + 0.3, i + 0.4, i + 0.5] for i in range(first, first + count)]
+
+
+def test_add_row_wraps_around() -> None:
+    market_data: MarketData = MarketData("BTCEUR", capacity=5, columns=MarketData.COLUMNS_OHLCV)
+    expected: ListWindow = ListWindow(5)
+    for row in create_rows(0, 13):
+        market_data.add_row(row)
+        expected.add_row(row)
+        assert_same_window(market_data, expected)
+
+
+@pytest.mark.parametrize("end, count", [(0, 3), (3, 4), (4, 1), (2, 5), (3, 9), (0, 5), (1, 0)])
+def test_add_entries_splits_batches_at_the_end_of_the_buffer(end: int, count: int) -> None:
+    market_data: MarketData = MarketData("BTCEUR", capacity=5, columns=MarketData.COLUMNS_OHLCV)
+    expected: ListWindow = ListWindow(5)
+    for row in create_rows(0, 5 + end):  # Full window, the next entry gets written to the slot 'end'
+        market_data.add_row(row)
+        expected.add_row(row)
+    assert market_data.end == end
+
+    rows: List[List[float]] = create_rows(100, count)
+    market_data.add_entries(np.array(rows, dtype=np.float64).reshape(-1, 6))
+    expected.add_entries(rows)
+    assert_same_window(market_data, expected)
+    assert market_data.end == (end + min(count, 5)) % 5
+
+
+def test_update_latest_row() -> None:
+    market_data: MarketData = MarketData("BTCEUR", capacity=3, columns=MarketData.COLUMNS_OHLCV)
+    expected: ListWindow = ListWindow(3)
+    # Updating an empty window adds the row
+    market_data.update_latest_row(create_rows(0, 1)[0])
+    expected.update_latest_row(create_rows(0, 1)[0])
+    assert_same_window(market_data, expected)
+    for row in create_rows(1, 5):
+        # A candle that is not closed yet gets added and updated until the next one opens
+        market_data.add_row(row)
+        expected.add_row(row)
+        for update in range(3):
+            updated: List[float] = [row[0]] + [value + update for value in row[1:]]
+            market_data.update_latest_row(updated)
+            expected.update_latest_row(updated)
+            assert_same_window(market_data, expected)
+
+
+def test_random_operations_match_a_list() -> None:
+    generator: random.Random = random.Random(42)
+    for capacity in [1, 2, 7, 16]:
+        market_data: MarketData = MarketData("BTCEUR", capacity=capacity, columns=MarketData.COLUMNS_OHLCV)
+        expected: ListWindow = ListWindow(capacity)
+        next_time: int = 0
+        for _ in range(300):
+            operation: int = generator.randrange(3)
+            if operation == 0:
+                row: List[float] = create_rows(next_time, 1)[0]
+                market_data.add_row(row)
+                expected.add_row(row)
+                next_time += 1
+            elif operation == 1:
+                rows: List[List[float]] = create_rows(next_time, generator.randrange(2 * capacity + 2))
+                market_data.add_entries(np.array(rows, dtype=np.float64).reshape(-1, 6))
+                expected.add_entries(rows)
+                next_time += len(rows)
+            else:
+                row: List[float] = [float(next_time - 1)] + [generator.random() for _ in range(5)]
+                market_data.update_latest_row(row)
+                expected.update_latest_row(row)
+            assert_same_window(market_data, expected)
+
+
+def test_price_window_from_initial_prices() -> None:
+    market_data: MarketData = MarketData("BTCEUR", init_times=[1.0, 2.0, 3.0, 4.0],
+                                         init_prices=[10.0, 11.0, 12.0, 13.0], capacity=3)
+    assert market_data.times.tolist() == [2.0, 3.0, 4.0]
+    assert market_data.prices.tolist() == [11.0, 12.0, 13.0]
+    market_data.add_entry(5.0, 14.0)
+    assert market_data.get_window().tolist() == [[3.0, 12.0], [4.0, 13.0], [5.0, 14.0]]
+    assert market_data.get_latest_entry() == (5.0, 14.0)
+
+
+def test_from_dataframe_keeps_the_latest_rows() -> None:
+    rows: List[List[float]] = create_rows(0, 10)
+    df: DataFrame = DataFrame(rows, columns=MarketData.COLUMNS_OHLCV)
+    market_data: MarketData = MarketData.from_dataframe("BTCEUR", df, capacity=4)
+    expected: ListWindow = ListWindow(4)
+    expected.add_entries(rows)
+    assert_same_window(market_data, expected)
@@ -0,0 +1,191 @@
+import json
+import time
+import numpy as np
+
+from threading import Lock
+from typing import Dict, List, Union
+from pandas import DataFrame
+from benchmark.synthetic_klines import generate_klines
+from bot_runner import BotRunner
+from market_data import MarketData
+from market_data_registry import ReadWriteLock
+from stream.market_stream import MarketStream
+from stream.replay import ReplayServer
+from stream.transports import ReplayTransport, StreamTransport
+
+HISTORY: int = 100
+REPLAYED: int = 1000
+
+
+class FakeApi:
+    def __init__(self, klines: Dict[str, DataFrame]) -> None:
+        self.klines: Dict[str, DataFrame] = klines
+
+    def get_candlestick_data(self, symbol: str, interval: str = "1m", end_time: int = None,
+                             limit: int = 1000) -> DataFrame:
+        df: DataFrame = self.klines[symbol]
+        return df[df["time"] <= end_time].tail(limit).reset_index(drop=True)
+
+
+class RecordingMarketData(MarketData):
+    """Records whether the window got written while a bot was reading it"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.lock: Lock = Lock()
+        self.readers: int = 0
+        self.overlaps: int = 0
+
+    def add_row(self, row) -> None:
+        self.overlaps += self.readers > 0
+        super().add_row(row)
+
+    def update_latest_row(self, row) -> None:
+        self.overlaps += self.readers > 0
+        super().update_latest_row(row)
+
+    def add_entries(self, rows) -> None:
+        self.overlaps += getattr(self, "readers", 0) > 0
+        super().add_entries(rows)
+
+
+class FakeBot:
+    STATUS_RUNNING: str = "running"
+    STATUS_PAUSED: str = "paused"
+    STATUS_ABORTED: str = "aborted"
+    MARKET_DATA_INTERVAL: str = "1m"
+
+    def __init__(self, name: str, symbol: str, market_data: RecordingMarketData) -> None:
+        self.id: int = -1
+        self.name: str = name
+        self.symbol: str = symbol
+        self.status: str = "init"
+        self.api = None
+        self.market_data: RecordingMarketData = market_data
+        self.evaluations: int = 0
+
+    def evaluate(self) -> None:
+        with self.market_data.lock:
+            self.market_data.readers += 1
+        time.sleep(0.005)
+        with self.market_data.lock:
+            self.market_data.readers -= 1
+        self.evaluations += 1
+
+
+def test_stream_feeds_running_bots() -> None:
+    klines: Dict[str, DataFrame] = {symbol: generate_klines(HISTORY + REPLAYED, seed=index)
+                                    for index, symbol in enumerate(["BTCEUR", "ETHEUR"])}
+    server: ReplayServer = ReplayServer({symbol: df.iloc[HISTORY:] for symbol, df in klines.items()},
+                                        messages_per_second=2000)
+    host, port = server.start()
+    stream: MarketStream = MarketStream(ReplayTransport(host, port), api=FakeApi(klines), reconnect_delay=0.05)
+    runner: BotRunner = BotRunner(cycle_interval=0.01, max_workers=4, market_stream=stream)
+    windows: Dict[str, RecordingMarketData] = {
+        symbol: RecordingMarketData.from_dataframe(symbol, df.iloc[:HISTORY], capacity=HISTORY + REPLAYED)
+        for symbol, df in klines.items()}
+    # Two bots per symbol share the window of the symbol
+    bots: List[FakeBot] = [FakeBot(f"{symbol} {index}", symbol, windows[symbol])
+                           for symbol in klines for index in range(2)]
+    for bot in bots:
+        runner.add_bot(bot)
+    try:
+        # The bots of the second symbol start while the stream already runs
+        runner.start_bot(1)
+        runner.start_bot(2)
+        time.sleep(0.2)
+        runner.start_bot(3)
+        runner.start_bot(4)
+        start: float = time.perf_counter()
+        while not server.is_finished() and time.perf_counter() - start < 30:
+            time.sleep(0.05)
+        time.sleep(0.2)
+    finally:
+        runner.shutdown()
+        server.stop()
+
+    assert not stream.running
+    for symbol, window in windows.items():
+        assert np.allclose(window.get_window(), klines[symbol][MarketData.COLUMNS_OHLCV].to_numpy())
+        assert window.overlaps == 0
+    assert stream.get_stats()["backfilled_candles"] > 0  # Candles of the second symbol before it got subscribed
+    assert min(bot.evaluations for bot in bots) > 0
+
+
+def kline_message(symbol: str, open_time: int, close: str = "1.0") -> str:
+    return json.dumps({"stream": symbol.lower() + "@kline_1m", "data": {
+        "e": "kline", "E": open_time, "s": symbol, "k": {"t": open_time, "s": symbol, "o": "1.0", "h": "1.0",
+                                                         "l": "1.0", "c": close, "v": "1.0"}}})
+
+
+class LockCheckingApi(FakeApi):
+    """Records whether candles got downloaded while the market data was locked for writing"""
+
+    def __init__(self, klines: Dict[str, DataFrame], lock: ReadWriteLock) -> None:
+        super().__init__(klines)
+        self.lock: ReadWriteLock = lock
+        self.locked_downloads: int = 0
+        self.downloads: int = 0
+
+    def get_candlestick_data(self, *args, **kwargs) -> DataFrame:
+        self.downloads += 1
+        self.locked_downloads += self.lock.writer_active
+        return super().get_candlestick_data(*args, **kwargs)
+
+
+def test_backfills_without_holding_the_write_lock() -> None:
+    klines: Dict[str, DataFrame] = {"BTCEUR": generate_klines(200)}
+    lock: ReadWriteLock = ReadWriteLock()
+    api: LockCheckingApi = LockCheckingApi(klines, lock)
+    stream: MarketStream = MarketStream(None, api=api, lock=lock)
+    windows: List[MarketData] = [MarketData.from_dataframe("BTCEUR", klines["BTCEUR"].iloc[:100], capacity=200),
+                                 MarketData.from_dataframe("BTCEUR", klines["BTCEUR"].iloc[:150], capacity=200)]
+    for window in windows:
+        stream.subscribe("BTCEUR", window)
+
+    stream.handle_message(kline_message("BTCEUR", int(klines["BTCEUR"]["time"].iloc[199])))
+
+    assert api.downloads == 1  # Once for all windows of the symbol
+    assert api.locked_downloads == 0
+    for window in windows:
+        assert np.array_equal(window.times, klines["BTCEUR"]["time"].to_numpy(dtype=float))
+    assert stream.get_stats()["backfilled_candles"] == 99 + 49
+
+
+class ListTransport(StreamTransport):
+    def __init__(self, messages: List[str]) -> None:
+        self.messages: List[str] = messages
+
+    def connect(self, streams: List[str]) -> None:
+        pass
+
+    def receive(self) -> Union[str, None]:
+        if not self.messages:
+            time.sleep(0.01)
+            return None
+        return self.messages.pop(0)
+
+    def close(self) -> None:
+        pass
+
+
+def test_broken_message_does_not_stop_the_stream() -> None:
+    klines: DataFrame = generate_klines(100)
+    window: MarketData = MarketData.from_dataframe("BTCEUR", klines, capacity=200)
+    next_time: int = int(klines["time"].iloc[-1]) + 60 * 1000
+    broken: Dict = json.loads(kline_message("BTCEUR", next_time))
+    del broken["data"]["k"]["o"]
+    stream: MarketStream = MarketStream(ListTransport([
+        json.dumps(broken), kline_message("BTCEUR", next_time, close="abc"), kline_message("BTCEUR", next_time, "2.5")
+    ]))
+    stream.subscribe("BTCEUR", window)
+    stream.start()
+    try:
+        start: float = time.perf_counter()
+        while stream.get_stats()["messages"] < 1 and time.perf_counter() - start < 5:
+            time.sleep(0.01)
+        assert stream.thread.is_alive()
+    finally:
+        stream.stop()
+
+    assert window.get_latest_entry() == (next_time, 2.5)
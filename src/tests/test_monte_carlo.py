@@ -0,0 +1,64 @@
+import contextlib
+import io
+import numpy as np
+
+from pandas import DataFrame
+from backtest.monte_carlo import MonteCarlo
+from backtest.parameter_sweep import ParameterSweep
+from benchmark.synthetic_klines import SyntheticApi, generate_klines
+
+SYMBOL: str = "BTCEUR"
+PARAMETERS = dict(profit_target=1.01, stop_loss_target=0.99, sma_to_price_difference=1.005, sma_period=20)
+
+
+def run_analysis(klines: DataFrame, workers: int, seed: int) -> MonteCarlo:
+    monte_carlo: MonteCarlo = MonteCarlo(SYMBOL, SyntheticApi(klines), 100000.0, 1.0, len(klines), PARAMETERS,
+                                         simulations=24, block_size=50, workers=workers, seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert monte_carlo.run(klines) is not False
+    return monte_carlo
+
+
+def test_results_do_not_depend_on_workers() -> None:
+    klines: DataFrame = generate_klines(3000, seed=3, volatility=0.01)
+    two: MonteCarlo = run_analysis(klines, workers=2, seed=7)
+    four: MonteCarlo = run_analysis(klines, workers=4, seed=7)
+    assert two.results.equals(four.results)
+    assert two.summary.equals(four.summary)
+    other: MonteCarlo = run_analysis(klines, workers=2, seed=8)
+    assert not two.results.equals(other.results)
+
+
+def test_backtest_gets_measured_like_the_simulations() -> None:
+    klines: DataFrame = generate_klines(3000, seed=3, volatility=0.01)
+    monte_carlo: MonteCarlo = run_analysis(klines, workers=2, seed=7)
+    stats = set(monte_carlo.summary.index)
+    assert (MonteCarlo.METHOD_TRADES, "max_round_trip_drawdown") in stats
+    assert (MonteCarlo.METHOD_BLOCK_BOOTSTRAP, "max_drawdown") in stats
+    assert (MonteCarlo.METHOD_TRADES, "max_drawdown") not in stats
+    # Drawdowns after round trips miss the drops while positions are open
+    base = monte_carlo.base_stats
+    assert base[MonteCarlo.METHOD_TRADES]["max_round_trip_drawdown"] <= \
+        base[MonteCarlo.METHOD_BLOCK_BOOTSTRAP]["max_drawdown"]
+    # Resampling the round trips keeps their mix, so the final capital of the backtest lies within the simulations
+    final_capitals: np.ndarray = monte_carlo.results.loc[
+        monte_carlo.results["method"] == MonteCarlo.METHOD_TRADES, "final_capital"].to_numpy()
+    assert final_capitals.min() <= base[MonteCarlo.METHOD_TRADES]["final_capital"] <= final_capitals.max()
+
+
+def test_sweep_analyzes_best_combination() -> None:
+    klines: DataFrame = generate_klines(3000, seed=3, volatility=0.01)
+    grid = {name: [value] for name, value in PARAMETERS.items()}
+    grid["profit_target"] = [1.01, 1.02]
+    sweep: ParameterSweep = ParameterSweep(SYMBOL, SyntheticApi(klines), 100000.0, 1.0, len(klines), grid, workers=2,
+                                           monte_carlo_simulations=24, monte_carlo_seed=7)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results: DataFrame = sweep.run(klines)
+    best = results.iloc[0]
+    assert sweep.monte_carlo is not None
+    assert sweep.monte_carlo.parameters["profit_target"] == best["profit_target"]
+    # Same results as a separate analysis of the combination
+    separate: MonteCarlo = MonteCarlo.from_sweep(sweep, results, simulations=24, seed=7)
+    with contextlib.redirect_stdout(io.StringIO()):
+        separate.run(klines)
+    assert sweep.monte_carlo.results.equals(separate.results)
@@ -0,0 +1,40 @@
+import pytest
+
+from typing import Any, Dict, List
+from pandas import DataFrame
+from backtest.backtest import Backtest
+from backtest.parameter_sweep import ParameterSweep
+from benchmark.synthetic_klines import SyntheticApi, generate_klines
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+SYMBOL: str = "BTCEUR"
+PARAMETER_GRID: Dict[str, List[Any]] = {
+    "profit_target": [1.01, 1.03],
+    "stop_loss_target": [0.97],
+    "sma_to_price_difference": [1.002, 1.01],
+    "sma_period": [10, 50],
+}
+
+
+def run_backtest(api: SyntheticApi, kline_limit: int, parameters: Dict[str, Any]) -> Dict[str, float]:
+    """Runs a plain backtest like Backtest.run does, without creating its dashboard"""
+    backtest: Backtest = Backtest(SYMBOL, api, MovingAverageStrategy(**parameters), 100000.0, 1.0, kline_limit)
+    backtest.candlestick_df = api.get_candlestick_data(symbol=SYMBOL, limit=kline_limit)
+    backtest.strategy.add_indicators(backtest.candlestick_df, column_name="close")
+    assert backtest.simulate()
+    return backtest.get_stats()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sweep_matches_plain_backtests(workers: int) -> None:
+    api: SyntheticApi = SyntheticApi(generate_klines(3000, seed=5, volatility=0.01))
+    sweep: ParameterSweep = ParameterSweep(SYMBOL, api, 100000.0, 1.0, 3000, PARAMETER_GRID, workers=workers)
+    ranked: DataFrame = sweep.run()
+
+    assert len(ranked) == len(sweep.get_combinations())
+    for _, row in ranked.iterrows():
+        parameters: Dict[str, Any] = {name: row[name] for name in PARAMETER_GRID}
+        parameters["sma_period"] = int(parameters["sma_period"])
+        expected: Dict[str, float] = run_backtest(api, 3000, parameters)
+        assert {name: row[name] for name in expected} == pytest.approx(expected, rel=1e-12), parameters
+    assert ranked["buy_signals_accepted"].sum() > 0
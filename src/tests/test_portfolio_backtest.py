@@ -0,0 +1,68 @@
+import contextlib
+import io
+import numpy as np
+import pytest
+
+from typing import Dict
+from numpy import ndarray
+from pandas import DataFrame
+from backtest.backtest import Backtest
+from backtest.portfolio_backtest import PortfolioBacktest
+from benchmark.synthetic_klines import SyntheticApi, generate_klines
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+MINUTE: int = 60 * 1000
+STRATEGY: Dict[str, float] = dict(profit_target=1.01, stop_loss_target=0.99, sma_to_price_difference=1.005,
+                                  sma_period=20)
+
+
+def get_columns(close: list, low: list, signal: list) -> Dict[str, ndarray]:
+    return {"time": MINUTE * np.arange(len(close), dtype=np.float64), "close": np.array(close, dtype=np.float64),
+            "low": np.array(low, dtype=np.float64), "signal": np.array(signal, dtype=bool)}
+
+
+@pytest.mark.parametrize("chunk_size", [50000, 777])
+def test_single_symbol_matches_backtest(chunk_size: int) -> None:
+    klines: DataFrame = generate_klines(10000, seed=2, volatility=0.01)
+    backtest: Backtest = Backtest("BTCEUR", SyntheticApi(klines), MovingAverageStrategy(**STRATEGY), 100000.0, 1.0,
+                                  len(klines))
+    backtest.candlestick_df = backtest.strategy.add_indicators(klines.copy(), column_name="close")
+    backtest.simulate()
+
+    portfolio: PortfolioBacktest = PortfolioBacktest(["BTCEUR"], SyntheticApi(klines), 100000.0, 1.0, len(klines),
+                                                     interval="1m", strategy_parameters=STRATEGY,
+                                                     chunk_size=chunk_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = portfolio.run()
+    assert {key: value for key, value in backtest.get_stats().items() if key in stats} == \
+        {key: value for key, value in stats.items() if key in backtest.get_stats()}
+    assert backtest.ledger.to_dataframe().equals(portfolio.ledgers["BTCEUR"].to_dataframe())
+    assert backtest.capital_over_time == portfolio.capital_over_time
+
+
+def test_capital_covers_buy_quantity() -> None:
+    symbols = [f"S{index}EUR" for index in range(4)]
+    candles: Dict[str, DataFrame] = {symbol: generate_klines(5000, seed=index, volatility=0.01, start_price=100.0)
+                                     for index, symbol in enumerate(symbols)}
+    portfolio: PortfolioBacktest = PortfolioBacktest(symbols, SyntheticApi(DataFrame()), 1000.0, 3.0, 5000,
+                                                     interval="1m", strategy_parameters=STRATEGY)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = portfolio.run(candles)
+    assert stats["buy_signals_accepted"] > 0
+    assert min(entry["capital"] for entry in portfolio.capital_over_time) >= 0.0
+
+
+def test_stop_loss_of_signaling_symbol_frees_capital() -> None:
+    # A gets bought first and hits its stop loss in the second candle, in which both symbols have a buy signal. B comes
+    # first, but can only be bought with the capital of the stop loss of A.
+    portfolio: PortfolioBacktest = PortfolioBacktest(["B", "A"], SyntheticApi(DataFrame()), 150.0, 1.0, 2,
+                                                     interval="1m")
+    portfolio.simulate({
+        "B": get_columns(close=[100.0, 100.0], low=[100.0, 100.0], signal=[False, True]),
+        "A": get_columns(close=[100.0, 100.0], low=[100.0, 80.0], signal=[True, True]),
+    })
+    assert portfolio.ledgers["B"].buy_count == 1
+    # A must not buy again with the capital of its own stop loss
+    assert portfolio.ledgers["A"].buy_count == 1
+    assert portfolio.ledgers["A"].sell_count == 1
+    assert portfolio.capital >= 0.0
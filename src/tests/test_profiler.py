@@ -0,0 +1,89 @@
+import threading
+import pytest
+
+from typing import Dict, Iterator
+from pandas import DataFrame
+from api.binance import Binance
+from api.rate_limiter import RequestWeightLimiter
+from benchmark.kline_server import KlineServer
+from benchmark.synthetic_klines import generate_klines
+from profiler import Profiler
+
+
+@pytest.fixture
+def profiler() -> Iterator[Profiler]:
+    profiler: Profiler = Profiler()
+    profiler.enable(trace_memory=False)
+    yield profiler
+    profiler.disable()
+
+
+def get_calls(profiler: Profiler) -> Dict[str, int]:
+    return {stage["stage"]: stage["calls"] for stage in profiler.get_stats()["stages"]}
+
+
+def test_ignores_stages_of_other_threads(profiler: Profiler) -> None:
+    started: threading.Event = threading.Event()
+    stop: threading.Event = threading.Event()
+
+    def run_bot() -> None:  # Like a bot that keeps running next to the profiled backtest
+        while not stop.is_set():
+            with profiler.stage("http_request"):
+                started.set()
+
+    thread: threading.Thread = threading.Thread(target=run_bot)
+    thread.start()
+    started.wait()
+    with profiler.stage("backtest"):
+        with profiler.stage("simulate"):
+            pass
+    stop.set()
+    thread.join()
+
+    assert get_calls(profiler) == {"backtest": 1, "simulate": 1}
+
+
+def test_records_threads_running_in_the_profiled_context(monkeypatch, profiler: Profiler) -> None:
+    monkeypatch.setattr("api.binance.profiler", profiler)
+    klines: DataFrame = generate_klines(3000)
+    server: KlineServer = KlineServer({"BTCEUR": klines})
+    api: Binance = Binance(base=server.start(), max_retries=0, rate_limiter=RequestWeightLimiter(max_weight=10 ** 9))
+    try:
+        with profiler.stage("fetch_data"):
+            df: DataFrame = api.get_candlestick_data("BTCEUR", "1m", end_time=int(klines["time"].iloc[-1]),
+                                                     limit=3000)
+        # A request of a thread that did not get started for the profiled code
+        thread: threading.Thread = threading.Thread(target=api.get_klines, args=("BTCEUR", "1m"))
+        thread.start()
+        thread.join()
+    finally:
+        server.stop()
+
+    assert len(df) == 3000
+    assert get_calls(profiler) == {"fetch_data": 1, "http_request": 3, "parse_klines": 3}
+
+
+def test_disable_stops_recording(profiler: Profiler) -> None:
+    profiler.disable()
+    with profiler.stage("backtest"):
+        pass
+    assert get_calls(profiler) == {}
+
+
+@pytest.mark.parametrize("can_reset_peak", [True, False])
+def test_traces_peak_memory(monkeypatch, can_reset_peak: bool) -> None:
+    monkeypatch.setattr(Profiler, "CAN_RESET_PEAK", can_reset_peak)
+    profiler: Profiler = Profiler()
+    profiler.enable(trace_memory=True)
+    try:
+        with profiler.stage("allocate"):
+            data: bytearray = bytearray(10 * 1024 * 1024)
+            with profiler.stage("inner"):
+                pass
+            del data
+    finally:
+        profiler.disable()
+
+    peaks: Dict[str, int] = {stage["stage"]: stage["peak_memory"] for stage in profiler.get_stats()["stages"]}
+    assert peaks["allocate"] >= 10 * 1024 * 1024
+    assert peaks["inner"] < 1024 * 1024
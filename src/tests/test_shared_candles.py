@@ -0,0 +1,43 @@
+import numpy as np
+
+from typing import Dict, Tuple
+from pandas import DataFrame
+from backtest import shared_candles
+from benchmark.synthetic_klines import generate_klines
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+
+def test_worker_detaches_from_shared_candles(monkeypatch) -> None:
+    frames: Dict[str, DataFrame] = {"a": generate_klines(100, seed=1), "b": generate_klines(50, seed=2)}
+    with shared_candles.share_candles(frames) as segments:
+        monkeypatch.setattr(shared_candles, "_worker_segments", segments)
+        for key, df in frames.items():
+            candles: DataFrame = shared_candles.get_candles(key)
+            assert np.array_equal(candles.to_numpy(), df[shared_candles.COLUMNS].to_numpy(dtype=np.float64))
+        del candles
+        attached = list(shared_candles._worker_shared_memories.values())
+        assert len(attached) == 2
+
+        shared_candles.close_worker()
+
+        assert all(shared_memory.buf is None for shared_memory in attached)
+        assert not shared_candles._worker_shared_memories and not shared_candles._worker_candles
+
+
+def test_indicators_get_calculated_on_the_returned_candles(monkeypatch) -> None:
+    df: DataFrame = generate_klines(300)
+    with shared_candles.share_candles({"candles": df}) as segments:
+        monkeypatch.setattr(shared_candles, "_worker_segments", segments)
+        try:
+            for kline_limit in [None, 200, 200, None]:  # Repeated ones come from the cache
+                strategy: MovingAverageStrategy = MovingAverageStrategy(sma_period=20)
+                candles: DataFrame = shared_candles.get_candles_with_indicators("candles", strategy, kline_limit)
+                expected: DataFrame = strategy.add_indicators(df.tail(kline_limit or len(df)).reset_index(drop=True),
+                                                              column_name="close")
+                for indicator in strategy.indicators:
+                    assert np.allclose(candles[indicator.name], expected[indicator.name], equal_nan=True)
+                assert len(candles) == (kline_limit or len(df))
+            keys: Tuple = tuple(shared_candles._worker_indicator_cache)
+            assert len(keys) == 2
+        finally:
+            shared_candles.close_worker()
@@ -0,0 +1,79 @@
+import numpy as np
+
+from typing import List, Tuple
+from pandas import DataFrame
+from trade_ledger import TradeLedger
+
+
+def test_grows_past_its_initial_capacity() -> None:
+    ledger: TradeLedger = TradeLedger(capacity=2)
+    trades: List[Tuple[float, float, float, float, float]] = list()
+    for i in range(37):  # Grows several times, the last time in the middle of the trades
+        trade: Tuple[float, float, float, float, float] = (1000.0 + i, 100.0 + i, 0.5 + i, 50.0 + i, 0.05 * i)
+        assert ledger.add_buy(*trade) == i
+        trades.append(trade)
+
+    assert len(ledger) == ledger.buy_count == 37
+    assert len(ledger.times) >= 37
+    for column, values in zip(["time", "price", "quantity", "amount", "fee"], zip(*trades)):
+        assert np.array_equal(ledger.get_column(column), np.array(values)), column
+    assert np.array_equal(ledger.get_column("side"), np.full(37, TradeLedger.SIDE_BUY))
+    assert np.array_equal(ledger.get_column("position_id"), np.full(37, -1))
+    assert ledger.get_column("position_id").dtype == np.int64
+
+
+def test_grows_from_zero_capacity() -> None:
+    ledger: TradeLedger = TradeLedger(capacity=0)
+    ledger.add_buy(1.0, 2.0, 3.0, 6.0, 0.01)
+    assert len(ledger) == 1
+    assert ledger.get_column("amount").tolist() == [6.0]
+
+
+def test_sells_close_positions_in_the_order_they_got_bought() -> None:
+    ledger: TradeLedger = TradeLedger(capacity=1)
+    first: int = ledger.add_buy(1.0, 10.0, 1.0, 10.0, 0.0)
+    second: int = ledger.add_buy(2.0, 20.0, 2.0, 40.0, 0.0)
+    third: int = ledger.add_buy(3.0, 30.0, 3.0, 90.0, 0.0)
+    assert list(ledger.open_positions.items()) == [(first, 1.0), (second, 2.0), (third, 3.0)]
+
+    # Closing a position in the middle keeps the order of the others
+    ledger.add_sell(second, 4.0, 25.0, 2.0, 50.0, 0.0)
+    fourth: int = ledger.add_buy(5.0, 15.0, 4.0, 60.0, 0.0)
+    assert list(ledger.open_positions) == [first, third, fourth]
+
+    # Selling everything, like the backtests do, closes the oldest position first
+    for position_id, quantity in list(ledger.open_positions.items()):
+        ledger.add_sell(position_id, 6.0, 40.0, quantity, 40.0 * quantity, 0.0)
+    assert not ledger.open_positions
+    assert ledger.buy_count == 4 and ledger.sell_count == 4
+    sells: DataFrame = ledger.get_trades(TradeLedger.SIDE_SELL)
+    assert sells["position_id"].tolist() == [second, first, third, fourth]
+    assert sells["quantity"].tolist() == [2.0, 1.0, 3.0, 4.0]
+
+
+def test_to_dataframe_and_get_trades() -> None:
+    ledger: TradeLedger = TradeLedger(capacity=2)
+    buy: int = ledger.add_buy(1.0, 10.0, 2.0, 20.0, 0.02)
+    sell: int = ledger.add_sell(buy, 2.0, 12.0, 2.0, 24.0, 0.024)
+    other_buy: int = ledger.add_buy(3.0, 11.0, 1.0, 11.0, 0.011)
+
+    df: DataFrame = ledger.to_dataframe()
+    assert list(df.columns) == TradeLedger.COLUMNS
+    assert df.index.name == "trade_id"
+    assert df.index.tolist() == [buy, sell, other_buy]
+    assert df.loc[sell].tolist() == [2.0, TradeLedger.SIDE_SELL, 12.0, 2.0, 24.0, 0.024, buy]
+
+    buys: DataFrame = ledger.get_trades(TradeLedger.SIDE_BUY)
+    assert buys.index.tolist() == [buy, other_buy]
+    assert buys["position_id"].tolist() == [-1, -1]
+    sells: DataFrame = ledger.get_trades(TradeLedger.SIDE_SELL)
+    assert sells.index.tolist() == [sell]
+    assert sells["amount"].tolist() == [24.0]
+
+
+def test_empty_ledger() -> None:
+    ledger: TradeLedger = TradeLedger()
+    df: DataFrame = ledger.to_dataframe()
+    assert len(ledger) == 0 and df.empty
+    assert list(df.columns) == TradeLedger.COLUMNS
+    assert ledger.get_trades(TradeLedger.SIDE_SELL).empty
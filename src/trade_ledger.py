@@ -0,0 +1,124 @@
+import numpy as np
+
+from typing import Dict, List
+from numpy import ndarray
+from pandas import DataFrame
+
+
+class TradeLedger:
+    """
+    Columnar record of all trades of a backtest or bot.
+
+    Every trade is one row in a set of preallocated NumPy columns that double their size whenever they are full, so
+    recording a trade does not create any Python objects. Trades are identified by their row index. A buy opens a
+    position that stays open until a sell closes it, the open positions are kept in an insertion ordered dict, so opening
+    and closing a position is O(1) and the open positions can be sold in the order they got bought.
+    """
+    SIDE_BUY: int = 1
+    SIDE_SELL: int = -1
+    COLUMNS: List[str] = ["time", "side", "price", "quantity", "amount", "fee", "position_id"]
+
+    def __init__(self, capacity: int = 64) -> None:
+        """
+        Parameters:
+            - capacity: (int) Number of trades the columns get preallocated for
+        """
+        self.size: int = 0
+        self.buy_count: int = 0
+        self.sell_count: int = 0
+        self.open_positions: Dict[int, float] = dict()  # Trade id of every open buy and its quantity
+        self.times: ndarray = np.empty(capacity, dtype=np.float64)
+        self.sides: ndarray = np.empty(capacity, dtype=np.int8)
+        self.prices: ndarray = np.empty(capacity, dtype=np.float64)  # Price per coin
+        self.quantities: ndarray = np.empty(capacity, dtype=np.float64)  # In coins (what we get or pay)
+        self.amounts: ndarray = np.empty(capacity, dtype=np.float64)  # In euros (what we pay or get)
+        self.fees: ndarray = np.empty(capacity, dtype=np.float64)
+        self.position_ids: ndarray = np.empty(capacity, dtype=np.int64)  # Buy that got closed by a sell, -1 for buys
+
+    def add_buy(self, time: float, price: float, quantity: float, amount: float, fee: float) -> int:
+        """
+        Records a buy and opens a position for it.
+
+        Parameters:
+            - time: (float) Time of the buy
+            - price: (float) Price per coin
+            - quantity: (float) Coins we got
+            - amount: (float) Euros we paid
+            - fee: (float) Transaction costs of the buy
+
+        Returns:
+            The id of the trade, which is the id of the opened position as well
+        """
+        trade_id: int = self.__add(time, self.SIDE_BUY, price, quantity, amount, fee, -1)
+        self.open_positions[trade_id] = quantity
+        self.buy_count += 1
+        return trade_id
+
+    def add_sell(self, position_id: int, time: float, price: float, quantity: float, amount: float, fee: float) -> int:
+        """
+        Records a sell and closes the position it sold.
+
+        Parameters:
+            - position_id: (int) Id of the buy whose coins got sold
+            - time: (float) Time of the sell
+            - price: (float) Price per coin
+            - quantity: (float) Coins we sold
+            - amount: (float) Euros we got
+            - fee: (float) Transaction costs of the sell
+
+        Returns:
+            The id of the trade
+        """
+        trade_id: int = self.__add(time, self.SIDE_SELL, price, quantity, amount, fee, position_id)
+        self.open_positions.pop(position_id, None)
+        self.sell_count += 1
+        return trade_id
+
+    def get_column(self, column: str) -> ndarray:
+        """Returns the values of one column for all recorded trades, as view on the preallocated column"""
+        return self.__get_columns()[column][:self.size]
+
+    def get_trades(self, side: int) -> DataFrame:
+        """Returns all buys or all sells as data frame"""
+        df: DataFrame = self.to_dataframe()
+        return df[df["side"] == side]
+
+    def to_dataframe(self) -> DataFrame:
+        """Returns all trades as data frame, indexed by the trade id"""
+        df: DataFrame = DataFrame({column: self.get_column(column) for column in self.COLUMNS})
+        df.index.name = "trade_id"
+        return df
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __add(self, time: float, side: int, price: float, quantity: float, amount: float, fee: float,
+              position_id: int) -> int:
+        if self.size == len(self.times):
+            self.__grow()
+        trade_id: int = self.size
+        self.times[trade_id] = time
+        self.sides[trade_id] = side
+        self.prices[trade_id] = price
+        self.quantities[trade_id] = quantity
+        self.amounts[trade_id] = amount
+        self.fees[trade_id] = fee
+        self.position_ids[trade_id] = position_id
+        self.size += 1
+        return trade_id
+
+    def __grow(self) -> None:
+        """Doubles the capacity of all columns"""
+        capacity: int = max(2 * len(self.times), 1)
+        for column, values in self.__get_columns().items():
+            grown: ndarray = np.empty(capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            setattr(self, self.__get_attribute(column), grown)
+
+    def __get_columns(self) -> Dict[str, ndarray]:
+        return {column: getattr(self, self.__get_attribute(column)) for column in self.COLUMNS}
+
+    @staticmethod
+    def __get_attribute(column: str) -> str:
+        """Name of the attribute holding a column, e.g. 'price' -> 'prices'"""
+        return "quantities" if column == "quantity" else column + "s"
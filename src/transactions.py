@@ -8,6 +8,8 @@ logger: Logger = logging.getLogger("__main__")
 
 
 class BuyTransaction:
+    __slots__ = ("transaction_id", "symbol", "buy_quantity", "buy_price", "time")
+
     def __init__(self, signal_id: UUID, symbol: str, buy_price: float, buy_quantity: float, time: datetime) -> None:
         self.transaction_id: UUID = signal_id  # The transaction id will be the id of the corresponding buy signal
         self.symbol: str = symbol
@@ -17,6 +19,8 @@ class BuyTransaction:
 
 
 class SellTransaction:
+    __slots__ = ("transaction_id", "symbol", "sell_quantity", "sell_price", "time")
+
     def __init__(self, signal_id: UUID, symbol: str, sell_price: float, sell_quantity: float, time: datetime) -> None:
         self.transaction_id: UUID = signal_id  # The transaction id will be the id of the corresponding sell signal
         self.symbol: str = symbol